@@ -0,0 +1,320 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from renderer import BRIDGE_COLOR, EDGE_COLOR, NODE_COLOR
+from delta_trace import ADD, apply_change
+
+"""
+Playback of steps of an algorithm on a graph drawn by GraphRenderer.
+Layout and artists stay the same for the whole animation, so a frame
+only changes colors of edges and vertices, and labels, that are
+different than in the previous frame, and is drawn with blitting.
+When steps are shown in order, only the changes recorded in the trace
+for the next step are applied, so a frame takes time proportional to
+the number of changes, not to the size of the graph.
+"""
+
+# Colors of edges and vertices, indexed by their state in a step.
+NORMAL, ACTIVE, DONE, DISCARDED, BRIDGE = range(5)
+EDGE_COLORS = np.array([to_rgba(color) for color in (
+    EDGE_COLOR, "orange", "green", "lightgray", BRIDGE_COLOR)])
+NODE_COLORS = np.array([to_rgba(color) for color in (
+    NODE_COLOR, "orange", "green")])
+
+
+class StepAnimator:
+    """
+    StepAnimator shows a single step of visualization data of an
+    algorithm on the artists of renderer, which has drawn edges on axes
+    of canvas. States of edges and vertices in a step are:
+    dfs_brute_force - the removed edge is orange, bridges found so far
+    are red,
+    tarjans_algorithm - visited vertices are green, labels show low
+    values, bridges found so far are red,
+    kaiwensun_bridges - vertices with a rank are green, labels show
+    ranks, edges removed as part of a cycle are gray and edges left
+    after the last step, which are bridges, are red,
+    chain_decomposition - edges in chains are green and edges left after
+    the last step are red.
+    The state of the current step is kept, and when the next step is
+    shown, only changes of a DeltaTrace or a StoredTrace made by it are
+    applied and only edges and vertices named in them are updated.
+    After a jump, and at the last step of algorithms which color all
+    remaining edges, states of all edges and vertices are computed.
+    The whole graph is drawn again on the copied background only when
+    labels change or more than redraw_fraction of edges change.
+    """
+
+    def __init__(self, canvas, axes, renderer, algorithm, edges,
+                 visualization_data, redraw_fraction=0.5):
+        self.canvas = canvas
+        self.axes = axes
+        self.renderer = renderer
+        self.algorithm = algorithm
+        self.visualization_data = visualization_data
+        self.keys = [(min(u, v), max(u, v)) for u, v in edges]
+        # indexes of edges with every key, parallel edges share a key
+        self.key_edges = {}
+        for index, key in enumerate(self.keys):
+            self.key_edges.setdefault(key, []).append(index)
+        self.nodes = np.asarray(renderer.nodes, dtype=np.intp)
+        self.vertices = int(self.nodes.max()) + 1 if len(self.nodes) else 0
+        self.redraw_fraction = redraw_fraction
+        # position in node_collection of every vertex, -1 if not drawn
+        self.node_index = np.full(self.vertices, -1, dtype=np.intp)
+        self.node_index[self.nodes] = np.arange(len(self.nodes))
+        # position in edge_collection of every edge, -1 if not drawn
+        self.edge_index = np.full(len(self.keys), -1, dtype=np.intp)
+        self.edge_index[renderer.drawn_edges] = np.arange(
+            len(renderer.drawn_edges))
+        self.endpoints = np.asarray(edges, dtype=np.intp).reshape(-1, 2)[
+            renderer.drawn_edges]
+        # position of the label of every vertex which has one
+        self.label_index = {int(self.nodes[i]): i
+                            for i in range(len(renderer.labels))}
+
+        # states and colors currently shown
+        self.edge_states = np.full(len(renderer.drawn_edges), -1)
+        # vertices are drawn in the color of NORMAL
+        self.node_states = np.full(len(self.nodes), NORMAL)
+        self.edge_colors = np.array(
+            renderer.edge_collection.get_colors(), dtype=float)
+        self.node_colors = np.tile(NODE_COLORS[NORMAL], (len(self.nodes), 1))
+        self.colors_changed = False  # colors not yet given to collections
+        self.label_texts = [label.get_text() for label in renderer.labels]
+        if algorithm == "dfs_brute_force":
+            self.found = np.fromiter((bool(row[1]) for row in
+                                      visualization_data), dtype=bool,
+                                     count=len(visualization_data))
+
+        self.step = -1
+        self.row = None  # state after the current step
+        self.background = None
+        self.artists = [renderer.edge_collection, renderer.node_collection] \
+            + renderer.labels
+        # changed edges and vertices, drawn on top of the previous frame
+        self.edge_overlay = LineCollection(
+            [], linewidths=renderer.edge_collection.get_linewidths()[:1])
+        self.node_overlay = axes.scatter(
+            [], [], s=renderer.node_collection.get_sizes()[:1], zorder=2)
+        axes.add_collection(self.edge_overlay, autolim=False)
+        for artist in self.artists + [self.edge_overlay, self.node_overlay]:
+            artist.set_animated(True)
+        self.draw_connection = canvas.mpl_connect("draw_event",
+                                                  self.on_draw)
+
+    def __len__(self):
+        return len(self.visualization_data)
+
+    def on_draw(self, event):
+        # After the canvas is drawn again, eg. resized, copy new background.
+        self.background = self.canvas.copy_from_bbox(self.axes.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        self.update_collections()
+        for artist in self.artists:
+            self.axes.draw_artist(artist)
+
+    def update_collections(self):
+        """
+        Gives colors to the collections of all edges and vertices.
+        Copying them takes time proportional to the size of the graph,
+        so it is done only before the whole graph is drawn.
+        """
+        if self.colors_changed:
+            self.renderer.edge_collection.set_color(self.edge_colors)
+            self.renderer.node_collection.set_facecolor(self.node_colors)
+            self.colors_changed = False
+
+    def all_states(self, step, row):
+        """
+        Returns states of all edges and all vertices, and a value
+        shown next to every vertex after step, None if there is no value.
+        Labels are None for algorithms without such values.
+        """
+        edges = np.zeros(len(self.keys), dtype=np.intp)
+        vertices = np.zeros(self.vertices, dtype=np.intp)
+        labels = None
+        last = step == len(self.visualization_data) - 1
+        if self.algorithm == "dfs_brute_force":
+            edges[:step + 1][self.found[:step + 1]] = BRIDGE
+            if not self.found[step]:
+                edges[step] = ACTIVE
+        elif self.algorithm == "tarjans_algorithm":
+            # vertices with a discovery time were visited
+            vertices[np.asarray(row[1][:self.vertices]) > 0] = DONE
+            bridges = {(min(u, v), max(u, v)) for u, v in row[3]}
+            edges[[key in bridges for key in self.keys]] = BRIDGE
+            labels = [low if disc > 0 else None
+                      for disc, low in zip(row[1], row[2])]
+        elif self.algorithm == "kaiwensun_bridges":
+            vertices[np.asarray(row[0][:self.vertices]) >= 0] = DONE
+            edges[[key not in row[1] for key in self.keys]] = DISCARDED
+            if last:
+                edges[edges == NORMAL] = BRIDGE
+            labels = [rank if rank >= 0 else None for rank in row[0]]
+        else:
+            edges[np.asarray(row[1]) > 0] = DONE
+            if last:
+                edges[edges == NORMAL] = BRIDGE
+        return (np.arange(len(self.keys)), edges,
+                np.arange(self.vertices), vertices,
+                {vertex: labels[vertex] if labels is not None else None
+                 for vertex in self.label_index})
+
+    def changed_states(self, step, row, changes):
+        """
+        Returns indexes and new states of edges and vertices changed by
+        step, which made changes to row, and new labels of vertices,
+        in the same form as all_states.
+        """
+        edges = {}
+        vertices = {}
+        labels = {}
+        if self.algorithm == "dfs_brute_force":
+            if step > 0:
+                edges[step - 1] = BRIDGE if self.found[step - 1] else NORMAL
+            edges[step] = BRIDGE if self.found[step] else ACTIVE
+        elif self.algorithm == "tarjans_algorithm":
+            bridges = None
+            for kind, field, a, b in changes:
+                if field in (1, 2):
+                    # disc or low of vertex a
+                    visited = row[1][a] > 0
+                    vertices[a] = DONE if visited else NORMAL
+                    labels[a] = row[2][a] if visited else None
+                elif field == 3:
+                    key = (min(a, b), max(a, b))
+                    if kind == ADD:
+                        state = BRIDGE
+                    else:
+                        if bridges is None:
+                            bridges = {(min(u, v), max(u, v))
+                                       for u, v in row[3]}
+                        state = BRIDGE if key in bridges else NORMAL
+                    for edge in self.key_edges.get(key, ()):
+                        edges[edge] = state
+        elif self.algorithm == "kaiwensun_bridges":
+            for kind, field, a, b in changes:
+                if field == 0:
+                    vertices[a] = DONE if row[0][a] >= 0 else NORMAL
+                    labels[a] = row[0][a] if row[0][a] >= 0 else None
+                else:
+                    key = (min(a, b), max(a, b))
+                    state = NORMAL if key in row[1] else DISCARDED
+                    for edge in self.key_edges.get(key, ()):
+                        edges[edge] = state
+        else:
+            for kind, field, a, b in changes:
+                if field == 1:
+                    edges[a] = DONE if b > 0 else NORMAL
+        vertices = {vertex: state for vertex, state in vertices.items()
+                    if vertex < self.vertices}
+        labels = {vertex: label for vertex, label in labels.items()
+                  if vertex in self.label_index}
+        return (np.fromiter(edges, dtype=np.intp, count=len(edges)),
+                np.fromiter(edges.values(), dtype=np.intp, count=len(edges)),
+                np.fromiter(vertices, dtype=np.intp, count=len(vertices)),
+                np.fromiter(vertices.values(), dtype=np.intp,
+                            count=len(vertices)),
+                labels)
+
+    def next_row(self, step):
+        """
+        Makes row the state after step and returns changes made by it,
+        or None if it was rebuilt, eg. after a jump.
+        """
+        data = self.visualization_data
+        if self.row is None or step != self.step + 1:
+            self.row = data[step]  # a trace rebuilds it from the nearest copy
+            return None
+        if not hasattr(data, "changes"):
+            self.row = data[step]  # a list of rows, changes are not saved
+            return []
+        changes = data.changes(step)
+        for change in changes:
+            apply_change(self.row, *change)
+        return changes
+
+    def show_step(self, step):
+        # Changes colors and labels that are different after step and blits.
+        changes = self.next_row(step)
+        last = step == len(self.visualization_data) - 1
+        if changes is None or last and self.algorithm in (
+                "kaiwensun_bridges", "chain_decomposition"):
+            states = self.all_states(step, self.row)
+        else:
+            states = self.changed_states(step, self.row, changes)
+        self.step = step
+        edge_ids, edges, vertex_ids, vertices, labels = states
+
+        # only drawn edges and vertices are updated
+        positions = self.edge_index[edge_ids]
+        drawn = positions >= 0
+        positions, edges = positions[drawn], edges[drawn]
+        changed = edges != self.edge_states[positions]
+        changed_edges = positions[changed]
+        if len(changed_edges):
+            self.edge_states[changed_edges] = edges[changed]
+            self.edge_colors[changed_edges] = EDGE_COLORS[edges[changed]]
+            self.colors_changed = True
+
+        positions = self.node_index[vertex_ids]
+        drawn = positions >= 0
+        positions, vertices = positions[drawn], vertices[drawn]
+        changed = vertices != self.node_states[positions]
+        changed_nodes = positions[changed]
+        if len(changed_nodes):
+            self.node_states[changed_nodes] = vertices[changed]
+            self.node_colors[changed_nodes] = NODE_COLORS[vertices[changed]]
+            self.colors_changed = True
+
+        changed_labels = False
+        for vertex, value in labels.items():
+            i = self.label_index[vertex]
+            text = str(vertex)
+            if value is not None:
+                text += ":" + str(value)
+            if text != self.label_texts[i]:
+                self.label_texts[i] = text
+                self.renderer.labels[i].set_text(text)
+                changed_labels = True
+
+        if self.background is None:
+            self.canvas.draw()  # on_draw copies background and draws artists
+        elif changed_labels or len(changed_edges) > \
+                self.redraw_fraction * len(self.edge_states):
+            self.canvas.restore_region(self.background)
+            self.draw_artists()
+        else:
+            self.draw_changes(changed_edges, changed_nodes)
+        self.canvas.blit(self.axes.bbox)
+
+    def draw_changes(self, changed_edges, changed_nodes):
+        """
+        Draws changed edges over the previous frame, and then changed
+        vertices and ends of changed edges, so they stay above edges.
+        """
+        if len(changed_edges):
+            self.edge_overlay.set_segments(
+                self.renderer.segments[changed_edges])
+            self.edge_overlay.set_color(self.edge_colors[changed_edges])
+            self.axes.draw_artist(self.edge_overlay)
+            ends = self.node_index[self.endpoints[changed_edges].ravel()]
+            changed_nodes = np.union1d(changed_nodes, ends)
+        if len(changed_nodes):
+            self.node_overlay.set_offsets(
+                self.renderer.node_collection.get_offsets()[changed_nodes])
+            self.node_overlay.set_facecolor(self.node_colors[changed_nodes])
+            self.axes.draw_artist(self.node_overlay)
+
+    def stop(self):
+        # Leaves the last shown step drawn as a normal figure.
+        self.canvas.mpl_disconnect(self.draw_connection)
+        self.edge_overlay.remove()
+        self.node_overlay.remove()
+        self.update_collections()
+        for artist in self.artists:
+            artist.set_animated(False)
+        self.canvas.draw_idle()
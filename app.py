@@ -1,13 +1,16 @@
 import sys
 from PyQt5.QtWidgets import QGridLayout, QVBoxLayout, QGroupBox, QLabel, \
     QLineEdit, QPlainTextEdit, QPushButton, QDesktopWidget, QWidget, QApplication, \
-    QStyleFactory, QMessageBox
+    QStyleFactory, QMessageBox, QProgressBar, QHBoxLayout, QFileDialog, \
+    QCheckBox
+from PyQt5.QtCore import QThread, QTimer
 from PyQt5.QtGui import QFont
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-import networkx as nx
-from graph import Graph
+from worker import AlgorithmWorker
+from step_viewer import StepViewer
+from loader import load_edges, parse_edge_text
+from validation import validate_graph
+from cache import ResultCache
+from trace_store import StoredTrace
 
 """
 Main file in the project.
@@ -15,8 +18,17 @@ It can be ran by executing python app.py.
 It is responsible for all GUI interactions of the user,
 parsing input data to algorithms and displaying visualization
 data back to the user.
+Only PyQt5 and modules using the standard library are imported at
+start. Matplotlib, NumPy and networkx, used for layout and drawing,
+are imported by load_plotting after the window is shown.
 """
 
+# Time between frames of an animation of steps, in milliseconds.
+FRAME_INTERVAL = 40
+
+# Graphs loaded from a file with more edges are not shown in the text box.
+TEXT_EDGES_LIMIT = 10000
+
 
 class PrettyWidget(QWidget):
 
@@ -26,6 +38,21 @@ class PrettyWidget(QWidget):
         # Specifies a query for a font used for drawing text
         font = QFont()
         font.setPointSize(16)
+        self.thread = None  # thread running an algorithm, if any
+        self.worker = None
+        self.layout_engine = None  # cached positions of vertices
+        # results of algorithms run before, with their steps
+        self.result_cache = ResultCache(memory_entries=8)
+        self.renderer = None  # set with layout_engine by load_plotting
+        self.figure = None
+        self.canvas = None
+        self.axes = None
+        self.result = None  # results of the last algorithm
+        self.animator = None  # plays steps of the last algorithm
+        self.loaded_edges = None  # edges of a large file, not shown as text
+        self.animation_timer = QTimer(self)
+        self.animation_timer.setInterval(FRAME_INTERVAL)
+        self.animation_timer.timeout.connect(self.next_frame)
         self.initUI()
 
     def initUI(self):
@@ -35,19 +62,59 @@ class PrettyWidget(QWidget):
         self.setWindowTitle('Finding Bridges')
 
         # Creates layout with user input and program output on the left and graph on the right
-        grid = QGridLayout()
+        grid = self.grid = QGridLayout()
         self.setLayout(grid)
         self.create_vertical_group_box()
 
         button_layout = QVBoxLayout()
         button_layout.addWidget(self.vertical_group_box)
 
-        self.figure = plt.figure()
-        self.canvas = FigureCanvas(self.figure)
-        grid.addWidget(self.canvas, 0, 1, 9, 9)
+        # replaced by the canvas of the figure once matplotlib is imported
+        self.canvas_placeholder = QWidget(self)
+        grid.addWidget(self.canvas_placeholder, 0, 1, 9, 9)
         grid.addLayout(button_layout, 0, 0)
 
+        # Play, pause and step through the steps of the last algorithm.
+        playback_layout = QHBoxLayout()
+        self.play_button = QPushButton("Play")
+        self.play_button.setEnabled(False)
+        self.play_button.clicked.connect(self.toggle_playback)
+        playback_layout.addWidget(self.play_button)
+        self.step_button = QPushButton("Step")
+        self.step_button.setEnabled(False)
+        self.step_button.clicked.connect(self.step_forward)
+        playback_layout.addWidget(self.step_button)
+        self.step_label = QLabel("")
+        playback_layout.addWidget(self.step_label)
+        playback_layout.addStretch()
+        grid.addLayout(playback_layout, 9, 1, 1, 9)
+        self.step_viewer.list_view.selectionModel().currentChanged.connect(
+            self.show_selected_step)
+
         self.show()
+        QTimer.singleShot(0, self.load_plotting)
+
+    def load_plotting(self):
+        """
+        Imports matplotlib and modules for layout and drawing, which take
+        most of the start up time, and puts the canvas in the window.
+        It is called once the window is shown, and before anything is
+        laid out or drawn, in case that happens first.
+        """
+        if self.canvas is not None:
+            return
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import \
+            FigureCanvasQTAgg as FigureCanvas
+        from layout import LayoutEngine
+        from renderer import GraphRenderer
+        self.layout_engine = LayoutEngine()
+        self.renderer = GraphRenderer()
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.grid.replaceWidget(self.canvas_placeholder, self.canvas)
+        self.canvas_placeholder.deleteLater()
+        self.canvas_placeholder = None
 
     def create_vertical_group_box(self):
         self.vertical_group_box = QGroupBox()
@@ -69,14 +136,26 @@ class PrettyWidget(QWidget):
         edges_info = QLabel(
             """Vertices labels have to be non-negative consecutive integers. \neg. 0, 1, 2...
             \nEdges are represented by pairs of connecting vertices labels,\nseparated by a comma and a space.
-            \n0, 1\n1, 2 and so on...""")
+            \n0, 1\n1, 2 and so on...
+            \nEdges can also be loaded from a text, .npy or int32 file.""")
         edges_info.setWordWrap(True)
         layout.addWidget(edges_info)
 
         # Place for user's input edges.
         self.edges_text = QPlainTextEdit(self)
+        self.edges_text.textChanged.connect(self.forget_loaded_edges)
         layout.addWidget(self.edges_text)
 
+        load_button = QPushButton("Load edges from file")
+        load_button.setObjectName("Load edges from file")
+        layout.addWidget(load_button)
+        load_button.clicked.connect(self.load_file)
+
+        open_trace_button = QPushButton("Open steps file")
+        open_trace_button.setObjectName("Open steps file")
+        layout.addWidget(open_trace_button)
+        open_trace_button.clicked.connect(self.open_trace)
+
         """
         Creates buttons for all three algorithms.
         When pressed, suitable algorithm is ran
@@ -103,140 +182,345 @@ class PrettyWidget(QWidget):
         self.vertical_group_box.setLayout(layout)
         kaiwensun_button.clicked.connect(self.kaiwensun_bridges)
 
+        chain_button = QPushButton("Chain Decomposition")
+        chain_button.setObjectName("Chain Decomposition")
+        layout.addWidget(chain_button)
+        layout.setSpacing(10)
+        self.vertical_group_box.setLayout(layout)
+        chain_button.clicked.connect(self.chain_decomposition)
+
+        # Buttons are disabled while an algorithm is running.
+        self.algorithm_buttons = [brute_force_button, tarjan_button,
+                                  kaiwensun_button, chain_button]
+
+        # Statistics make brute force slower, so they are off by default.
+        self.statistics_box = QCheckBox("Show statistics", self)
+        layout.addWidget(self.statistics_box)
+
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setFormat("%v steps")
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setObjectName("Cancel")
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+        self.cancel_button.clicked.connect(self.cancel_algorithm)
+
         output_label = QLabel("Algorithm output:")
         layout.addWidget(output_label)
 
-        self.visualization_data_text = QPlainTextEdit(self)
-        layout.addWidget(self.visualization_data_text)
+        self.step_viewer = StepViewer(self)
+        layout.addWidget(self.step_viewer)
 
     def parse_text_to_edges(self):
         """
         Parses text input provided to user, checks if it is correct
         and displays error messages.
-        Returns number of vertices and a list of lists of edges.
+        Edges are read by parse_edge_text from loader.py, or taken
+        from the last loaded file if it was too large to be shown.
+        They are checked by validate_graph: the graph does not have
+        to be connected, but every vertex must be smaller than the
+        number of vertices, and vertices without edges are isolated.
+        Returns number of vertices and an EdgeArray of edges.
         """
         try:
             number_of_vertices = int(self.vertices_text.text())
-        except:
+        except ValueError:
             self.display_error_message()
-        plain_text = self.edges_text.toPlainText()
-        text = plain_text.split("\n")
-        edges = []
-        for pair in text:
+            return None
+        if self.loaded_edges is not None:
+            edges = self.loaded_edges
+        else:
             try:
-                edges.append(list(map(int, pair.split(", "))))
-            except:
-                self.display_error_message()
+                edges = parse_edge_text(self.edges_text.toPlainText())
+            except ValueError as error:
+                self.display_error_message(str(error))
+                return None
+        if len(edges) == 0:
+            self.display_error_message()
+            return None
         # Display error message if data is not in the correct format.
-        if self.check_data(number_of_vertices, edges):
-            return number_of_vertices, edges
+        try:
+            number_of_vertices, edges, _, _ = validate_graph(
+                edges, number_of_vertices, relabel=False)
+        except ValueError as error:
+            self.display_error_message(str(error))
+            return None
+        return number_of_vertices, edges
+
+    def load_file(self):
+        """
+        Reads edges from a file chosen by the user with load_edges.
+        Small graphs are shown in the text box, so they can be edited,
+        larger ones are kept in loaded_edges until the text is changed.
+        """
+        path = QFileDialog.getOpenFileName(
+            self, "Load edges", "",
+            "Edge lists (*.txt *.csv *.gz *.npy *.bin *.i32);;All files (*)")[0]
+        if not path:
+            return
+        try:
+            number_of_vertices, edges = load_edges(path)
+        except (OSError, ValueError) as error:
+            self.display_error_message(str(error))
+            return
+        if len(edges) <= TEXT_EDGES_LIMIT:
+            self.edges_text.setPlainText(
+                "\n".join("%d, %d" % (u, v) for u, v in edges))
         else:
-            self.display_error_message()
+            self.edges_text.setPlainText("")
+            self.edges_text.setPlaceholderText(
+                "%d edges loaded from %s" % (len(edges), path))
+            self.loaded_edges = edges
+        self.vertices_text.setText(str(number_of_vertices))
+
+    def open_trace(self):
+        """
+        Opens steps of an algorithm saved in a trace file, eg. by
+        cli.py --trace-dir, and shows them like steps of an algorithm
+        run in the GUI. Steps are read from the file only when they
+        are shown, so traces larger than memory can be browsed.
+        """
+        if self.thread is not None:
+            return
+        path = QFileDialog.getOpenFileName(
+            self, "Open steps", "", "Traces (*.trace);;All files (*)")[0]
+        if not path:
+            return
+        try:
+            trace = StoredTrace(path)
+        except (OSError, ValueError) as error:
+            self.display_error_message(str(error))
+            return
+        self.forget_result()
+        self.show_result({
+            "algorithm": trace.algorithm,
+            "edges": trace.edges(),
+            "bridges": trace.bridges(),
+            "visualization_data": trace,
+            "summary": "",
+            "positions": None,  # computed by draw_graph
+            "cached": False,
+        })
+
+    def forget_result(self):
+        """
+        Stops the animation and removes steps of the last result.
+        A trace opened from a file is closed, so its memory map and
+        file are released before another one is shown.
+        """
+        self.stop_animation()
+        self.step_viewer.show_message("")
+        if self.result is not None and \
+                isinstance(self.result["visualization_data"], StoredTrace):
+            self.result["visualization_data"].close()
+        self.result = None
+
+    def forget_loaded_edges(self):
+        # Typing edges replaces edges loaded from a large file.
+        if self.edges_text.toPlainText():
+            self.loaded_edges = None
+            self.edges_text.setPlaceholderText("")
 
     # Function to alert user that input provided is wrong.
-    def display_error_message(self):
+    def display_error_message(self, message="Data provided is in the wrong format"):
         error_message_box = QMessageBox()
         error_message_box.setIcon(QMessageBox.Critical)
-        error_message_box.setInformativeText(
-            "Data provided is in the wrong format")
+        error_message_box.setInformativeText(message)
         error_message_box.setWindowTitle("Error")
         error_message_box.exec_()
 
-    def check_data(self, number_of_vertices, edges):
-        """
-        Checks if data provided by the user is in a correct format
-        and can be passed further to each algorithm.
-        Displays an error message if data is wrong.
-        """
-
-        # Check if the number of vertices given is equal to number of vertices in edges.
-        flat_list = [item for sublist in edges for item in sublist]
-        flat_list.sort()
-        vertices_set = set(flat_list)
-        if number_of_vertices != len(vertices_set):
-            return False
-        # Check if graph is connected.
-        G = nx.Graph(edges)
-        if not nx.is_connected(G):
-            return False
-        # Check if vertices start with 0
-        if flat_list[0] != 0:
-            return False
-        # Check if vertices are incremented by 1.
-        counter = 0
-        for i in vertices_set:
-            if counter != i:
-                return False
-            counter = counter + 1
-
-        return True
-
-    def draw_graph(self, edges, bridges):
+    def draw_graph(self, edges, bridges, pos=None):
         """
         Draws graph with bridges found by each algorithm.
         If an edge is a bridge, it is colored red, otherwise blue.
+        Positions of vertices are computed, unless pos is given.
+        Large graphs are drawn with less detail by GraphRenderer.
         """
+        self.load_plotting()
+        self.stop_animation()
         self.figure.clf()
-        G = nx.Graph()
-        G.add_edges_from(edges)
-        colors = []
-        for edge in G.edges:
-            if edge in bridges:
-                colors.append("red")
-            else:
-                colors.append("blue")
-        pos = nx.spring_layout(G)
-        nx.draw(G, pos, with_labels=True, edge_color=colors)
+        if pos is None:
+            pos = self.layout_engine.layout(edges)
+        self.axes = self.figure.add_subplot(111)
+        self.renderer.draw(self.axes, edges, bridges, pos)
         self.canvas.draw_idle()
 
     """
-    brute_force_dfs(self), tarjans_algorithm(self), kaiwensun_bridges(self)
-    are responsible for accepting the user input, creating graphs from it,
-    show visualization data and drawing graphs with bridges.
+    toggle_playback(self), step_forward(self), show_selected_step(self)
+    and next_frame(self) animate steps of the last algorithm on the drawn
+    graph. The layout stays the same, StepAnimator only changes colors
+    of edges and vertices, and labels, that change between steps.
+    """
+
+    def start_animation(self):
+        # Creates the animator the first time a step is shown.
+        if self.animator is None:
+            from animation import StepAnimator
+            self.animator = StepAnimator(
+                self.canvas, self.axes, self.renderer,
+                self.result["algorithm"], self.result["edges"],
+                self.result["visualization_data"])
+
+    def stop_animation(self):
+        # Leaves the current step drawn and removes the animator.
+        self.animation_timer.stop()
+        self.play_button.setText("Play")
+        if self.animator is not None:
+            self.animator.stop()
+            self.animator = None
+
+    def show_step(self, step):
+        self.start_animation()
+        self.animator.show_step(step)
+        self.step_label.setText("step " + str(step) + " of " +
+                                str(len(self.animator) - 1))
+
+    def toggle_playback(self):
+        if self.animation_timer.isActive():
+            self.animation_timer.stop()
+            self.play_button.setText("Play")
+            return
+        self.start_animation()
+        if self.animator.step >= len(self.animator) - 1:
+            self.animator.step = -1  # start again from the first step
+        self.play_button.setText("Pause")
+        self.animation_timer.start()
+
+    def step_forward(self):
+        self.animation_timer.stop()
+        self.play_button.setText("Play")
+        self.start_animation()
+        if self.animator.step < len(self.animator) - 1:
+            self.show_step(self.animator.step + 1)
+
+    def next_frame(self):
+        if self.animator.step >= len(self.animator) - 1:
+            self.animation_timer.stop()
+            self.play_button.setText("Play")
+            return
+        self.show_step(self.animator.step + 1)
+
+    def show_selected_step(self, current, previous):
+        # Shows the step selected in "Algorithm output" on the graph.
+        if self.result is not None and current.isValid():
+            self.animation_timer.stop()
+            self.play_button.setText("Play")
+            self.show_step(current.row())
+
+    """
+    brute_force_dfs(self), tarjans_algorithm(self), kaiwensun_bridges(self),
+    chain_decomposition(self) are responsible for accepting the user input,
+    creating graphs from it, show visualization data and drawing graphs
+    with bridges. Algorithms are run by an AlgorithmWorker in a separate
+    thread, so the window does not freeze while they run.
     """
 
     def brute_force_dfs(self):
-        number_of_vertices, edges = self.parse_text_to_edges()
-        graph = Graph(number_of_vertices, edges)
-        bridges = graph.dfs_brute_force()
-        visualization_data = graph.get_visualization_data()
-        text = ""
-        self.visualization_data_text.setPlainText(text)
-        for row in visualization_data:
-            text = text + "removed edge: " + \
-                str(row[0]) + "\nis a bridge? " + \
-                str(row[1]) + "\n"
-        self.visualization_data_text.setPlainText(text)
-        self.draw_graph(edges, bridges)
+        self.start_algorithm("dfs_brute_force")
 
     def tarjans_algorithm(self):
-        number_of_vertices, edges = self.parse_text_to_edges()
-        graph = Graph(number_of_vertices, edges)
-        bridges = graph.tarjans_algorithm()
-        visualization_data = graph.get_visualization_data()
-        text = ""
-        self.visualization_data_text.setPlainText(text)
-        for row in visualization_data:
-            text = text + "time: " + \
-                str(row[0]) + "\ndisc: " + \
-                str(row[1]) + "\nlow: " + str(row[2]) + \
-                "\nbridges: " + str(row[3]) + "\n"
-        self.visualization_data_text.setPlainText(text)
-        self.draw_graph(edges, bridges)
+        self.start_algorithm("tarjans_algorithm")
 
     def kaiwensun_bridges(self):
-        number_of_vertices, edges = self.parse_text_to_edges()
-        graph = Graph(number_of_vertices, edges)
-        bridges = graph.kaiwensun_bridges()
-        visualization_data = graph.get_visualization_data()
-        text = ""
-        self.visualization_data_text.setPlainText(text)
-        for row in visualization_data:
-            text = text + "rank: " + \
-                str(row[0]) + "\nedges: " + \
-                str(row[1]) + "\n"
-        self.visualization_data_text.setPlainText(text)
-        self.draw_graph(edges, bridges)
+        self.start_algorithm("kaiwensun_bridges")
+
+    def chain_decomposition(self):
+        self.start_algorithm("chain_decomposition")
+
+    def start_algorithm(self, algorithm):
+        """
+        Starts algorithm, given by the name of its method in the Graph
+        class, on the user input in a new thread. Results are shown
+        by show_result when the algorithm and layout are ready.
+        """
+        if self.thread is not None:
+            return
+        data = self.parse_text_to_edges()
+        if data is None:
+            return
+        number_of_vertices, edges = data
+
+        self.load_plotting()
+        self.thread = QThread()
+        self.worker = AlgorithmWorker(algorithm, number_of_vertices, edges,
+                                      self.layout_engine, self.result_cache,
+                                      self.statistics_box.isChecked())
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.show_progress)
+        self.worker.finished.connect(self.show_result)
+        self.worker.cancelled.connect(self.finish_algorithm)
+        self.worker.failed.connect(self.show_failure)
+
+        # brute force makes one step for every edge
+        steps = len(edges) if algorithm == "dfs_brute_force" else 0
+        self.progress_bar.setRange(0, steps)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%v steps")
+        self.forget_result()
+        self.play_button.setEnabled(False)
+        self.step_button.setEnabled(False)
+        self.step_label.setText("")
+        for button in self.algorithm_buttons:
+            button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.thread.start()
+
+    def cancel_algorithm(self):
+        # Asks the worker to stop, it finishes at its next step.
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+
+    def show_progress(self, steps):
+        if self.progress_bar.maximum():
+            self.progress_bar.setValue(min(steps, self.progress_bar.maximum()))
+
+    def show_result(self, result):
+        self.finish_algorithm()
+        self.progress_bar.setRange(0, max(len(result["visualization_data"]), 1))
+        self.progress_bar.setValue(len(result["visualization_data"]))
+        if result["cached"]:
+            self.progress_bar.setFormat("%v steps (cached)")
+        self.step_viewer.set_steps(result["algorithm"],
+                                   result["visualization_data"],
+                                   result["summary"])
+        self.draw_graph(result["edges"], result["bridges"],
+                        result["positions"])
+        self.result = result
+        has_steps = len(result["visualization_data"]) > 0
+        self.play_button.setEnabled(has_steps)
+        self.step_button.setEnabled(has_steps)
+
+    def show_failure(self, message):
+        self.finish_algorithm()
+        self.step_viewer.show_message(message)
+
+    def finish_algorithm(self):
+        # Stops the thread of the last algorithm and enables buttons.
+        if self.thread is not None:
+            self.thread.quit()
+            self.thread.wait()
+            self.worker.deleteLater()
+            self.thread.deleteLater()
+            self.thread = None
+            self.worker = None
+        self.progress_bar.setRange(0, 1)
+        for button in self.algorithm_buttons:
+            button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def closeEvent(self, event):
+        # Stops a running algorithm before the window is closed.
+        self.animation_timer.stop()
+        if self.thread is not None:
+            self.worker.cancel()
+            self.thread.quit()
+            self.thread.wait()
+        event.accept()
 
     def center(self):
         # Display app in the center of the screen.
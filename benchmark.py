@@ -0,0 +1,434 @@
+import argparse
+import csv
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from graph import Graph
+from delta_trace import run_steps
+from generators import FAMILIES, generate
+
+"""
+Benchmark suite for algorithms implemented in the project.
+Unlike performance.py, which plots time for path graphs only, it runs
+every algorithm on several families of graphs and sizes, repeats every
+measurement and saves statistics to a JSON or CSV file. Two such files
+can be compared to find out if a change made any algorithm slower.
+Memory is measured in the same run, in a separate call of every
+algorithm, because tracemalloc makes Python code a lot slower.
+Counters of work done and time of every phase, from Graph.instrument(),
+are recorded from one more call, so they do not change measured times.
+The startup command measures time of importing modules of the project
+in a new interpreter, with -X importtime, and fails if a module imports
+a heavy library, eg. NumPy or matplotlib, which it should not need.
+
+python benchmark.py run --output results.json
+python benchmark.py compare baseline.json results.json
+python benchmark.py startup
+"""
+
+# Algorithms are run with tracing turned off, adjacency is built before.
+# Names ending with "_traced" also save visualization data.
+ALGORITHMS = {
+    "adjacency": lambda graph: graph.make_array_graph(),
+    "dfs_brute_force": lambda graph: run_steps(
+        graph.dfs_brute_force_steps(trace=False)),
+    "dfs_brute_force_parallel": lambda graph: graph.dfs_brute_force_parallel(),
+    "tarjans_algorithm": lambda graph: run_steps(
+        graph.tarjans_algorithm_steps(trace=False)),
+    "tarjans_iterative": lambda graph: graph.tarjans_iterative(),
+    "parallel_bridges": lambda graph: graph.parallel_bridges(),
+    "kaiwensun_bridges": lambda graph: run_steps(
+        graph.kaiwensun_bridges_steps(trace=False)),
+    "chain_decomposition": lambda graph: run_steps(
+        graph.chain_decomposition_steps(trace=False)),
+    "incremental_bridges": lambda graph: graph.incremental_bridges(),
+    "dfs_brute_force_traced": lambda graph: graph.dfs_brute_force(),
+    "tarjans_algorithm_traced": lambda graph: graph.tarjans_algorithm(),
+    "kaiwensun_bridges_traced": lambda graph: graph.kaiwensun_bridges(),
+    "chain_decomposition_traced": lambda graph: graph.chain_decomposition(),
+}
+
+# Algorithms that take quadratic time are run only on small graphs.
+QUADRATIC = {"dfs_brute_force", "dfs_brute_force_parallel",
+             "dfs_brute_force_traced"}
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Fields of every result, in the order they are saved to CSV.
+FIELDS = ["family", "edges", "vertices", "algorithm", "repeats",
+          "min", "median", "p95", "mean", "peak_bytes", "retained_bytes",
+          "rss_bytes", "bytes_per_vertex", "bytes_per_edge",
+          "vertices_visited", "edge_relaxations", "max_stack_depth",
+          "trace_steps", "trace_bytes", "adjacency_seconds",
+          "search_seconds", "trace_seconds", "result_seconds"]
+
+# Statistics that can be compared between two runs.
+STATISTICS = ["min", "median", "p95", "mean", "peak_bytes",
+              "retained_bytes", "rss_bytes", "bytes_per_vertex",
+              "bytes_per_edge"]
+
+# Libraries which take long to import.
+HEAVY_MODULES = ["numpy", "matplotlib", "networkx", "PyQt5", "scipy"]
+
+# Modules whose import time is measured, and the heavy libraries they
+# may import. Bridge finding uses only the standard library, and the
+# GUI imports only PyQt5 before the window is shown.
+STARTUP_MODULES = {
+    "graph": [],
+    "cli": [],
+    "testing": [],
+    "worker": ["PyQt5"],
+    "app": ["PyQt5"],
+}
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of a list of values.
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[rank - 1]
+
+
+def summarize(times):
+    """
+    Returns statistics of a list of times in seconds:
+    minimum, median, 95th percentile and mean.
+    """
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "p95": percentile(times, 0.95),
+        "mean": statistics.mean(times),
+    }
+
+
+def time_algorithm(algorithm, n, edges, repeats, warmup):
+    """
+    Runs algorithm warmup times without measuring it, and then
+    repeats times on a new Graph every time.
+    Building adjacency arrays is not measured, except for
+    the "adjacency" algorithm itself.
+    Returns list of times in seconds.
+    """
+    function = ALGORITHMS[algorithm]
+    times = []
+    for i in range(warmup + repeats):
+        graph = Graph(n, [edge.copy() for edge in edges])
+        graph.get_adjacency()
+        start = time.perf_counter()
+        function(graph)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def resident_memory():
+    """
+    Returns resident set size of this process in bytes, read from
+    /proc/self/statm on Linux. On other systems peak resident set size
+    from getrusage is returned instead, or 0 if it is not available.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_memory(algorithm, n, edges):
+    """
+    Runs algorithm once on a new Graph, with adjacency built before,
+    and measures memory it allocates with tracemalloc.
+    Returns dictionary with the highest number of bytes allocated
+    on the Python heap while it runs (peak_bytes), bytes still
+    allocated when it finishes, eg. by visualization data
+    (retained_bytes), and change of resident set size (rss_bytes).
+    """
+    function = ALGORITHMS[algorithm]
+    graph = Graph(n, [edge.copy() for edge in edges])
+    graph.get_adjacency()
+    gc.collect()
+    rss_before = resident_memory()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(graph)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_after = resident_memory()
+    del result
+    return {
+        "peak_bytes": peak - before,
+        "retained_bytes": current - before,
+        "rss_bytes": rss_after - rss_before,
+        "bytes_per_vertex": (peak - before) / max(n, 1),
+        "bytes_per_edge": (peak - before) / max(len(edges), 1),
+    }
+
+
+def count_operations(algorithm, n, edges):
+    """
+    Runs algorithm once on a new instrumented Graph, with adjacency
+    built before, and returns its statistics as a dictionary: counters
+    and time of every phase. Step generators run directly only count
+    work, their phases are 0. Algorithms which are not methods of
+    Graph, eg. "adjacency", have no statistics.
+    """
+    graph = Graph(n, [edge.copy() for edge in edges])
+    graph.get_adjacency()
+    graph.instrument()
+    ALGORITHMS[algorithm](graph)
+    if graph.stats.algorithm is None and not graph.stats.vertices_visited:
+        return {}
+    return graph.stats.as_dict()
+
+
+def run_benchmarks(families, sizes, algorithms, repeats=5, warmup=1,
+                   quadratic_limit=2000, seed=0, log=None, memory=True,
+                   stats=True):
+    """
+    Measures every algorithm on every family of graphs and size.
+    Size is the number of edges a generated graph aims for.
+    Quadratic algorithms are skipped on graphs with more edges
+    than quadratic_limit. If memory is True, memory used by
+    every algorithm is measured too, and if stats is True, counters
+    and phases of every algorithm are recorded.
+    Returns list of results, one dictionary for every measurement.
+    """
+    results = []
+    for family in families:
+        for size in sizes:
+            n, edges = generate(family, size, seed)
+            for algorithm in algorithms:
+                if algorithm in QUADRATIC and len(edges) > quadratic_limit:
+                    continue
+                times = time_algorithm(algorithm, n, edges, repeats, warmup)
+                result = {"family": family, "edges": len(edges),
+                          "vertices": n, "algorithm": algorithm,
+                          "repeats": repeats}
+                result.update(summarize(times))
+                if memory:
+                    result.update(measure_memory(algorithm, n, edges))
+                if stats:
+                    result.update(count_operations(algorithm, n, edges))
+                results.append(result)
+                if log is not None:
+                    log("%-10s %9d %-26s median %.6f s %s" % (
+                        family, len(edges), algorithm, result["median"],
+                        "peak %d B (%.1f B/edge)" % (
+                            result["peak_bytes"], result["bytes_per_edge"])
+                        if memory else ""))
+    return results
+
+
+def measure_import(module, repeats=5):
+    """
+    Imports module in a new Python interpreter with -X importtime,
+    repeats times. Returns the shortest cumulative time of the import
+    in seconds and a sorted list of heavy modules loaded with it.
+    """
+    code = "import sys, %s; print(' '.join(sys.modules))" % module
+    directory = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeats):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True)
+        # lines look like "import time: self [us] | cumulative | name"
+        for line in process.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module and \
+                    parts[1].strip().isdigit():
+                seconds = int(parts[1]) / 1e6
+                best = seconds if best is None else min(best, seconds)
+    loaded = {name.split(".")[0] for name in process.stdout.split()}
+    return best, sorted(loaded.intersection(HEAVY_MODULES))
+
+
+def measure_startup(modules, repeats=5):
+    """
+    Measures import time of every module of modules, a dictionary
+    like STARTUP_MODULES. Returns list of results with the time,
+    heavy modules loaded and those of them which are not allowed.
+    """
+    results = []
+    for module, allowed in modules.items():
+        seconds, heavy = measure_import(module, repeats)
+        results.append({"module": module, "import_seconds": seconds,
+                        "heavy_modules": heavy,
+                        "unexpected": [name for name in heavy
+                                       if name not in allowed]})
+    return results
+
+
+def save_results(results, path):
+    """
+    Saves results to path, as CSV if it ends with .csv
+    and as JSON, together with details of the machine, otherwise.
+    """
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS,
+                                    extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+        return
+    document = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+
+def load_results(path):
+    # Reads list of results saved by save_results.
+    if path.endswith(".csv"):
+        with open(path, newline="") as file:
+            results = list(csv.DictReader(file))
+        for result in results:
+            for field in FIELDS:
+                if field in ("family", "algorithm") or field not in result:
+                    continue
+                if result[field] == "":
+                    del result[field]
+                    continue
+                number = float(result[field])
+                result[field] = int(number) if number.is_integer() and \
+                    field in ("edges", "vertices", "repeats") else number
+        return results
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def compare_results(baseline, current, threshold=0.1, statistic="median"):
+    """
+    Compares results measured on the same family, size and algorithm.
+    A result is a regression if statistic, a time or number of bytes,
+    is higher than in the baseline by more than threshold, eg. 0.1
+    means 10%, and an improvement if it is lower by more than threshold.
+    Results without that statistic are skipped.
+    Returns list of (key, baseline value, current value, ratio, status).
+    """
+    def key(result):
+        return (result["family"], int(result["edges"]), result["algorithm"])
+
+    baseline_times = {key(result): float(result[statistic])
+                      for result in baseline if statistic in result}
+    comparison = []
+    for result in current:
+        if key(result) not in baseline_times or statistic not in result:
+            continue
+        before = baseline_times[key(result)]
+        after = float(result[statistic])
+        ratio = after / before if before > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "same"
+        comparison.append((key(result), before, after, ratio, status))
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark bridge-finding algorithms.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="measure algorithms")
+    run.add_argument("--families", nargs="+", default=list(FAMILIES),
+                     choices=list(FAMILIES))
+    run.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                     help="numbers of edges of generated graphs")
+    run.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS),
+                     choices=list(ALGORITHMS))
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--quadratic-limit", type=int, default=2000,
+                     help="largest number of edges for brute force")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", default="benchmark.json",
+                     help="JSON or CSV file for results")
+    run.add_argument("--no-memory", dest="memory", action="store_false",
+                     help="measure only time")
+    run.add_argument("--no-stats", dest="stats", action="store_false",
+                     help="do not record counters and phases of algorithms")
+
+    compare = commands.add_parser(
+        "compare", help="compare results with a saved baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="relative change reported, eg. 0.1 is 10%%")
+    compare.add_argument("--statistic", default="median",
+                         choices=STATISTICS)
+
+    startup = commands.add_parser(
+        "startup", help="measure import time of modules of the project")
+    startup.add_argument("--modules", nargs="+",
+                         default=list(STARTUP_MODULES),
+                         choices=list(STARTUP_MODULES))
+    startup.add_argument("--repeats", type=int, default=5)
+    startup.add_argument("--max-seconds", type=float, default=None,
+                         help="fail if an import takes longer than this")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run_benchmarks(args.families, args.sizes, args.algorithms,
+                                 args.repeats, args.warmup,
+                                 args.quadratic_limit, args.seed, log=print,
+                                 memory=args.memory, stats=args.stats)
+        save_results(results, args.output)
+        return 0
+    if args.command == "startup":
+        results = measure_startup({module: STARTUP_MODULES[module]
+                                   for module in args.modules}, args.repeats)
+        failures = 0
+        for result in results:
+            slow = args.max_seconds is not None and \
+                result["import_seconds"] > args.max_seconds
+            failures += slow or bool(result["unexpected"])
+            print("%-8s %.3f s %-24s %s" % (
+                result["module"], result["import_seconds"],
+                " ".join(result["heavy_modules"]) or "-",
+                "unexpected " + " ".join(result["unexpected"])
+                if result["unexpected"] else "slow" if slow else "ok"))
+        return 1 if failures else 0
+
+    comparison = compare_results(load_results(args.baseline),
+                                 load_results(args.current),
+                                 args.threshold, args.statistic)
+    regressions = 0
+    for (family, edges, algorithm), before, after, ratio, status in \
+            comparison:
+        print("%-10s %9d %-26s %.6f -> %.6f (x%.2f) %s" % (
+            family, edges, algorithm, before, after, ratio, status))
+        regressions += status == "regression"
+    print("%d regressions in %d results" % (regressions, len(comparison)))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
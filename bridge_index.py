@@ -0,0 +1,223 @@
+from array import array
+import struct
+import sys
+from delta_trace import run_steps
+
+"""
+Index of bridges and 2-edge-connected components of a graph, made
+once by chain decomposition in O(V + E) time, which answers questions
+about single edge failures without running an algorithm again:
+- is_bridge(u, v): is (u, v) a bridge, in O(1),
+- two_edge_connected(u, v): do u and v stay connected after removing
+  any single edge, in O(1),
+- connected(u, v): are u and v in the same connected component, in O(1),
+- separating_bridges(u, v): which bridges disconnect u from v, found
+  in the bridge tree with binary lifting in O(log V) plus the number
+  of bridges returned, and separating_count(u, v) in O(log V).
+The index can be saved to bytes or a file and loaded without
+computing anything, eg. by a service which only answers questions.
+"""
+
+# First bytes of a saved index and its version.
+MAGIC = b"BRIDGEIX"
+VERSION = 1
+
+# Header of a saved index: version, vertices, components and levels.
+HEADER = struct.Struct("<4i")
+
+
+class BridgeIndex:
+    """
+    BridgeIndex keeps, in flat integer arrays:
+    - component: 2-edge-connected component label of every vertex,
+    - parent: parent of every component in the bridge forest, where
+      components are vertices and bridges are edges, or -1 for a root,
+    - bridge_u, bridge_v: the bridge to the parent of every component,
+      bridge_u is in the parent and bridge_v in the component,
+    - depth: number of bridges from a component to the root of its tree,
+    - root: root of the tree of every component, which is the same
+      for components of one connected component of the graph,
+    - up: up[k][c] is the ancestor of component c 2^k levels higher,
+      or the root, used to find the lowest common ancestor of two
+      components in O(log V) steps.
+    bridges is a set of bridges, with the smaller vertex first.
+    """
+
+    def __init__(self, component, parent, bridge_u, bridge_v, up=None):
+        """
+        Creates an index from labels of components and the bridge
+        forest. Labels must be given in preorder of the forest, so that
+        a parent has a smaller label than its children, as they are
+        given by chain decomposition. up is computed if it is None.
+        """
+        self.n = len(component)
+        self.component = component
+        self.parent = parent
+        self.bridge_u = bridge_u
+        self.bridge_v = bridge_v
+        count = len(parent)
+        self.depth = array('i', [0]) * count
+        self.root = array('i', range(count))
+        for label in range(count):
+            above = parent[label]
+            if above >= 0:
+                self.depth[label] = self.depth[above] + 1
+                self.root[label] = self.root[above]
+        self.bridges = set()
+        for label in range(count):
+            if parent[label] >= 0:
+                u, v = bridge_u[label], bridge_v[label]
+                self.bridges.add((u, v) if u < v else (v, u))
+        if up is None:
+            # roots are their own parents, so nothing goes above them
+            first = array('i', (above if above >= 0 else label
+                                for label, above in enumerate(parent)))
+            up = [first]
+            for _ in range(1, max(self.depth, default=0).bit_length()):
+                previous = up[-1]
+                up.append(array('i', map(previous.__getitem__, previous)))
+        self.up = up
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Builds an index of graph, a Graph object, by running its
+        chain decomposition, which also labels the components and
+        makes the bridge tree. Steps are not recorded, so visualization
+        data of the graph is not changed. Takes O(V + E) time.
+        """
+        bridges = run_steps(graph.chain_decomposition_steps(trace=False))
+        components = graph.get_two_edge_connected_components()
+        count = max(components, default=-1) + 1
+        parent = array('i', [-1]) * count
+        bridge_u = array('i', [-1]) * count
+        bridge_v = array('i', [-1]) * count
+        # bridges are in the same order as edges of the bridge tree
+        for (u, v), (above, label) in zip(bridges, graph.get_bridge_tree()):
+            parent[label] = above
+            bridge_u[label] = u
+            bridge_v[label] = v
+        return cls(array('i', components), parent, bridge_u, bridge_v)
+
+    def is_bridge(self, u, v):
+        # Is edge (u, v), in any orientation, a bridge.
+        return ((u, v) if u < v else (v, u)) in self.bridges
+
+    def two_edge_connected(self, u, v):
+        # Do u and v stay connected when any single edge is removed.
+        return self.component[u] == self.component[v]
+
+    def connected(self, u, v):
+        # Are u and v in the same connected component.
+        return self.root[self.component[u]] == self.root[self.component[v]]
+
+    def lowest_common_ancestor(self, a, b):
+        """
+        Returns the lowest common ancestor of components a and b in
+        the bridge forest, or -1 if they are in different trees.
+        The deeper component is first lifted to the depth of the other
+        one, then both go up by the largest jumps which keep them apart.
+        """
+        if self.root[a] != self.root[b]:
+            return -1
+        depth = self.depth
+        if depth[a] < depth[b]:
+            a, b = b, a
+        difference = depth[a] - depth[b]
+        level = 0
+        while difference:
+            if difference & 1:
+                a = self.up[level][a]
+            difference >>= 1
+            level += 1
+        if a == b:
+            return a
+        for level in range(len(self.up) - 1, -1, -1):
+            jump = self.up[level]
+            if jump[a] != jump[b]:
+                a, b = jump[a], jump[b]
+        return self.parent[a]
+
+    def separating_count(self, u, v):
+        """
+        Returns number of bridges whose removal disconnects u from v,
+        or -1 if they are not connected at all. Takes O(log V) time.
+        """
+        a, b = self.component[u], self.component[v]
+        ancestor = self.lowest_common_ancestor(a, b)
+        if ancestor < 0:
+            return -1
+        return self.depth[a] + self.depth[b] - 2 * self.depth[ancestor]
+
+    def separating_bridges(self, u, v):
+        """
+        Returns list of bridges whose removal disconnects u from v,
+        which are the bridges on the path between their components in
+        the bridge tree, in order from u to v. It is empty if u and v
+        are 2-edge-connected or not connected at all.
+        Takes O(log V) time plus the number of bridges returned.
+        """
+        a, b = self.component[u], self.component[v]
+        ancestor = self.lowest_common_ancestor(a, b)
+        if ancestor < 0:
+            return []
+        from_u = []
+        while a != ancestor:
+            from_u.append((self.bridge_v[a], self.bridge_u[a]))
+            a = self.parent[a]
+        from_v = []
+        while b != ancestor:
+            from_v.append((self.bridge_u[b], self.bridge_v[b]))
+            b = self.parent[b]
+        return from_u + from_v[::-1]
+
+    def to_bytes(self):
+        """
+        Returns the index as bytes: MAGIC, HEADER and every array as
+        little-endian int32 numbers. The set of bridges and depths are
+        not saved, they are made again from the arrays in O(V).
+        """
+        parts = [MAGIC, HEADER.pack(VERSION, self.n, len(self.parent),
+                                    len(self.up))]
+        for part in [self.component, self.parent, self.bridge_u,
+                     self.bridge_v] + self.up:
+            if sys.byteorder == "big":
+                part = array('i', part)
+                part.byteswap()
+            parts.append(part.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Loads an index saved by to_bytes.
+        Raises ValueError if data is not a saved index.
+        """
+        start = len(MAGIC) + HEADER.size
+        if data[:len(MAGIC)] != MAGIC or len(data) < start:
+            raise ValueError("data is not a saved bridge index")
+        version, n, count, levels = HEADER.unpack_from(data, len(MAGIC))
+        if version != VERSION:
+            raise ValueError("bridge index version %d is not supported"
+                             % version)
+        if len(data) != start + 4 * (n + count * (3 + levels)):
+            raise ValueError("saved bridge index is not complete")
+        parts = []
+        for size in [n, count, count, count] + [count] * levels:
+            part = array('i')
+            part.frombytes(data[start:start + 4 * size])
+            if sys.byteorder == "big":
+                part.byteswap()
+            parts.append(part)
+            start += 4 * size
+        component, parent, bridge_u, bridge_v = parts[:4]
+        return cls(component, parent, bridge_u, bridge_v, parts[4:])
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
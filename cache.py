@@ -0,0 +1,252 @@
+from collections import OrderedDict
+from array import array
+from itertools import chain
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+from loader import EdgeArray
+
+"""
+Cache of results of bridge-finding algorithms.
+Results are looked up by a hash of the graph and the name of the
+algorithm, so running an algorithm again on the same graph, eg. after
+pressing the same button twice or in a batch job over graphs which did
+not change, only reads the saved result. Recently used results are kept
+in memory, and optionally in an SQLite file, so they are kept between
+runs of the program and shared by processes of cli.py.
+"""
+
+# Graphs with at least this many edges are hashed with NumPy.
+NUMPY_EDGES = 100000
+
+
+def flat_endpoints(edges):
+    # Endpoints of all edges in one flat int32 array('i') or NumPy array.
+    if isinstance(edges, EdgeArray):
+        return edges.endpoints
+    return array('i', chain.from_iterable(edges))
+
+
+def graph_hash(n, edges, endpoints=None):
+    """
+    Canonical hash of a graph with n vertices. It does not depend on
+    the order of edges or of vertices in an edge, but repeated edges
+    are counted, because parallel edges are never bridges.
+    Every edge is packed into one 64-bit number before sorting.
+    endpoints can be given if flat_endpoints(edges) was already made.
+    """
+    if endpoints is None:
+        endpoints = flat_endpoints(edges)
+    data = None
+    if len(edges) >= NUMPY_EDGES:
+        try:
+            import numpy as np
+
+            pairs = np.frombuffer(endpoints, dtype=np.intc).reshape(-1, 2) \
+                if isinstance(endpoints, array) else \
+                np.asarray(endpoints).reshape(-1, 2)
+            pairs = pairs.astype(np.int64)
+            keys = (pairs.min(axis=1) << 32) | pairs.max(axis=1)
+            keys.sort()
+            data = keys.tobytes()
+        except ImportError:
+            pass
+    if data is None:
+        pairs = iter(endpoints)
+        data = array('q', sorted((min(u, v) << 32) | max(u, v) for u, v in
+                                 zip(pairs, pairs))).tobytes()
+    digest = hashlib.sha1(str(n).encode() + b":")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def order_hash(edges, endpoints=None):
+    """
+    Hash of edges in their exact order. Steps of algorithms refer to
+    edges by their index, so a trace can be used only for the same order.
+    """
+    if endpoints is None:
+        endpoints = flat_endpoints(edges)
+    if not isinstance(endpoints, array):
+        import numpy as np
+
+        endpoints = np.ascontiguousarray(endpoints, dtype=np.intc)
+    return hashlib.sha1(endpoints).hexdigest()
+
+
+class ResultCache:
+    """
+    ResultCache keeps results of algorithms, which are bridges,
+    labels of 2-edge-connected components and the bridge tree if the
+    algorithm finds them, and, if traces is True, visualization data.
+    At most memory_entries results are kept in memory, least recently
+    used are removed first. If directory is given, results are also
+    saved in an SQLite file in it, compressed. Results not used for
+    max_age seconds are removed from it, and then least recently used
+    ones until the file holds at most max_bytes of results.
+    hits and misses count lookups, for the status shown to the user.
+    """
+
+    def __init__(self, memory_entries=32, directory=None,
+                 max_bytes=256 * 1024 * 1024, max_age=30 * 24 * 3600,
+                 traces=True):
+        self.memory_entries = memory_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.traces = traces
+        self.memory = OrderedDict()  # key -> result
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            with self.connect() as connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY "
+                    "KEY, size INTEGER, used REAL, data BLOB)")
+
+    def connect(self):
+        """
+        Opens the SQLite file. A new connection is made every time,
+        so one cache can be used from the worker thread of the GUI and
+        many processes can use the same directory.
+        """
+        return sqlite3.connect(os.path.join(self.directory, "results.sqlite"),
+                               timeout=30)
+
+    def key(self, n, edges, algorithm, endpoints=None):
+        return algorithm + ":" + graph_hash(n, edges, endpoints)
+
+    def lookup(self, n, edges, algorithm, trace=False, endpoints=None):
+        """
+        Returns saved result of algorithm for the graph, a dictionary
+        with bridges, components, bridge_tree, order and trace, or None.
+        If trace is True, only a result with visualization data
+        for edges in the same order is returned.
+        """
+        if endpoints is None:
+            endpoints = flat_endpoints(edges)
+        key = self.key(n, edges, algorithm, endpoints)
+        result = self.memory.get(key)
+        if result is not None:
+            self.memory.move_to_end(key)
+        elif self.directory is not None:
+            result = self.load(key)
+            if result is not None:
+                self.remember(key, result)
+        if result is not None and trace and (
+                result["trace"] is None or
+                result["order"] != order_hash(edges, endpoints)):
+            result = None
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def store(self, n, edges, algorithm, bridges, components=(),
+              bridge_tree=(), trace=None, endpoints=None):
+        # Saves a result of algorithm in memory and on disk.
+        if endpoints is None:
+            endpoints = flat_endpoints(edges)
+        key = self.key(n, edges, algorithm, endpoints)
+        if not self.traces:
+            trace = None
+        result = {
+            "bridges": list(bridges),
+            "components": list(components),
+            "bridge_tree": list(bridge_tree),
+            "order": order_hash(edges, endpoints) if trace is not None
+            else None,
+            "trace": trace,
+        }
+        self.remember(key, result)
+        if self.directory is not None:
+            self.save(key, result)
+        return result
+
+    def remember(self, key, result):
+        if self.memory_entries <= 0:
+            return
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def load(self, key):
+        # Reads a result from the SQLite file and marks it as used.
+        with self.connect() as connection:
+            row = connection.execute("SELECT data FROM results WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE results SET used = ? WHERE key = ?",
+                               (time.time(), key))
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def save(self, key, result):
+        data = zlib.compress(pickle.dumps(result, pickle.HIGHEST_PROTOCOL), 1)
+        if len(data) > self.max_bytes:
+            return  # it would remove everything else
+        with self.connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO results VALUES "
+                               "(?, ?, ?, ?)", (key, len(data), time.time(),
+                                                sqlite3.Binary(data)))
+            self.evict(connection)
+
+    def evict(self, connection):
+        """
+        Removes results not used for max_age seconds, and then least
+        recently used results while there are more than max_bytes.
+        """
+        connection.execute("DELETE FROM results WHERE used < ?",
+                           (time.time() - self.max_age,))
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = []
+        for key, size in connection.execute(
+                "SELECT key, size FROM results ORDER BY used, rowid"):
+            if total <= self.max_bytes:
+                break
+            removed.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM results WHERE key = ?", removed)
+
+    def clear(self):
+        self.memory.clear()
+        if self.directory is not None:
+            with self.connect() as connection:
+                connection.execute("DELETE FROM results")
+
+    def run(self, graph, algorithm, trace=True, progress=None):
+        """
+        Returns bridges found by algorithm, a name of a method of graph,
+        from the cache if possible. Otherwise the algorithm is run and
+        its result is saved. Visualization data, components and the
+        bridge tree of graph are set just like after running algorithm,
+        but visualization data is empty if trace is False and it was
+        not saved. Bridges are the same as in the first run, they may
+        be in a different order if edges are.
+        """
+        endpoints = flat_endpoints(graph.edges)
+        result = self.lookup(graph.n, graph.edges, algorithm,
+                             trace and self.traces, endpoints)
+        if result is None:
+            method = getattr(graph, algorithm)
+            bridges = method(progress) if progress is not None else method()
+            visualization_data = graph.get_visualization_data()
+            self.store(graph.n, graph.edges, algorithm, bridges,
+                       graph.get_two_edge_connected_components(),
+                       graph.get_bridge_tree(),
+                       visualization_data if trace else None, endpoints)
+            return bridges
+        graph.visualization_data = result["trace"] \
+            if trace and result["trace"] is not None else []
+        graph.two_edge_components = list(result["components"])
+        graph.bridge_tree = list(result["bridge_tree"])
+        return list(result["bridges"])
@@ -0,0 +1,389 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import resource_tracker, shared_memory
+from graph import Graph
+from delta_trace import run_steps
+from loader import EdgeArray, load_edges
+from cache import ResultCache, flat_endpoints
+from trace_store import StoredTrace
+
+"""
+Command-line tool which finds bridges in many graphs without the GUI.
+Graphs are read from files, or from all graph files in directories,
+by loader.py, and every graph is processed by a separate task of
+a process pool, so all cores are used. Small graphs are read by the
+worker itself, so only the path is sent to it. Large graphs are read
+once by the main process, and their adjacency arrays are put in shared
+memory, which workers use directly instead of receiving a pickled copy.
+With --cache-dir results are saved in a ResultCache, so graphs which
+did not change since the last run are not processed again.
+With --trace-dir steps of every graph are written straight to a trace
+file by trace_store.py, instead of memory and the JSON results, so they
+can be saved for graphs too large for --trace and opened in the GUI.
+Only modules of the project and the standard library are imported.
+
+python cli.py graphs/ --algorithm tarjans_iterative --output bridges.csv
+"""
+
+# Algorithms which can be run, and whether they can save a trace.
+ALGORITHMS = {
+    "dfs_brute_force": True,
+    "tarjans_algorithm": True,
+    "tarjans_iterative": False,
+    "kaiwensun_bridges": True,
+    "chain_decomposition": True,
+}
+
+# Algorithms which can write their trace to a file, with --trace-dir.
+STREAMED = ("tarjans_algorithm", "kaiwensun_bridges", "chain_decomposition")
+
+# Files in directories with these extensions are read as graphs.
+SUFFIXES = (".txt", ".csv", ".edges", ".el", ".gz", ".npy", ".bin", ".i32")
+
+# Files larger than this are sent to workers through shared memory.
+SHARED_MEMORY_BYTES = 16 * 1024 * 1024
+
+# Fields of every result in a CSV file.
+FIELDS = ["file", "algorithm", "vertices", "edges", "bridge_count",
+          "seconds", "cached", "bridges", "trace_file", "error"]
+
+
+def find_files(paths):
+    """
+    Returns list of graph files given by paths. Directories are
+    searched recursively for files with one of SUFFIXES, in sorted order.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for directory, subdirectories, names in os.walk(path):
+            subdirectories.sort()
+            for name in sorted(names):
+                if name.lower().endswith(SUFFIXES):
+                    files.append(os.path.join(directory, name))
+    return files
+
+
+def find_bridges(graph, algorithm, trace):
+    """
+    Runs algorithm on graph, with visualization data only if trace
+    is True. Returns bridges and visualization data, or None.
+    """
+    if algorithm == "tarjans_iterative":
+        return graph.tarjans_iterative(), None
+    if trace:
+        bridges = getattr(graph, algorithm)()
+        return bridges, graph.get_visualization_data()
+    steps = getattr(graph, algorithm + "_steps")(trace=False)
+    return run_steps(steps), None
+
+
+def trace_file(trace_directory, path, algorithm):
+    """
+    Path of the trace file of a graph file in trace_directory.
+    A short hash of the absolute path of the graph is added to the
+    name, so files with the same name in different directories,
+    processed at the same time, do not overwrite each other's traces.
+    """
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    return os.path.join(trace_directory, "%s.%s.%s.trace" % (
+        os.path.basename(path), digest, algorithm))
+
+
+def run_graph(path, graph, algorithm, trace, cache_directory=None,
+              trace_directory=None):
+    """
+    Finds bridges in graph and returns a result dictionary.
+    If cache_directory is given, a saved result is used if there
+    is one, otherwise the new result is saved there.
+    If trace_directory is given, steps are written to a trace file
+    there, whose path is saved in the result, and the cache is not
+    read, because a cached result has no trace file.
+    """
+    start = time.perf_counter()
+    cached = None
+    if trace_directory is not None:
+        graph.stream_trace(trace_file(trace_directory, path, algorithm))
+        trace = True
+    if cache_directory is not None:
+        cache = ResultCache(memory_entries=0, directory=cache_directory)
+        endpoints = flat_endpoints(graph.edges)
+        if trace_directory is None:
+            cached = cache.lookup(graph.n, graph.edges, algorithm, trace,
+                                  endpoints)
+    if cached is not None:
+        bridges, steps = cached["bridges"], cached["trace"]
+    else:
+        bridges, steps = find_bridges(graph, algorithm, trace)
+        if cache_directory is not None:
+            cache.store(graph.n, graph.edges, algorithm, bridges,
+                        graph.get_two_edge_connected_components(),
+                        graph.get_bridge_tree(),
+                        steps if trace_directory is None else None,
+                        endpoints)
+    result = {
+        "file": path,
+        "algorithm": algorithm,
+        "vertices": graph.n,
+        "edges": len(graph.edges),
+        "bridge_count": len(bridges),
+        "seconds": time.perf_counter() - start,
+        "cached": cached is not None,
+        "bridges": [[int(u), int(v)] for u, v in bridges],
+    }
+    if isinstance(steps, StoredTrace):
+        result["trace_file"] = steps.path
+        steps.close()
+    elif trace and steps is not None:
+        result["trace"] = list(steps)
+    return result
+
+
+def run_file(path, algorithm, trace, cache_directory=None,
+             trace_directory=None):
+    # Task of a worker: reads a small graph from path and processes it.
+    n, edges = load_edges(path)
+    return run_graph(path, Graph(n, edges), algorithm, trace,
+                     cache_directory, trace_directory)
+
+
+def share_graph(n, edges):
+    """
+    Builds adjacency arrays of a graph and copies them, together with
+    its endpoints, to a new block of shared memory.
+    Returns the block and sizes of the arrays in it.
+    """
+    offsets, targets, edge_ids = Graph(n, edges).get_adjacency()
+    parts = [offsets, targets, edge_ids, edges.endpoints]
+    sizes = [len(part) for part in parts]
+    block = shared_memory.SharedMemory(create=True,
+                                       size=max(4 * sum(sizes), 1))
+    start = 0
+    for part in parts:
+        data = memoryview(part).cast("B")
+        block.buf[start:start + len(data)] = data
+        start += len(data)
+    return block, sizes
+
+
+def attach(name):
+    """
+    Opens a block of shared memory created by the main process.
+    Only the main process removes it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every opened block is registered with the
+        # resource tracker, but workers use the tracker of the main
+        # process, started by run_batch, where the block is already
+        # registered, so it is still removed only once, by release().
+        return shared_memory.SharedMemory(name=name)
+
+
+def run_shared(path, name, n, sizes, algorithm, trace,
+               cache_directory=None, trace_directory=None):
+    """
+    Task of a worker: processes a large graph in shared memory.
+    Targets, edge ids and endpoints are used without copying, as
+    read-only views, only offsets are copied, because algorithms
+    change a copy of offsets[:-1].
+    """
+    block = attach(name)
+    views = []
+    try:
+        start = 0
+        for size in sizes:
+            views.append(block.buf[start:start + 4 * size].cast("i")
+                         .toreadonly())
+            start += 4 * size
+        offsets, targets, edge_ids, endpoints = views
+        graph = Graph(n, EdgeArray(endpoints))
+        graph.adjacency = (array('i', offsets), targets, edge_ids)
+        result = run_graph(path, graph, algorithm, trace, cache_directory,
+                           trace_directory)
+        del graph
+        return result
+    finally:
+        for view in views:
+            view.release()
+        block.close()
+
+
+def failed(path, algorithm, error):
+    # Result of a graph which could not be processed.
+    return {"file": path, "algorithm": algorithm,
+            "error": "%s: %s" % (type(error).__name__, error)}
+
+
+def release(block):
+    # Removes a block of shared memory after its graph is processed.
+    block.close()
+    block.unlink()
+
+
+def run_batch(files, algorithm, trace=False, workers=None,
+              shared_memory_bytes=SHARED_MEMORY_BYTES, log=None,
+              cache_directory=None, trace_directory=None):
+    """
+    Processes every file with algorithm in a pool of workers processes,
+    one for every core if workers is None.
+    Files larger than shared_memory_bytes are read by the main process
+    and sent through shared memory, at most one for every worker at
+    once, so that memory used by them stays bounded.
+    log is called with every result, in the same order as files.
+    Results are saved in, and read from, cache_directory if it is given.
+    Steps are written to trace files in trace_directory if it is given.
+    Returns list of results, in the same order as files.
+    Raises ValueError if algorithm cannot write a trace file and
+    trace_directory is given.
+    """
+    if trace_directory is not None and algorithm not in STREAMED:
+        raise ValueError("%s does not write a trace file" % algorithm)
+    results = [None] * len(files)
+    limit = workers or os.cpu_count() or 1
+    futures = {}  # future -> index of its file
+    shared = {}  # future -> shared memory block of a large graph
+    # Workers have to share the resource tracker of this process, which
+    # removes blocks left by a crash, so it is started before them.
+    if os.name == "posix":
+        resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for index, path in enumerate(files):
+                try:
+                    large = os.path.getsize(path) > shared_memory_bytes
+                    if large:
+                        while len(shared) >= limit:
+                            done, _ = wait(list(shared),
+                                           return_when=FIRST_COMPLETED)
+                            for future in done:
+                                release(shared.pop(future))
+                        n, edges = load_edges(path)
+                        block, sizes = share_graph(n, edges)
+                except (OSError, ValueError) as error:
+                    results[index] = failed(path, algorithm, error)
+                    continue
+                if large:
+                    future = executor.submit(run_shared, path, block.name, n,
+                                             sizes, algorithm, trace,
+                                             cache_directory, trace_directory)
+                    shared[future] = block
+                else:
+                    future = executor.submit(run_file, path, algorithm, trace,
+                                             cache_directory, trace_directory)
+                futures[future] = index
+
+            for future, index in futures.items():
+                try:
+                    results[index] = future.result()
+                except Exception as error:
+                    results[index] = failed(files[index], algorithm, error)
+                if future in shared:
+                    release(shared.pop(future))
+        finally:
+            for block in shared.values():
+                release(block)
+    if log is not None:
+        for result in results:
+            log(result)
+    return results
+
+
+def save_results(results, file, output_format):
+    """
+    Writes results to file as JSON, with one result in a line, or as
+    CSV with one row for every graph and bridges written as "u-v" pairs
+    separated by spaces.
+    """
+    if output_format == "json":
+        # one result in a line, sets in steps of kaiwensun_bridges
+        # are saved as sorted lists
+        file.write("{\"results\": [\n")
+        file.write(",\n".join(json.dumps(result, default=sorted)
+                              for result in results))
+        file.write("\n]}\n")
+        return
+    writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results:
+        row = dict(result)
+        if "bridges" in row:
+            row["bridges"] = " ".join("%d-%d" % (u, v)
+                                      for u, v in row["bridges"])
+        writer.writerow(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Find bridges in graphs read from files.")
+    parser.add_argument("paths", nargs="+",
+                        help="graph files or directories with them")
+    parser.add_argument("--algorithm", default="tarjans_iterative",
+                        choices=list(ALGORITHMS))
+    parser.add_argument("--format", dest="output_format", default=None,
+                        choices=["json", "csv"],
+                        help="format of results, by default given by "
+                        "the extension of --output, or JSON")
+    parser.add_argument("--output", default=None,
+                        help="file for results, standard output by default")
+    parser.add_argument("--trace", action="store_true",
+                        help="save steps of the algorithm, only in JSON")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes, one per core by default")
+    parser.add_argument("--shared-memory-bytes", type=int,
+                        default=SHARED_MEMORY_BYTES,
+                        help="files larger than this are sent to workers "
+                        "through shared memory")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory where results are saved, so graphs "
+                        "which did not change are not processed again")
+    parser.add_argument("--trace-dir", default=None,
+                        help="directory where steps of every graph are "
+                        "written to a trace file, instead of memory")
+    args = parser.parse_args(argv)
+
+    output_format = args.output_format
+    if output_format is None:
+        output_format = "csv" if args.output and \
+            args.output.lower().endswith(".csv") else "json"
+    if args.trace and output_format != "json":
+        parser.error("--trace can be saved only as JSON")
+    if args.trace and not ALGORITHMS[args.algorithm]:
+        parser.error("%s does not save a trace" % args.algorithm)
+    if args.trace_dir is not None and args.algorithm not in STREAMED:
+        parser.error("%s does not write a trace file" % args.algorithm)
+    if args.trace and args.trace_dir is not None:
+        parser.error("--trace and --trace-dir cannot be used together")
+
+    files = find_files(args.paths)
+    if args.trace_dir is not None:
+        os.makedirs(args.trace_dir, exist_ok=True)
+
+    def log(result):
+        if "error" in result:
+            print("%s: %s" % (result["file"], result["error"]),
+                  file=sys.stderr)
+
+    results = run_batch(files, args.algorithm, args.trace, args.workers,
+                        args.shared_memory_bytes, log, args.cache_dir,
+                        args.trace_dir)
+    if args.output is None:
+        save_results(results, sys.stdout, output_format)
+    else:
+        with open(args.output, "w", newline="") as file:
+            save_results(results, file, output_format)
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
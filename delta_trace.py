@@ -0,0 +1,200 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+
+"""
+Compact storage for step-by-step execution of the algorithms.
+Instead of copying the whole state (eg. disc and low arrays) at every
+step, only changes made since the previous step are recorded, such as
+"disc[v] = t" or "discard edge (u, v)". Full copies of the state are
+kept only every now and then, so that any step can be rebuilt by
+applying a bounded number of changes to the nearest copy.
+"""
+
+# Kinds of changes that can be recorded in a trace.
+SET = 0  # state[field][a] = b
+ASSIGN = 1  # state[field] = a
+ADD = 2  # pair (a, b) is appended to a list or added to a set
+DISCARD = 3  # pair (a, b) is removed from a list or a set
+
+
+def apply_change(state, kind, field, a, b):
+    """
+    Applies one recorded change to state, which is a list of fields.
+    Every field is either an integer, a list or a set.
+    """
+    if kind == SET:
+        state[field][a] = b
+    elif kind == ASSIGN:
+        state[field] = a
+    elif kind == ADD:
+        if isinstance(state[field], set):
+            state[field].add((a, b))
+        else:
+            state[field].append((a, b))
+    elif isinstance(state[field], set):
+        state[field].discard((a, b))
+    else:
+        state[field].remove((a, b))
+
+
+def run_steps(steps, consumer=None, progress=None):
+    """
+    Pulls every step from a step generator of the Graph class
+    and passes its list of changes to consumer, if given.
+    progress, if given, is called with the number of steps pulled
+    so far after every step. It can raise an exception to stop.
+    Returns value returned by the generator, eg. list of bridges.
+    """
+    count = 0
+    while True:
+        try:
+            changes = next(steps)
+        except StopIteration as stop:
+            return stop.value
+        if consumer is not None:
+            consumer(changes)
+        if progress is not None:
+            count += 1
+            progress(count)
+
+
+def copy_state(state):
+    # integers are immutable, lists and sets have to be copied
+    return [field if isinstance(field, int) else field.copy()
+            for field in state]
+
+
+class DeltaTrace(Sequence):
+    """
+    DeltaTrace holds step-by-step execution of an algorithm.
+    The state of an algorithm is a list of fields, eg. [time, disc,
+    low, bridges] for Tarjan's algorithm, and it is exactly what a row
+    of visualization data looks like. Changes are stored in four flat
+    arrays, with the index of the last change of every step, and a full
+    copy of the state is saved once the number of changes since the
+    previous copy reaches the size of the state. This way copies never
+    take more memory than the changes themselves, and rebuilding any
+    step applies at most that many changes.
+    Indexing and iterating over a trace gives the same rows as the
+    old list of snapshots, but they are created only on demand.
+    """
+
+    def __init__(self, state, checkpoint_interval=64):
+        """
+        Creates an empty trace starting from state, a list of fields.
+        checkpoint_interval is the smallest number of changes
+        between two full copies of the state.
+        """
+        self.checkpoint_interval = checkpoint_interval
+        self.kinds = array('b')
+        self.fields = array('b')
+        self.first = array('q')  # first argument of every change
+        self.second = array('q')  # second argument of every change
+        self.step_ends = array('q')  # number of changes after every step
+        self.state = copy_state(state)  # state after the last change
+        # full copies of the state and number of changes applied to them
+        self.checkpoint_positions = [0]
+        self.checkpoints = [copy_state(state)]
+
+    def record(self, kind, field, a, b=0):
+        # Saves a single change and applies it to the current state.
+        self.kinds.append(kind)
+        self.fields.append(field)
+        self.first.append(a)
+        self.second.append(b)
+        apply_change(self.state, kind, field, a, b)
+
+    def set(self, field, index, value):
+        self.record(SET, field, index, value)
+
+    def assign(self, field, value):
+        self.record(ASSIGN, field, value)
+
+    def add(self, field, a, b):
+        self.record(ADD, field, a, b)
+
+    def discard(self, field, a, b):
+        self.record(DISCARD, field, a, b)
+
+    def record_step(self, changes):
+        # Saves a list of (kind, field, a, b) changes as one step.
+        for change in changes:
+            self.record(*change)
+        self.step()
+
+    def step(self):
+        """
+        Finishes current step, which then consists of all changes
+        recorded since the previous step.
+        """
+        position = len(self.kinds)
+        self.step_ends.append(position)
+        state_size = sum(1 if isinstance(field, int) else len(field)
+                         for field in self.state)
+        since_checkpoint = position - self.checkpoint_positions[-1]
+        if since_checkpoint >= max(self.checkpoint_interval, state_size):
+            self.checkpoint_positions.append(position)
+            self.checkpoints.append(copy_state(self.state))
+
+    def replay(self, state, start, end):
+        # Applies changes with indexes from start to end to state.
+        kinds, fields = self.kinds, self.fields
+        first, second = self.first, self.second
+        for i in range(start, end):
+            apply_change(state, kinds[i], fields[i], first[i], second[i])
+
+    def changes(self, index):
+        # List of (kind, field, a, b) changes made by step index.
+        if index < 0:
+            index += len(self)
+        start = self.step_ends[index - 1] if index > 0 else 0
+        end = self.step_ends[index]
+        return list(zip(self.kinds[start:end], self.fields[start:end],
+                        self.first[start:end], self.second[start:end]))
+
+    def __len__(self):
+        return len(self.step_ends)
+
+    def __getitem__(self, index):
+        """
+        Rebuilds the state after step index from the nearest copy.
+        Slices return a list of rows.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trace index out of range")
+        end = self.step_ends[index]
+        nearest = bisect_right(self.checkpoint_positions, end) - 1
+        state = copy_state(self.checkpoints[nearest])
+        self.replay(state, self.checkpoint_positions[nearest], end)
+        return state
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, index):
+        """
+        Yields states after step index and every step after it.
+        Only the first one is rebuilt from a copy, later steps are
+        rebuilt one after another from a single state.
+        """
+        if index > 0:
+            state = self[index - 1]
+            start = self.step_ends[index - 1]
+        else:
+            state = copy_state(self.checkpoints[0])
+            start = 0
+        for end in self.step_ends[index:]:
+            self.replay(state, start, end)
+            start = end
+            yield copy_state(state)
+
+    def nbytes(self):
+        # Approximate number of bytes used by recorded changes.
+        return sum(buffer.itemsize * len(buffer) for buffer in (
+            self.kinds, self.fields, self.first, self.second,
+            self.step_ends))
@@ -0,0 +1,161 @@
+import random
+from math import isqrt
+
+"""
+Generators of graph families used in benchmarks and tests.
+Every generator takes the number of edges m it should aim for and
+a random.Random object, so that the same seed always gives the same
+graph. It returns the number of vertices and a list of lists of edges,
+which can be passed straight to the Graph class.
+"""
+
+
+def random_graph(m, rng):
+    """
+    Random G(n, m) graph with n = m / 2 vertices and m distinct edges
+    chosen uniformly at random. It is usually not connected.
+    """
+    n = max(2, m // 2)
+    m = min(m, n * (n - 1) // 2)
+    seen = set()
+    edges = []
+    while len(edges) < m:
+        u = rng.randrange(n)
+        v = rng.randrange(n)
+        if u == v or (min(u, v), max(u, v)) in seen:
+            continue
+        seen.add((min(u, v), max(u, v)))
+        edges.append([u, v])
+    return n, edges
+
+
+def cycle_graph(m, rng):
+    # Single cycle with m vertices and m edges, there are no bridges.
+    n = max(3, m)
+    return n, [[i, (i + 1) % n] for i in range(n)]
+
+
+def grid_graph(m, rng):
+    """
+    Square grid, where every vertex is connected to the vertex
+    on the right and below. It has about m edges and no bridges.
+    """
+    side = max(2, isqrt(m // 2))
+    edges = []
+    for row in range(side):
+        for column in range(side):
+            vertex = row * side + column
+            if column + 1 < side:
+                edges.append([vertex, vertex + 1])
+            if row + 1 < side:
+                edges.append([vertex, vertex + side])
+    return side * side, edges
+
+
+def tree_graph(m, rng):
+    # Random recursive tree with m edges, every edge is a bridge.
+    n = m + 1
+    return n, [[vertex, rng.randrange(vertex)] for vertex in range(1, n)]
+
+
+def cactus_graph(m, rng):
+    """
+    Connected graph in which every edge belongs to at most one cycle.
+    New vertices are attached to a random existing vertex either
+    by a single edge, which is a bridge, or by a cycle of length 3 to 8.
+    """
+    n = 1
+    edges = []
+    while len(edges) < m:
+        vertex = rng.randrange(n)
+        length = rng.randint(2, 8)
+        if length == 2 or len(edges) + length > m:
+            edges.append([vertex, n])
+            n += 1
+            continue
+        cycle = [vertex] + list(range(n, n + length - 1))
+        for i in range(length):
+            edges.append([cycle[i], cycle[(i + 1) % length]])
+        n += length - 1
+    return n, edges
+
+
+def power_law_graph(m, rng, degree=3):
+    """
+    Preferential attachment graph, as described by Barabasi and Albert.
+    Every new vertex is connected to degree different vertices chosen
+    with probability proportional to their degree.
+    """
+    n = max(degree + 1, m // degree)
+    edges = [[u, v] for u in range(degree + 1) for v in range(u)]
+    endpoints = [vertex for edge in edges for vertex in edge]
+    for vertex in range(degree + 1, n):
+        neighbors = set()
+        while len(neighbors) < degree:
+            neighbors.add(rng.choice(endpoints))
+        for neighbor in neighbors:
+            edges.append([vertex, neighbor])
+            endpoints.append(vertex)
+            endpoints.append(neighbor)
+    return n, edges
+
+
+def dense_graph(m, rng, density=0.5):
+    # Random graph where every pair of vertices is an edge with given density.
+    n = max(2, isqrt(int(2 * m / density)))
+    edges = [[u, v] for u in range(n) for v in range(u)
+             if rng.random() < density]
+    return n, edges
+
+
+def multigraph(m, rng):
+    """
+    Random graph with about a quarter of its m edges repeated, in
+    either direction, and a few self-loops. Parallel edges and loops
+    are never bridges.
+    """
+    n, edges = random_graph(m - m // 4, rng)
+    for _ in range(m // 4):
+        u, v = rng.choice(edges)
+        if rng.random() < 0.1:
+            edges.append([u, u])
+        else:
+            edges.append([v, u] if rng.random() < 0.5 else [u, v])
+    rng.shuffle(edges)
+    return n, edges
+
+
+def disconnected_graph(m, rng):
+    """
+    Trees, cactus graphs and random graphs side by side, with about m
+    edges together, some isolated vertices, and labels shuffled so that
+    no component is made of consecutive vertices.
+    """
+    parts = [tree_graph, cactus_graph, random_graph]
+    n = 0
+    edges = []
+    while len(edges) < m:
+        size = rng.randint(1, max(1, m // 3))
+        part_n, part_edges = rng.choice(parts)(min(size, m - len(edges)), rng)
+        edges.extend([u + n, v + n] for u, v in part_edges)
+        n += part_n + rng.randint(0, 2)  # and isolated vertices
+    labels = list(range(n))
+    rng.shuffle(labels)
+    return n, [[labels[u], labels[v]] for u, v in edges]
+
+
+# Names of graph families used by benchmarks and tests.
+FAMILIES = {
+    "random": random_graph,
+    "cycle": cycle_graph,
+    "grid": grid_graph,
+    "tree": tree_graph,
+    "cactus": cactus_graph,
+    "power_law": power_law_graph,
+    "dense": dense_graph,
+}
+
+
+def generate(family, m, seed=0):
+    # Returns (n, edges) of a graph from family with about m edges.
+    return FAMILIES[family](m, random.Random(seed))
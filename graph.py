@@ -1,6 +1,74 @@
-import networkx as nx
-import matplotlib.pyplot as plt
-from collections import defaultdict
+from array import array
+from itertools import chain
+from time import perf_counter
+import os
+from incremental import IncrementalBridges
+from delta_trace import DeltaTrace, run_steps, SET, ASSIGN, ADD, DISCARD
+from loader import EdgeArray, load_edges
+from bridge_index import BridgeIndex
+from stats import AlgorithmStats, measured, timed
+from trace_store import TraceWriter
+
+
+"""
+Adjacency arrays of the graph checked by a worker process
+of dfs_brute_force_parallel, set once when the worker starts.
+"""
+_worker_graph = None
+
+# Graphs with at least this many edges build adjacency arrays with NumPy.
+NUMPY_EDGES = 100000
+
+
+def _init_brute_force_worker(offsets, targets, edge_ids):
+    global _worker_graph
+    _worker_graph = (offsets, targets, edge_ids)
+
+
+def _is_bridge(offsets, targets, edge_ids, removed, u, v, counts=None):
+    """
+    Checks if v can still be reached from u when edge with id removed
+    is masked out. Depth-first search stops as soon as v is found.
+    If counts is given, a list [vertices, relaxations], the number of
+    vertices visited and of adjacency entries checked is added to it.
+    """
+    if u == v:
+        return False  # a self-loop never disconnects anything
+    visited = bytearray(len(offsets) - 1)
+    visited[u] = 1
+    stack = [u]
+    popped = 0
+    relaxations = 0
+    found = False
+    while stack:
+        vertex = stack.pop()
+        popped += 1
+        relaxations += offsets[vertex + 1] - offsets[vertex]
+        for i in range(offsets[vertex], offsets[vertex + 1]):
+            neighbor = targets[i]
+            if visited[neighbor] or edge_ids[i] == removed:
+                continue
+            if neighbor == v:
+                # entries after i were not checked
+                relaxations -= offsets[vertex + 1] - i - 1
+                found = True
+                break
+            visited[neighbor] = 1
+            stack.append(neighbor)
+        if found:
+            break
+    if counts is not None:
+        # every marked vertex was either popped or is still on the stack
+        counts[0] += popped + len(stack)
+        counts[1] += relaxations
+    return not found
+
+
+def _check_tree_edges(candidates):
+    # Returns ids of bridges among (edge id, u, v) candidates.
+    offsets, targets, edge_ids = _worker_graph
+    return [edge_id for edge_id, u, v in candidates
+            if _is_bridge(offsets, targets, edge_ids, edge_id, u, v)]
 
 
 class Graph:
@@ -20,102 +88,477 @@ class Graph:
         """
         Generates a new graph with n as number of vertices and
         edges as a list of lists of edges, eg. edge between vertex
-        labelled 0 and vertex labelled 1 is represented by [0, 1].
+        labelled 0 and vertex labelled 1 is represented by [0, 1],
+        or an EdgeArray.
         It stores the detailed execution of algorithms implemented
         in the project.
         """
         self.n = n  # number of vertices
         self.edges = edges  # list of lists of edges
         self.visualization_data = []  # characteristics of each algorithm
+        self.adjacency = None  # adjacency arrays, built once by get_adjacency
+        # results of chain_decomposition besides bridges
+        self.two_edge_components = []  # component label of every vertex
+        self.bridge_tree = []  # edges between labels connected by bridges
+        # statistics of the last algorithm, only if instrumented
+        self.stats = None
+        self.stats_hook = None
+        self.profile = False
+        self.trace_path = None  # file for traces, if set by stream_trace
 
-    def make_dictionary_graph(self, edges):
+    def instrument(self, enabled=True, hook=None, profile=False):
         """
-        Created a defaultdict dictionary representation of
-        available neighbors from each vertex.
-        {0: [1, 2], 1: [0], 2: [0]}) means that 0 is connected to 1 and 2,
-        and 1 and 2 is also connected to 0.
+        Turns on, or off if enabled is False, statistics of algorithms.
+        After every run of an algorithm, stats holds an AlgorithmStats
+        object from stats.py with time of every phase and counters of
+        vertices visited, edge relaxations, the deepest DFS path and
+        size of the trace. hook, if given, is called with it after every
+        run, and if profile is True algorithms are run with cProfile.
+        Step generators called directly only add their counters to stats.
         """
-        dictionary_graph = defaultdict(list)
-        for edge in edges:
-            # edges are appended twice, because it is an undirected graph
-            dictionary_graph[edge[0]].append(edge[1])
-            dictionary_graph[edge[1]].append(edge[0])
-        return dictionary_graph
+        self.stats = AlgorithmStats() if enabled else None
+        self.stats_hook = hook
+        self.profile = profile
 
-    def dfs_brute_force(self):
+    @classmethod
+    def from_file(cls, path):
+        """
+        Creates a graph from an edge list file, or a .npy or raw int32
+        file, read by load_edges from loader.py. Number of vertices
+        is the largest vertex label plus one.
+        """
+        n, edges = load_edges(path)
+        return cls(n, edges)
+
+    def make_array_graph(self):
+        """
+        Creates a compressed sparse row representation of available
+        neighbors from each vertex, stored in three flat integer arrays.
+        Neighbors of vertex v are targets[offsets[v]:offsets[v + 1]]
+        and edge_ids holds the index in self.edges of every such entry,
+        so two parallel edges can be told apart. It takes 16 bytes
+        per edge and 4 bytes per vertex.
+        Arrays are made by counting sort of endpoints of all edges,
+        so neighbors of every vertex are kept in the order of edges.
+        Large graphs are sorted with NumPy, if it is installed.
+        """
+        if isinstance(self.edges, EdgeArray):
+            endpoints = self.edges.endpoints  # already flat, eg. from a file
+        else:
+            endpoints = array('i', chain.from_iterable(self.edges))
+        if len(self.edges) >= NUMPY_EDGES:
+            try:
+                return self.make_array_graph_numpy(endpoints)
+            except ImportError:
+                pass
+        offsets = array('i', [0]) * (self.n + 1)
+        for vertex in endpoints:
+            # count the degree of every vertex, shifted by one
+            offsets[vertex + 1] += 1
+        for vertex in range(self.n):
+            offsets[vertex + 1] += offsets[vertex]
+        targets = array('i', [0]) * len(endpoints)
+        edge_ids = array('i', [0]) * len(endpoints)
+        fill = offsets[:-1]  # next free position for every vertex
+        endpoints = iter(endpoints)
+        edge_id = 0
+        for u in endpoints:
+            v = next(endpoints)
+            # edges are placed twice, because it is an undirected graph
+            position = fill[u]
+            targets[position] = v
+            edge_ids[position] = edge_id
+            fill[u] = position + 1
+            position = fill[v]
+            targets[position] = u
+            edge_ids[position] = edge_id
+            fill[v] = position + 1
+            edge_id += 1
+        return offsets, targets, edge_ids
+
+    def make_array_graph_numpy(self, endpoints):
+        """
+        Same as make_array_graph, but the counting sort is done by
+        NumPy on the whole array of endpoints at once.
+        Raises ImportError if NumPy is not installed.
+        """
+        import numpy as np
+
+        endpoints = np.asarray(endpoints, dtype=np.intc)
+        # stable sort keeps half-edges of every vertex in the input order
+        order = np.argsort(endpoints, kind="stable")
+        degrees = np.bincount(endpoints, minlength=self.n)
+        offsets = array('i', [0])
+        offsets.frombytes(np.cumsum(degrees, dtype=np.intc).tobytes())
+        targets = array('i', endpoints[order ^ 1].tobytes())
+        edge_ids = array('i', (order >> 1).astype(np.intc).tobytes())
+        return offsets, targets, edge_ids
+
+    def get_adjacency(self):
+        """
+        Returns (offsets, targets, edge_ids) made by make_array_graph.
+        They are built on the first call and shared by all algorithms
+        run on this graph afterwards.
+        """
+        if self.adjacency is None:
+            self.adjacency = self.make_array_graph()
+        return self.adjacency
+
+    def stream_trace(self, path):
+        """
+        Makes following runs of tarjans_algorithm, kaiwensun_bridges
+        and chain_decomposition write their traces to a file at path,
+        with TraceWriter from trace_store.py, instead of memory.
+        visualization_data is then a StoredTrace of that file, which
+        can be opened again later. If path is None, traces are kept
+        in memory again. Brute force always keeps its trace in memory,
+        it is only run on small graphs.
+        """
+        self.trace_path = path
+
+    def run_traced(self, algorithm, steps, progress=None):
+        """
+        Pulls all steps of algorithm from the steps generator and records
+        them in a DeltaTrace, or in a trace file if stream_trace was
+        called. An unfinished trace file is removed if the algorithm
+        raises an error, eg. when it is cancelled.
+        Returns value returned by the generator.
+        """
+        state = self.initial_state(algorithm)
+        if self.trace_path is None:
+            trace = DeltaTrace(state)
+        else:
+            trace = TraceWriter(self.trace_path, state, algorithm, self.n,
+                                self.edges)
+        try:
+            bridges = run_steps(steps, timed(self.stats, "trace",
+                                             trace.record_step), progress)
+        except BaseException:
+            if self.trace_path is not None:
+                trace.discard()
+            raise
+        if self.trace_path is not None:
+            trace = trace.close(bridges)
+        self.visualization_data = trace
+        return bridges
+
+    def initial_state(self, algorithm):
+        """
+        Returns the state before the first step of an algorithm,
+        given by the name of its method. Changes yielded by the
+        step generators are applied to this state.
+        """
+        if algorithm == "dfs_brute_force":
+            return [-1, 0]
+        if algorithm == "tarjans_algorithm":
+            return [0, [0] * self.n, [0] * self.n, []]
+        if algorithm == "kaiwensun_bridges":
+            return [[-2] * self.n, self.sort_edges()]
+        if algorithm == "chain_decomposition":
+            return [0, [0] * len(self.edges)]
+        raise ValueError("unknown algorithm: " + str(algorithm))
+
+    @measured()
+    def dfs_brute_force(self, progress=None):
         """
         A brute-force solution using depth-first search.
         For every edge (u, v) this edge is temporarily removed
         from the graph, and then using depth-first search it is
-        checked if graph remains connected or not. Time complexity
+        checked if its endpoints are still connected or not, so graphs
+        do not have to be connected. Time complexity
         for this method is (O(E*(V+E)), so quadratic.
+        If progress is given, it is called with the number of steps
+        done after every step, and it can stop the algorithm by
+        raising an exception. The same is true for all algorithms.
         Return bridges in a graph.
         """
         self.clear_visualization_data()
 
-        def dfs(visited, graph, vertex):
-            # Standalone depth-first search for traversing graphs.
-            if vertex not in visited:
-                visited.add(vertex)
-                for neighbor in graph[vertex]:
-                    dfs(visited, graph, neighbor)
+        def add_row(changes):
+            # changes hold index of the removed edge and if it is a bridge
+            removed_edge = self.edges[changes[0][2]]
+            self.visualization_data.append([removed_edge,
+                                            bool(changes[1][2])])
+        return run_steps(self.dfs_brute_force_steps(),
+                         timed(self.stats, "trace", add_row), progress)
+
+    def dfs_brute_force_steps(self, trace=True):
+        """
+        Generator version of dfs_brute_force.
+        State of every step is [index of removed edge, is it a bridge],
+        and both fields are assigned once per removed edge.
+        If trace is False, no steps are yielded.
+        Returns list of bridges, as a value of StopIteration.
+        """
+        offsets, targets, edge_ids = self.get_adjacency()
+        stats = self.stats
+        # vertices visited and adjacency entries checked, if stats are on
+        counts = None if stats is None else [0, 0]
         bridges = []
-        if len(self.edges) == 1:
-            self.visualization_data.append([self.edges[0], True])
-            return ([(tuple(self.edges[0]))])
         for i in range(len(self.edges)):
             removed_edge = self.edges[i]
-            # Creates every possible combination of edges of length n - 1
-            combination = (self.edges[:i] + self.edges[i+1:])
-            graph = self.make_dictionary_graph(combination)
-            visited = set()  # set for already visited vertices
-            dfs(visited, graph, list(graph.keys())[0])
-            if len(visited) != self.n:
-                # Add removed to bridges if not all vertices were visited
+            # Depth-first search from one endpoint, without edge i,
+            # stops as soon as it finds the other one
+            is_bridge = _is_bridge(offsets, targets, edge_ids, i,
+                                   removed_edge[0], removed_edge[1], counts)
+            if is_bridge:
+                # Add removed to bridges if the other endpoint was not found
                 bridges.append(tuple(removed_edge))
-                self.visualization_data.append([removed_edge, True])
+            if trace:
+                yield [(ASSIGN, 0, i, 0), (ASSIGN, 1, int(is_bridge), 0)]
+
+        if stats is not None:
+            stats.count(counts[0], counts[1])
+        return bridges
+
+    @measured()
+    def dfs_brute_force_parallel(self, workers=None):
+        """
+        Faster brute-force solution, used to cross-check other algorithms.
+        Adjacency arrays are built only once and the removed edge
+        is skipped by its id instead of copying the list of edges.
+        Only edges of a spanning forest are checked, with a tree in
+        every connected component, because if an edge is not in the
+        forest, its tree still connects its endpoints without it.
+        Checks are split between workers processes of a process pool,
+        or done in this process if workers is 1. By default there is
+        one worker for every CPU.
+        Visualization data is the same as in dfs_brute_force.
+        Returns list of bridges in a graph.
+        """
+        self.clear_visualization_data()
+
+        offsets, targets, edge_ids = self.get_adjacency()
+        is_bridge = bytearray(len(self.edges))
+        if self.edges:
+            # spanning forest built by depth-first search from every
+            # vertex which is not visited yet
+            visited = bytearray(self.n)
+            candidates = []  # tree edges as (edge id, parent, child)
+            for root in range(self.n):
+                if visited[root]:
+                    continue
+                visited[root] = 1
+                stack = [root]
+                while stack:
+                    vertex = stack.pop()
+                    for i in range(offsets[vertex], offsets[vertex + 1]):
+                        neighbor = targets[i]
+                        if not visited[neighbor]:
+                            visited[neighbor] = 1
+                            candidates.append((edge_ids[i], vertex,
+                                               neighbor))
+                            stack.append(neighbor)
+            if workers == 1 or not candidates:
+                _init_brute_force_worker(offsets, targets, edge_ids)
+                for edge_id in _check_tree_edges(candidates):
+                    is_bridge[edge_id] = 1
             else:
-                self.visualization_data.append([removed_edge, False])
+                # imported here, it is slow to import and rarely needed
+                from concurrent.futures import ProcessPoolExecutor
+                workers = workers or os.cpu_count() or 1
+                size = -(-len(candidates) // (4 * workers))  # round up
+                chunks = [candidates[i:i + size]
+                          for i in range(0, len(candidates), size)]
+                with ProcessPoolExecutor(
+                        max_workers=workers,
+                        initializer=_init_brute_force_worker,
+                        initargs=(offsets, targets, edge_ids)) as executor:
+                    for bridge_ids in executor.map(_check_tree_edges, chunks):
+                        for edge_id in bridge_ids:
+                            is_bridge[edge_id] = 1
 
+        bridges = []
+        for edge, bridge in zip(self.edges, is_bridge):
+            if bridge:
+                bridges.append(tuple(edge))
+            self.visualization_data.append([edge, bool(bridge)])
         return bridges
 
-    def tarjans_algorithm(self):
+    @measured()
+    def tarjans_algorithm(self, progress=None):
         """
         Implementation of Tarjan's bridge-finding algorithm.
         Uses disc (discovery time) and low (lowest vertex reachable)
         and time to use with disc. 
+        Every step of visualization data is [time, disc, low, bridges],
+        but only changes to them are saved in a DeltaTrace.
         Returns list of bridges in a graph.
         """
         self.clear_visualization_data()
 
-        graph = self.make_dictionary_graph(self.edges)
+        return self.run_traced("tarjans_algorithm",
+                               self.tarjans_algorithm_steps(), progress)
+
+    def tarjans_algorithm_steps(self, trace=True):
+        """
+        Generator version of tarjans_algorithm.
+        A step starts every time DFS enters a vertex and one more step
+        is yielded at the end. Every step is a list of changes made to
+        [time, disc, low, bridges] since the previous step.
+        Recursion is replaced by a stack of vertices with ids of
+        edges from their parents and iterators over positions of
+        their neighbors. The parent is skipped by edge id, not by
+        vertex, so parallel edges are never reported as bridges.
+        DFS starts again from every vertex not visited yet, so
+        bridges in every connected component are found.
+        If trace is False, no steps are yielded.
+        Returns list of bridges, as a value of StopIteration.
+        """
+        offsets, targets, edge_ids = self.get_adjacency()
         # initialize disc and low with zeros for every vertex
         disc = [0] * self.n
         low = [0] * self.n
-        time = [1]
-        bridges = []  # time counter
-
-        def dfs(curr, prev):
-            disc[curr] = low[curr] = time[0]
-            self.visualization_data.append([time[0], disc.copy(),
-                                            low.copy(), bridges.copy()])
-            time[0] += 1  # timer counter increases
-            for next in graph[curr]:
-                if not disc[next]:
-                    # recursive DFS calls on unvisited adjacent vertices to curr vertex
-                    dfs(next, curr)
-                    low[curr] = min(low[curr], low[next])  # cycle found
-                elif next != prev:
-                    low[curr] = min(low[curr], disc[next])
-                # if after backtracking low[next] > disc[curr], edge (curr, next) is a bridge
-                if low[next] > disc[curr]:
-                    bridges.append((curr, next))
-        dfs(0, -1)
-        self.visualization_data.append([time[0], disc.copy(),
-                                        low.copy(), bridges.copy()])
+        time = 1  # time counter
+        bridges = []
+        if self.n == 0:
+            return bridges
+        stats = self.stats
+        deepest = 0  # longest DFS path, measured only if stats are on
+
+        changes = []
+        for root in range(self.n):
+            if disc[root]:
+                continue
+            stack = [(root, -1, iter(range(offsets[root],
+                                           offsets[root + 1])))]
+            disc[root] = low[root] = time
+            if trace:
+                changes.extend(((ASSIGN, 0, time, 0), (SET, 1, root, time),
+                                (SET, 2, root, time)))
+                yield changes
+                changes = []
+            time += 1  # timer counter increases
+            while stack:
+                curr, parent_edge, neighbors = stack[-1]
+                for i in neighbors:
+                    next = targets[i]
+                    if not disc[next]:
+                        # instead of a recursive call next is put on stack
+                        disc[next] = low[next] = time
+                        if trace:
+                            changes.extend(((ASSIGN, 0, time, 0),
+                                            (SET, 1, next, time),
+                                            (SET, 2, next, time)))
+                            yield changes
+                            changes = []
+                        time += 1
+                        stack.append((next, edge_ids[i], iter(
+                            range(offsets[next], offsets[next + 1]))))
+                        if stats is not None and len(stack) > deepest:
+                            deepest = len(stack)
+                        break
+                    elif edge_ids[i] != parent_edge and \
+                            disc[next] < low[curr]:
+                        low[curr] = disc[next]
+                        if trace:
+                            changes.append((SET, 2, curr, low[curr]))
+                    # if low[next] > disc[curr], (curr, next) is a bridge
+                    if low[next] > disc[curr]:
+                        bridges.append((curr, next))
+                        if trace:
+                            changes.append((ADD, 3, curr, next))
+                else:
+                    # all neighbors checked, backtrack to the parent
+                    stack.pop()
+                    if stack:
+                        prev = stack[-1][0]
+                        if low[curr] < low[prev]:  # cycle found
+                            low[prev] = low[curr]
+                            if trace:
+                                changes.append((SET, 2, prev, low[prev]))
+                        if low[curr] > disc[prev]:
+                            bridges.append((prev, curr))
+                            if trace:
+                                changes.append((ADD, 3, prev, curr))
+        if stats is not None:
+            stats.count(self.n, offsets[self.n], max(deepest, 1))
+        if trace:
+            changes.append((ASSIGN, 0, time, 0))
+            yield changes
         return bridges
 
-    def kaiwensun_bridges(self):
+    @measured()
+    def tarjans_iterative(self):
+        """
+        Tarjan's bridge-finding algorithm without recursion.
+        Python call frames are replaced by an explicit stack of vertices
+        and every vertex is described only by entries in flat integer
+        arrays: disc, low, the id of the edge it was entered by and
+        the position of the next neighbor to check. It does not need
+        a raised recursion limit and works for graphs with millions
+        of vertices. The parent is skipped by edge id, not by vertex,
+        so parallel edges are never reported as bridges.
+        DFS starts from every vertex not visited yet, so all connected
+        components are searched.
+        It does not save visualization data.
+        Returns list of bridges in a graph.
+        """
+        self.clear_visualization_data()
+
+        offsets, targets, edge_ids = self.get_adjacency()
+        disc = array('i', [0]) * self.n
+        low = array('i', [0]) * self.n
+        parent_edge = array('i', [-1]) * self.n
+        position = offsets[:-1]  # next neighbor to check for every vertex
+        stack = array('i')  # vertices on the current DFS path
+        bridges = []
+        time = 1
+        stats = self.stats
+        deepest = 0  # longest DFS path, measured only if stats are on
+        for root in range(self.n):
+            if disc[root]:
+                continue
+            disc[root] = low[root] = time
+            time += 1
+            stack.append(root)
+            while stack:
+                curr = stack[-1]
+                i = position[curr]
+                if i < offsets[curr + 1]:
+                    position[curr] = i + 1
+                    next = targets[i]
+                    if not disc[next]:
+                        # instead of a recursive call next is put on stack
+                        disc[next] = low[next] = time
+                        time += 1
+                        parent_edge[next] = edge_ids[i]
+                        stack.append(next)
+                        if stats is not None and len(stack) > deepest:
+                            deepest = len(stack)
+                    elif edge_ids[i] != parent_edge[curr]:
+                        if disc[next] < low[curr]:
+                            low[curr] = disc[next]
+                else:
+                    # all neighbors checked, backtrack to the parent
+                    stack.pop()
+                    if stack:
+                        prev = stack[-1]
+                        if low[curr] < low[prev]:
+                            low[prev] = low[curr]
+                        if low[curr] > disc[prev]:
+                            bridges.append((prev, curr))
+        if stats is not None:
+            stats.count(self.n, offsets[self.n], max(deepest, min(self.n, 1)))
+        return bridges
+
+    def sort_edges(self):
+        """
+        This code is taken from the same forum post from
+        user "jordan34".
+        Return sorted set of edges.
+        From list of lists of edges: [[0, 1], [2, 0], [1, 3]]
+        we get a set of sorted tuples: {(0, 1), (0, 2), (1, 3)}
+        Used as the initial state of kaiwensun_bridges visualization.
+        Edges of the graph are not changed.
+        """
+        sorted_edges = set()
+        for u, v in self.edges:
+            sorted_edges.add((u, v) if u < v else (v, u))
+        return sorted_edges
+
+    @measured()
+    def kaiwensun_bridges(self, progress=None):
         """
         Algorithm created by Kaiwen Sun as a solution to 1192. Leetcode
         problem "Critical connections in a network". Algorithm was posted
@@ -125,57 +568,273 @@ class Graph:
         The most important bit of this algorithms is that an edge is a bridge,
         if and only if is not in a cycle. It searches for any cycles in a graph
         and removes all edges in the cycles. The remaining edges are bridges.
+        Every step of visualization data is [rank, edges], but only
+        changes to them are saved in a DeltaTrace.
         Returns list of bridges in a graph.
         """
+        self.clear_visualization_data()
+
+        return self.run_traced("kaiwensun_bridges",
+                               self.kaiwensun_bridges_steps(), progress)
+
+    def kaiwensun_bridges_steps(self, trace=True):
+        """
+        Generator version of kaiwensun_bridges.
+        A step is yielded before DFS goes to a neighbor and after
+        an edge is discarded. Every step is a list of changes made
+        to [rank, edges] since the previous step.
+        Recursion is replaced by a stack of frames holding vertex,
+        its depth, iterator over positions of its neighbors, the minimal
+        rank found so far, the id of the edge DFS went along and the id
+        of the edge from the parent. DFS starts from every vertex without
+        a rank, so every connected component is searched.
+        Every edge is known by its id, its index in self.edges, and
+        candidate[id] is cleared when the edge is found in a cycle, so
+        no tuples are made unless trace is True. The parent is skipped
+        by edge id, not by vertex, so a parallel edge to the parent
+        closes a cycle, and edges of the graph are not changed.
+        If trace is False, no steps are yielded.
+        Returns list of bridges, as a value of StopIteration.
+        """
+        edges = self.edges
+        candidate = bytearray(b"\x01") * len(edges)  # still can be a bridge
+        rank = [-2] * self.n  # depth of a vertex in DFS
+        offsets, targets, edge_ids = self.get_adjacency()
 
-        def sort_edges():
-            """
-            This code is taken from the same forum post from
-            user "jordan34".
-            Return sorted set of edges.
-            From list of lists of edges: [[0, 1], [2, 0], [1, 3]]
-            we get a set of sorted tuples: {(0, 1), (0, 2), (1, 3)}
-            Used in deleting edges that are part of a cycle.
-            """
-            sorted_edges = set()
-            for edge in self.edges:
-                edge.sort()
-                sorted_edges.add((edge[0], edge[1]))
-            return sorted_edges
+        changes = []
+        for root in range(self.n):
+            if rank[root] != -2:
+                continue
+            rank[root] = 0  # starting vertex has rank 0
+            if trace:
+                changes.append((SET, 0, root, 0))
+            stack = [[root, 0, iter(range(offsets[root], offsets[root + 1])),
+                      self.n, -1, -1]]
+            back_depth = None  # minimal rank returned from last neighbor
+            while stack:
+                frame = stack[-1]
+                depth = frame[1]
+                if back_depth is not None:
+                    # DFS returned along edge frame[4], is it in a cycle
+                    if back_depth <= depth:
+                        edge_id = frame[4]
+                        candidate[edge_id] = 0
+                        if trace:
+                            u, v = edges[edge_id]
+                            if u > v:
+                                u, v = v, u
+                            changes.append((DISCARD, 1, u, v))
+                            yield changes
+                            changes = []
+                    if back_depth < frame[3]:
+                        frame[3] = back_depth
+                    back_depth = None
+                for i in frame[2]:
+                    edge_id = edge_ids[i]
+                    # check all adjacent vertices for currect vertex
+                    if edge_id == frame[5]:
+                        # don't go back along the edge from the parent
+                        continue
+                    if trace:
+                        yield changes
+                        changes = []
+                    frame[4] = edge_id
+                    neighbor = targets[i]
+                    if rank[neighbor] >= 0:
+                        # visiting or visited before
+                        back_depth = rank[neighbor]
+                    else:
+                        # assign next depth to rank[neighbor] and go deeper
+                        rank[neighbor] = depth + 1
+                        if trace:
+                            changes.append((SET, 0, neighbor, depth + 1))
+                        stack.append([neighbor, depth + 1, iter(range(
+                            offsets[neighbor], offsets[neighbor + 1])),
+                            self.n, -1, edge_id])
+                    break
+                else:
+                    # minimal rank DFS finds is returned to the parent
+                    back_depth = stack.pop()[3]
+        if trace and changes:
+            # changes made after the last step: the rank of the last
+            # vertex entered, eg. the last leaf, which is yielded only
+            # before the next edge is checked, and ranks of isolated
+            # vertices at the end, so the trace has one more step
+            yield changes
+        stats = self.stats
+        if stats is not None:
+            # rank is the depth in DFS, so the longest path is one more
+            stats.count(self.n, offsets[self.n], max(rank, default=-1) + 1)
+            start = perf_counter()
+        bridges = []
+        for edge_id in range(len(edges)):
+            if candidate[edge_id]:
+                u, v = edges[edge_id]
+                bridges.append((u, v) if u < v else (v, u))
+        if stats is not None:
+            stats.add_time("result", perf_counter() - start)
+        return bridges
 
+    @measured()
+    def chain_decomposition(self, progress=None):
+        """
+        Bridge-finding algorithm based on chain decomposition,
+        presented by Jens M. Schmidt in "A simple test on
+        2-vertex- and 2-edge-connectivity".
+        Every edge that is not a part of any chain is a bridge.
+        Besides bridges, it labels 2-edge-connected components of
+        every vertex and builds the bridge tree, whose vertices are
+        these components and edges are bridges between them.
+        Time complexity is O(V+E) and all components are covered.
+        Every step of visualization data is [chain, chains], where
+        chains holds the number of chain every edge belongs to,
+        or 0 if it is not in any chain yet.
+        Returns list of bridges in a graph.
+        """
         self.clear_visualization_data()
 
-        edges = sort_edges()
-        rank = [-2] * self.n  # depth of a vertex in DFS
-        graph = self.make_dictionary_graph(self.edges)
-
-        def dfs(vertex, depth):
-            # DFS is used to find if and edge is in a cycle.
-            if rank[vertex] >= 0:
-                # visiting (0<=rank<n), or visited (rank=n)
-                return rank[vertex]
-            rank[vertex] = depth  # assign current depth to rank[vertex]
-            min_back_depth = self.n
-            for neighbor in graph[vertex]:
-                # check all adjacent vertices for currect vertex
-                if rank[neighbor] == depth - 1:
-                    # don't go to parent vertex
+        return self.run_traced("chain_decomposition",
+                               self.chain_decomposition_steps(), progress)
+
+    def chain_decomposition_steps(self, trace=True):
+        """
+        Generator version of chain_decomposition.
+        A step is yielded for every chain found. It is a list of
+        changes made to [chain, chains] since the previous step.
+        Labels of components and the bridge tree are saved in
+        two_edge_components and bridge_tree when it finishes.
+        If trace is False, no steps are yielded.
+        Returns list of bridges, as a value of StopIteration.
+        """
+        offsets, targets, edge_ids = self.get_adjacency()
+        disc = array('i', [-1]) * self.n  # position in DFS order
+        parent = array('i', [-1]) * self.n
+        parent_edge = array('i', [-1]) * self.n
+        position = offsets[:-1]  # next neighbor to check for every vertex
+        order = array('i')  # vertices in the order DFS visits them
+        stats = self.stats
+        deepest = 0  # longest DFS path, measured only if stats are on
+
+        # depth-first search from every vertex not visited yet
+        for root in range(self.n):
+            if disc[root] >= 0:
+                continue
+            disc[root] = len(order)
+            order.append(root)
+            stack = [root]
+            while stack:
+                vertex = stack[-1]
+                i = position[vertex]
+                if i < offsets[vertex + 1]:
+                    position[vertex] = i + 1
+                    neighbor = targets[i]
+                    if disc[neighbor] < 0:
+                        disc[neighbor] = len(order)
+                        order.append(neighbor)
+                        parent[neighbor] = vertex
+                        parent_edge[neighbor] = edge_ids[i]
+                        stack.append(neighbor)
+                        if stats is not None and len(stack) > deepest:
+                            deepest = len(stack)
+                else:
+                    stack.pop()
+
+        """
+        Every back edge (vertex, neighbor) starts a chain, which goes up
+        the DFS tree from neighbor until a vertex already in a chain.
+        Back edges are taken from vertices in DFS order.
+        """
+        visited = bytearray(self.n)  # vertex is in some chain
+        covered = bytearray(self.n)  # edge to the parent is in some chain
+        chain = 0
+        for vertex in order:
+            for i in range(offsets[vertex], offsets[vertex + 1]):
+                neighbor = targets[i]
+                if disc[neighbor] <= disc[vertex] or \
+                        parent_edge[neighbor] == edge_ids[i]:
+                    # tree edge, self-loop or back edge seen from below
                     continue
-                self.visualization_data.append([rank.copy(), edges.copy()])
-                back_depth = dfs(neighbor, depth + 1)
-                if back_depth <= depth:
-                    # edge is in a cycle
-                    edges.discard(tuple(sorted((vertex, neighbor))))
-                    self.visualization_data.append([rank.copy(), edges.copy()])
-                min_back_depth = min(min_back_depth, back_depth)
+                chain += 1
+                visited[vertex] = 1
+                if trace:
+                    changes = [(ASSIGN, 0, chain, 0),
+                               (SET, 1, edge_ids[i], chain)]
+                while not visited[neighbor]:
+                    visited[neighbor] = covered[neighbor] = 1
+                    if trace:
+                        changes.append((SET, 1, parent_edge[neighbor], chain))
+                    neighbor = parent[neighbor]
+                if trace:
+                    yield changes
+
+        # tree edges not covered by chains are bridges between components
+        if stats is not None:
+            # adjacency is checked once by DFS and once to find chains
+            stats.count(self.n, 2 * offsets[self.n],
+                        max(deepest, min(self.n, 1)))
+            start = perf_counter()
+        bridges = []
+        self.two_edge_components = components = [0] * self.n
+        self.bridge_tree = []
+        label = -1
+        for vertex in order:
+            if covered[vertex]:
+                components[vertex] = components[parent[vertex]]
+                continue
+            label += 1
+            components[vertex] = label
+            if parent[vertex] >= 0:
+                bridges.append((parent[vertex], vertex))
+                self.bridge_tree.append((components[parent[vertex]], label))
+        if stats is not None:
+            stats.add_time("result", perf_counter() - start)
+        return bridges
+
+    @measured(adjacency=False)
+    def parallel_bridges(self, workers=None):
+        """
+        Finds bridges with workers processes, one for every CPU by
+        default, using a spanning forest instead of depth-first search,
+        so that large graphs are processed by all cores.
+        See find_bridges_parallel in parallel.py.
+        It does not save visualization data.
+        Returns list of bridges in a graph.
+        """
+        from parallel import find_bridges_parallel  # imports NumPy
+        self.clear_visualization_data()
+        return find_bridges_parallel(self.n, self.edges, workers)
+
+    def incremental_bridges(self):
+        """
+        Returns an IncrementalBridges object holding all edges of
+        the graph. New edges can be added to it with add_edge(u, v)
+        and its bridges() are kept up to date without running
+        any algorithm on the whole graph again.
+        """
+        return IncrementalBridges(self.n, self.edges)
+
+    def bridge_index(self):
+        """
+        Returns a BridgeIndex of the graph, which answers whether an
+        edge is a bridge or two vertices are 2-edge-connected in O(1)
+        time, and which bridges separate two vertices in O(log V) time.
+        """
+        return BridgeIndex.from_graph(self)
 
-            return min_back_depth  # minimal rank DFS finds
+    def get_two_edge_connected_components(self):
+        # returns 2-edge-connected component label of every vertex
+        return self.two_edge_components
 
-        dfs(0, 0)  # starting vertex has rank 0
-        return list(edges)
+    def get_bridge_tree(self):
+        # returns edges of the bridge tree between component labels
+        return self.bridge_tree
 
     def get_visualization_data(self):
-        # returns step-by-step visualization of each algorithm
+        """
+        Returns step-by-step visualization of each algorithm.
+        It is either a list of rows or a DeltaTrace, which creates
+        the same rows on demand when indexed or iterated over.
+        """
         return self.visualization_data
 
     def clear_visualization_data(self):
@@ -0,0 +1,171 @@
+"""
+Online bridge finding for graphs which grow by a few edges at a time.
+Based on the algorithm described at cp-algorithms.com,
+"Finding Bridges Online", which keeps a forest of 2-edge-connected
+components together with two union-find structures.
+"""
+
+
+class IncrementalBridges:
+    """
+    IncrementalBridges keeps the set of bridges up to date while edges
+    are added one by one, without running depth-first search again.
+    Every 2-edge-connected component is a vertex of a bridge forest and
+    every edge of that forest is a bridge. A new edge either connects
+    two trees of the forest, and then it is a new bridge, or it closes
+    a cycle, and then all bridges on the path between its endpoints
+    stop being bridges and their components are merged into one.
+    Smaller tree is always re-rooted when two trees are connected, so
+    adding an edge takes amortized O(log V) time.
+    """
+
+    def __init__(self, n=0, edges=()):
+        """
+        Creates a graph with n vertices, labelled 0 to n - 1, and
+        adds every edge from edges. More vertices are added
+        automatically when an edge uses a label not seen before.
+        """
+        self.n = 0
+        self.two_edge = []  # union-find of 2-edge-connected components
+        self.connected = []  # union-find of connected components
+        self.size = []  # number of vertices in a tree of the forest
+        self.parent = []  # parent component in the bridge forest, or -1
+        self.parent_bridge = []  # edge to the parent component
+        self.last_visit = []  # used when looking for the lowest ancestor
+        self.iteration = 0
+        self.edges = []
+        self.current_bridges = {}  # edge id -> (u, v)
+        self.add_vertices(n)
+        for edge in edges:
+            self.add_edge(edge[0], edge[1])
+
+    def add_vertices(self, n):
+        # Extends the graph, so that it has at least n vertices.
+        for vertex in range(self.n, n):
+            self.two_edge.append(vertex)
+            self.connected.append(vertex)
+            self.size.append(1)
+            self.parent.append(-1)
+            self.parent_bridge.append(-1)
+            self.last_visit.append(0)
+        self.n = max(self.n, n)
+
+    def find_two_edge(self, vertex):
+        # Representative of the 2-edge-connected component of vertex.
+        if vertex == -1:
+            return -1
+        root = vertex
+        while self.two_edge[root] != root:
+            root = self.two_edge[root]
+        while self.two_edge[vertex] != root:
+            self.two_edge[vertex], vertex = root, self.two_edge[vertex]
+        return root
+
+    def find_connected(self, vertex):
+        # Representative of the connected component of vertex.
+        vertex = self.find_two_edge(vertex)
+        root = vertex
+        while self.connected[root] != root:
+            root = self.connected[root]
+        while self.connected[vertex] != root:
+            self.connected[vertex], vertex = root, self.connected[vertex]
+        return root
+
+    def make_root(self, vertex):
+        """
+        Re-roots the tree of the bridge forest containing vertex,
+        by reversing every edge on the path from vertex to the root.
+        """
+        vertex = self.find_two_edge(vertex)
+        root = vertex
+        child = -1
+        child_bridge = -1
+        while vertex != -1:
+            next_vertex = self.find_two_edge(self.parent[vertex])
+            next_bridge = self.parent_bridge[vertex]
+            self.parent[vertex] = child
+            self.parent_bridge[vertex] = child_bridge
+            self.connected[vertex] = root
+            child, child_bridge = vertex, next_bridge
+            vertex = next_vertex
+        self.size[root] = self.size[child]
+
+    def merge_path(self, a, b):
+        """
+        Finds the path between components a and b in the bridge forest,
+        by going up from both of them until the paths meet, and merges
+        every component on it into one. Bridges on the path are removed.
+        """
+        self.iteration += 1
+        path_a = []
+        path_b = []
+        lowest = -1
+        while lowest == -1:
+            if a != -1:
+                a = self.find_two_edge(a)
+                path_a.append(a)
+                if self.last_visit[a] == self.iteration:
+                    lowest = a
+                    break
+                self.last_visit[a] = self.iteration
+                a = self.parent[a]
+            if b != -1:
+                b = self.find_two_edge(b)
+                path_b.append(b)
+                if self.last_visit[b] == self.iteration:
+                    lowest = b
+                    break
+                self.last_visit[b] = self.iteration
+                b = self.parent[b]
+
+        for path in (path_a, path_b):
+            for vertex in path:
+                if vertex == lowest:
+                    break
+                self.current_bridges.pop(self.parent_bridge[vertex], None)
+                self.two_edge[vertex] = lowest
+
+    def add_edge(self, u, v):
+        """
+        Adds an undirected edge (u, v) and updates the bridges.
+        Takes amortized O(log V) time.
+        """
+        self.add_vertices(max(u, v) + 1)
+        edge_id = len(self.edges)
+        self.edges.append((u, v))
+        a = self.find_two_edge(u)
+        b = self.find_two_edge(v)
+        if a == b:
+            # self-loop or edge inside a 2-edge-connected component
+            return
+        connected_a = self.find_connected(a)
+        connected_b = self.find_connected(b)
+        if connected_a != connected_b:
+            # new edge joins two trees and it is a bridge
+            if self.size[connected_a] > self.size[connected_b]:
+                a, b = b, a
+                connected_a, connected_b = connected_b, connected_a
+            self.make_root(a)
+            self.parent[a] = self.connected[a] = b
+            self.parent_bridge[a] = edge_id
+            self.size[connected_b] += self.size[a]
+            self.current_bridges[edge_id] = (u, v)
+        else:
+            self.merge_path(a, b)
+
+    def bridges(self):
+        # Returns list of current bridges, in the order they were added.
+        return [self.current_bridges[edge_id]
+                for edge_id in sorted(self.current_bridges)]
+
+    def is_bridge(self, u, v):
+        # Checks if (u, v), in any orientation, is currently a bridge.
+        a = self.find_two_edge(u)
+        b = self.find_two_edge(v)
+        if a == b:
+            return False
+        for vertex, other in ((a, b), (b, a)):
+            if self.find_two_edge(self.parent[vertex]) == other:
+                edge = self.edges[self.parent_bridge[vertex]]
+                return sorted(edge) == sorted((u, v))
+        return False
@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from array import array
+import hashlib
+import numpy as np
+
+"""
+Positions of vertices used for drawing graphs.
+Computing a layout is often slower than finding bridges, so layouts
+are cached by the set of edges of a graph. Small graphs are laid out
+with networkx spring layout, large graphs with a force-directed
+layout written with NumPy, in which repulsion between vertices is
+approximated with a grid of cells.
+"""
+
+
+def edges_hash(edges):
+    """
+    Canonical hash of a set of undirected edges. It does not depend
+    on the order of edges, the order of vertices in an edge or
+    repeated edges, so every list of the same edges has the same hash.
+    """
+    normalized = sorted({(min(u, v), max(u, v)) for u, v in edges})
+    flat = array('q', [vertex for edge in normalized for vertex in edge])
+    return hashlib.sha1(flat.tobytes()).hexdigest()
+
+
+def force_directed_layout(nodes, edges, initial=None, iterations=50,
+                          grid_size=16, seed=0):
+    """
+    Fruchterman-Reingold force-directed layout, vectorized with NumPy.
+    Every vertex is attracted by its neighbors, and pushed away from
+    all other vertices. Instead of computing repulsion for every pair
+    of vertices, vertices are grouped in grid_size x grid_size cells,
+    and every vertex is pushed away from centers of mass of the cells.
+    A single iteration takes O(V * grid_size^2 + E) time.
+    initial can map some vertices to their starting positions.
+    Returns dictionary of positions, scaled to [-1, 1] like networkx.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(nodes)
+    if count == 0:
+        return {}
+    index = {node: i for i, node in enumerate(nodes)}
+    position = rng.random((count, 2))
+    if initial:
+        for node, i in index.items():
+            if node in initial:
+                position[i] = initial[node]
+    if count == 1:
+        return {nodes[0]: np.zeros(2)}
+    sources = np.fromiter((index[u] for u, v in edges), dtype=np.intp,
+                          count=len(edges))
+    targets = np.fromiter((index[v] for u, v in edges), dtype=np.intp,
+                          count=len(edges))
+
+    k = 1 / np.sqrt(count)  # optimal distance between vertices
+    temperature = 0.1 * max(np.ptp(position, axis=0).max(), 1e-3)
+    cooling = temperature / (iterations + 1)
+    cells = grid_size * grid_size
+    for _ in range(iterations):
+        # mass and center of mass of every cell of the grid
+        low = position.min(axis=0)
+        extent = np.maximum(np.ptp(position, axis=0), 1e-9)
+        cell_xy = np.minimum((position - low) / extent * grid_size,
+                             grid_size - 1).astype(np.intp)
+        cell = cell_xy[:, 0] * grid_size + cell_xy[:, 1]
+        mass = np.bincount(cell, minlength=cells).astype(float)
+        filled = mass > 0
+        centers = np.stack([
+            np.bincount(cell, position[:, 0], cells)[filled],
+            np.bincount(cell, position[:, 1], cells)[filled]], axis=1) \
+            / mass[filled, None]
+        mass = mass[filled]
+
+        # repulsion from every cell, k^2 / distance for each vertex in it,
+        # sum of weight * (position - center) is computed as matrix product
+        displacement = np.empty_like(position)
+        centers32 = centers.astype(np.float32)
+        for start in range(0, count, 8192):
+            chunk = position[start:start + 8192].astype(np.float32)
+            dx = chunk[:, 0, None] - centers32[None, :, 0]
+            dy = chunk[:, 1, None] - centers32[None, :, 1]
+            weight = dx * dx
+            weight += dy * dy
+            np.maximum(weight, 1e-6, out=weight)
+            np.divide(k * k * mass.astype(np.float32), weight, out=weight)
+            displacement[start:start + 8192] = \
+                chunk * weight.sum(axis=1)[:, None] - weight @ centers32
+
+        # attraction along edges, distance^2 / k
+        delta = position[sources] - position[targets]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+        pull = delta * (distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(sources, pull[:, axis], count)
+            displacement[:, axis] += np.bincount(targets, pull[:, axis], count)
+
+        # every vertex moves at most by the current temperature
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        position += displacement * (np.minimum(length, temperature)
+                                    / length)[:, None]
+        temperature -= cooling
+
+    position -= position.mean(axis=0)
+    scale = np.abs(position).max()
+    if scale > 0:
+        position /= scale
+    return {node: position[i] for node, i in index.items()}
+
+
+class LayoutEngine:
+    """
+    LayoutEngine computes and caches positions of vertices of graphs.
+    Layouts are kept in a least recently used cache, with at most
+    cache_size graphs, keyed by the canonical hash of their edges, so
+    drawing the same graph again does not compute anything.
+    Graphs with more than large_graph vertices use the NumPy layout.
+    If most of the vertices of a new graph were in the previous
+    layout, their positions are used as a warm start and fewer
+    iterations are needed.
+    """
+
+    def __init__(self, cache_size=16, large_graph=500, iterations=50,
+                 warm_iterations=15):
+        self.cache_size = cache_size
+        self.large_graph = large_graph
+        self.iterations = iterations
+        self.warm_iterations = warm_iterations
+        self.cache = OrderedDict()
+        self.previous = None  # positions of the last computed layout
+
+    def layout(self, edges):
+        """
+        Returns dictionary mapping every vertex in edges to its
+        position, from the cache if the same edges were laid out before.
+        """
+        key = edges_hash(edges)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        import networkx as nx  # slow to import, loaded by the first layout
+        G = nx.Graph()
+        G.add_edges_from(edges)
+        initial = None
+        iterations = self.iterations
+        if self.previous is not None:
+            known = sum(1 for node in G if node in self.previous)
+            if known * 2 >= G.number_of_nodes():
+                initial = self.warm_start(G, self.previous)
+                iterations = self.warm_iterations
+
+        if G.number_of_nodes() > self.large_graph:
+            positions = force_directed_layout(list(G.nodes), list(G.edges),
+                                              initial, iterations)
+        elif initial is not None:
+            positions = nx.spring_layout(G, pos=initial,
+                                         iterations=iterations, seed=0)
+        else:
+            positions = nx.spring_layout(G, seed=0)
+
+        self.previous = positions
+        self.cache[key] = positions
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return positions
+
+    def warm_start(self, G, previous):
+        """
+        Starting positions for vertices of G. Vertices laid out before
+        keep their positions, new vertices are placed at the center
+        of their neighbors that have positions, or near the origin.
+        """
+        rng = np.random.default_rng(0)
+        initial = {node: previous[node] for node in G if node in previous}
+        for node in G:
+            if node in initial:
+                continue
+            placed = [initial[neighbor] for neighbor in G[node]
+                      if neighbor in initial]
+            center = np.mean(placed, axis=0) if placed else np.zeros(2)
+            initial[node] = center + rng.normal(scale=0.05, size=2)
+        return initial
@@ -0,0 +1,215 @@
+import gzip
+import os
+import re
+import sys
+from array import array
+from collections.abc import Sequence
+
+"""
+Reading graphs from files into flat integer arrays.
+Supported formats are text edge lists, with two vertices in every line
+separated by a comma and/or whitespace, optionally compressed with gzip,
+NumPy .npy files with an (E, 2) or flat integer array, which are memory
+mapped, and raw files of int32 pairs (.bin, .i32). Lines starting with
+# or % are comments, eg. headers of SNAP and Matrix Market files.
+Text is read in chunks of CHUNK_SIZE bytes, and a whole chunk is
+checked with a single regular expression, instead of line by line.
+"""
+
+# Number of bytes of text read and parsed at once.
+CHUNK_SIZE = 1 << 22
+
+# Largest vertex label that fits in the int32 arrays used by Graph.
+MAX_VERTEX = 2 ** 31 - 1
+
+RAW_SUFFIXES = (".bin", ".i32")
+
+# After comments are removed and tabs replaced by spaces, every line
+# is either an edge or empty.
+LINE = rb"(?: *\d+ *[ ,] *\d+ *\n| *\n)"
+LINE_PATTERN = re.compile(LINE)
+CHUNK_PATTERN = re.compile(LINE + rb"*")
+COMMENT_PATTERN = re.compile(rb"[#%][^\n]*")
+
+
+class EdgeArray(Sequence):
+    """
+    EdgeArray is a list of edges stored in a single flat array of
+    endpoints, [u0, v0, u1, v1, ...], which can be an array('i') or
+    a NumPy array, eg. memory mapped from a file. It takes 8 bytes per
+    edge instead of about 120 for a list of lists. edges[i] returns
+    a new [u, v] list, so it can be used anywhere a list of lists of
+    edges is, eg. in the Graph class, which uses endpoints directly
+    to build adjacency arrays. np.asarray(edges) returns an (E, 2) array.
+    """
+
+    def __init__(self, endpoints=None):
+        self.endpoints = array('i') if endpoints is None else endpoints
+
+    def __len__(self):
+        return len(self.endpoints) // 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("edge index out of range")
+        return [int(self.endpoints[2 * index]),
+                int(self.endpoints[2 * index + 1])]
+
+    def __array__(self, dtype=None, copy=None):
+        import numpy as np
+
+        pairs = np.asarray(self.endpoints).reshape(-1, 2)
+        return pairs if dtype is None else pairs.astype(dtype)
+
+    def number_of_vertices(self):
+        # Largest vertex label plus one, so that every label is a vertex.
+        if len(self.endpoints) == 0:
+            return 0
+        if hasattr(self.endpoints, "max"):
+            return int(self.endpoints.max()) + 1  # NumPy array
+        return max(self.endpoints) + 1
+
+
+def parse_chunk(chunk, endpoints, first_line=1):
+    """
+    Checks that every line of chunk, bytes ending with a new line,
+    is an edge, an empty line or a comment, and appends vertices of
+    every edge to endpoints. first_line is the number of the first
+    line of chunk in the file, used in error messages.
+    Raises ValueError if a line is not correct.
+    """
+    text = chunk
+    if b"#" in text or b"%" in text:
+        text = COMMENT_PATTERN.sub(b"", text)
+    if b"\r" in text:
+        text = text.replace(b"\r", b"")
+    if b"\t" in text:
+        text = text.replace(b"\t", b" ")
+    if CHUNK_PATTERN.fullmatch(text) is None:
+        # only now lines are checked one by one, to find the wrong one
+        lines = zip(text.split(b"\n"), chunk.split(b"\n"))
+        for number, (line, original) in enumerate(lines, first_line):
+            if LINE_PATTERN.fullmatch(line + b"\n") is None:
+                raise ValueError("line %d is not an edge: %r" % (
+                    number, original.decode("utf-8", "replace")))
+    try:
+        endpoints.extend(map(int, text.replace(b",", b" ").split()))
+    except OverflowError:
+        raise ValueError("vertex labels must be at most %d" % MAX_VERTEX)
+
+
+def read_edge_list(file, chunk_size=CHUNK_SIZE):
+    """
+    Reads a text edge list from a binary file object in chunks.
+    Returns EdgeArray with all edges in the order they are in the file.
+    """
+    endpoints = array('i')
+    rest = b""
+    line = 1
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+        data = rest + data
+        end = data.rfind(b"\n") + 1  # chunks end after the last full line
+        chunk, rest = data[:end], data[end:]
+        parse_chunk(chunk, endpoints, line)
+        line += chunk.count(b"\n")
+    if rest:
+        parse_chunk(rest + b"\n", endpoints, line)
+    return EdgeArray(endpoints)
+
+
+def parse_edge_text(text):
+    # Parses edges from a string, eg. typed in the GUI.
+    endpoints = array('i')
+    if text:
+        parse_chunk(text.encode() + b"\n", endpoints)
+    return EdgeArray(endpoints)
+
+
+def check_endpoints(endpoints):
+    """
+    Checks in bulk that a NumPy array of endpoints can be used as
+    edges: it holds integers between 0 and MAX_VERTEX, in pairs.
+    Returns it as a flat int32 array, copied only if it was not one.
+    """
+    import numpy as np
+
+    if endpoints.dtype.kind not in "iu":
+        raise ValueError("vertex labels must be integers, not %s"
+                         % endpoints.dtype)
+    if not (endpoints.ndim == 1 and len(endpoints) % 2 == 0 or
+            endpoints.ndim == 2 and endpoints.shape[1] == 2):
+        raise ValueError("edges must be an (E, 2) array or a flat array of "
+                         "pairs, not shape %s" % (endpoints.shape,))
+    flat = endpoints.reshape(-1)
+    if len(flat) and (flat.min() < 0 or flat.max() > MAX_VERTEX):
+        raise ValueError("vertex labels must be between 0 and %d"
+                         % MAX_VERTEX)
+    if flat.dtype != np.intc or not flat.flags.c_contiguous:
+        flat = np.ascontiguousarray(flat, dtype=np.intc)
+    return flat
+
+
+def load_npy(path):
+    # Memory maps edges from a .npy file.
+    import numpy as np
+
+    return EdgeArray(check_endpoints(np.load(path, mmap_mode="r")))
+
+
+def load_raw(path):
+    """
+    Reads edges from a file of little-endian int32 pairs, memory mapped
+    with NumPy if it is installed, and read into an array otherwise.
+    """
+    size = os.path.getsize(path)
+    if size % 8:
+        raise ValueError("file size %d is not a multiple of 8 bytes, "
+                         "it does not hold int32 pairs" % size)
+    if size == 0:
+        return EdgeArray()
+    try:
+        import numpy as np
+    except ImportError:
+        endpoints = array('i')
+        with open(path, "rb") as file:
+            while True:
+                data = file.read(CHUNK_SIZE)
+                if not data:
+                    break
+                endpoints.frombytes(data)
+        if sys.byteorder == "big":
+            endpoints.byteswap()
+        if min(endpoints) < 0:
+            raise ValueError("vertex labels must not be negative")
+        return EdgeArray(endpoints)
+    return EdgeArray(check_endpoints(np.memmap(path, dtype="<i4", mode="r")))
+
+
+def load_edges(path):
+    """
+    Reads edges from path, in a format given by its extension:
+    .npy for NumPy arrays, .bin or .i32 for raw int32 pairs and a text
+    edge list otherwise. Text files compressed with gzip are recognized
+    by their first bytes, whatever their extension is.
+    Returns number of vertices, the largest label plus one,
+    and EdgeArray of edges. Raises ValueError if the file is not correct.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".npy":
+        edges = load_npy(path)
+    elif suffix in RAW_SUFFIXES:
+        edges = load_raw(path)
+    else:
+        with open(path, "rb") as file:
+            compressed = file.read(2) == b"\x1f\x8b"
+        opener = gzip.open if compressed else open
+        with opener(path, "rb") as file:
+            edges = read_edge_list(file)
+    return edges.number_of_vertices(), edges
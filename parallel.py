@@ -0,0 +1,334 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from multiprocessing import shared_memory
+import os
+import numpy as np
+from cli import attach, release
+from loader import EdgeArray
+from validation import UnionFind
+
+"""
+Bridge finding in a single large graph with many processes.
+Depth-first search can not be split between processes, so bridges
+are found from a spanning forest instead, as in the parallel algorithm
+of Tarjan and Vishkin:
+1. Edges are split into one chunk for every worker, and every worker
+   finds a spanning forest of its chunk with union-find. Forests are
+   then joined in pairs, also by workers, until one is left. A forest
+   keeps the component of every vertex, so joining two of them only
+   checks edges of the second one between components of the first.
+2. The main process numbers vertices of the forest in preorder, so
+   that every subtree is a range of numbers [pre, pre + size), from an
+   Euler tour of the forest, whose order is found by pointer jumping.
+3. Workers find, for every vertex, the lowest and highest preorder
+   number of a vertex joined to it by an edge outside the forest,
+   for their chunk of edges, and the results are merged.
+4. A forest edge from parent to x is a bridge if no vertex in the
+   subtree of x has such an edge leaving the range of the subtree,
+   which is found for all ranges at once with a sparse table.
+Steps 1 and 3 take O(E / workers) time. Steps 2 and 4 are done by the
+main process in O(V log V) time, but with O(log V) NumPy operations on
+whole arrays instead of a loop over vertices. Endpoints of edges,
+preorder numbers and edges of the forest are put in one block of shared
+memory, as in cli.py, which every worker of a single pool attaches to
+when it starts, so they are never pickled.
+"""
+
+# Arrays used by tasks, views of the block of shared memory in workers,
+# set once when a worker starts.
+_worker_n = 0
+_worker_block = None
+_worker_endpoints = None
+_worker_pre = None
+_worker_in_forest = None
+
+
+def _set_arrays(n, endpoints, pre, in_forest):
+    # Sets arrays used by tasks in this process.
+    global _worker_n, _worker_endpoints, _worker_pre, _worker_in_forest
+    _worker_n = n
+    _worker_endpoints = endpoints
+    _worker_pre = pre
+    _worker_in_forest = in_forest
+
+
+def _init_worker(n, count, name):
+    """
+    Attaches a worker to the block of shared memory with endpoints of
+    count edges, followed by preorder numbers of n vertices and a byte
+    for every edge, 1 if it is in the spanning forest. The last two are
+    written by the main process after the forest is found, before any
+    task uses them. The block stays open while the worker runs.
+    """
+    global _worker_block
+    _worker_block = attach(name)
+    buffer = _worker_block.buf
+    _set_arrays(n, buffer[:8 * count].cast("i"),
+                np.frombuffer(buffer, np.intc, n, 8 * count),
+                np.frombuffer(buffer, bool, count, 8 * count + 4 * n))
+
+
+def _components(forest):
+    """
+    Returns the root of union-find forest of every vertex, as a NumPy
+    array. Every vertex is moved to its grandparent at once until
+    all of them point to roots, which takes O(log V) passes.
+    """
+    parent = np.frombuffer(forest.parent, dtype=np.intc)
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+
+def _spanning_forest(edge_ids, components=None):
+    """
+    Returns ids of edges, among edge_ids, which form a spanning forest
+    of them, and the component of every vertex. An edge is kept if it
+    joins two different sets of union-find, so every kept edge joins two
+    different trees. If components are given, union-find starts with
+    them, so only edges between them are kept.
+    """
+    endpoints = _worker_endpoints
+    forest = UnionFind(0 if components is not None else _worker_n)
+    if components is not None:
+        # every vertex points to the root of its component
+        forest.parent = array('i', components.tobytes())
+        forest.size = array('i', np.bincount(
+            components, minlength=_worker_n).astype(np.intc).tobytes())
+    union = forest.union
+    kept = array('i')
+    for edge_id in edge_ids:
+        if union(endpoints[2 * edge_id], endpoints[2 * edge_id + 1]):
+            kept.append(edge_id)
+    return kept, _components(forest)
+
+
+def _join_forests(forests):
+    """
+    Joins a list of one or two spanning forests, each given by ids of
+    its edges and components, into one. Edges of the second forest
+    inside components of the first one are skipped with NumPy, and only
+    the remaining ones are checked with union-find.
+    """
+    if len(forests) == 1:
+        return forests[0]
+    (first, components), (second, _) = forests
+    pairs = np.frombuffer(_worker_endpoints, dtype=np.intc).reshape(-1, 2)
+    second = np.frombuffer(second, dtype=np.intc)
+    ends = components[pairs[second]]
+    crossing = second[ends[:, 0] != ends[:, 1]]
+    kept, components = _spanning_forest(crossing.tolist(), components)
+    return first + kept, components
+
+
+def _reach(edge_range):
+    """
+    For edges from edge_range which are not in the spanning forest,
+    returns the lowest and highest preorder number of a vertex joined
+    by such an edge to every vertex, n and -1 if there is none.
+    """
+    start, end = edge_range
+    n = _worker_n
+    pairs = np.frombuffer(_worker_endpoints, dtype=np.intc)[
+        2 * start:2 * end].reshape(-1, 2)
+    pairs = pairs[~_worker_in_forest[start:end]]
+    low = np.full(n, n, dtype=np.intc)
+    high = np.full(n, -1, dtype=np.intc)
+    for this, other in ((0, 1), (1, 0)):
+        reached = _worker_pre[pairs[:, other]]
+        np.minimum.at(low, pairs[:, this], reached)
+        np.maximum.at(high, pairs[:, this], reached)
+    return low, high
+
+
+def preorder_forest(n, endpoints, forest, components):
+    """
+    Numbers vertices in preorder of the forest, given by ids of its
+    edges and the component of every vertex, with an Euler tour of every
+    tree. Every tree is rooted at its smallest vertex, and trees are
+    numbered in order of their roots, like in tarjans_iterative.
+    Only NumPy operations on whole arrays are used, O(log V) of them.
+    Returns preorder numbers, parents, -1 for roots, and sizes of
+    subtrees of all vertices, as NumPy arrays.
+    """
+    vertices = np.arange(n)
+    labels, first = np.unique(components, return_index=True)
+    ranks = np.empty(n, dtype=np.intp)
+    ranks[labels[np.argsort(first)]] = np.arange(len(labels))
+    trees = ranks[components]  # tree of every vertex
+    roots = np.sort(first)
+    tree_sizes = np.bincount(trees)
+    before = np.cumsum(tree_sizes) - tree_sizes  # vertices of earlier trees
+
+    # every forest edge is taken in both directions, arc i goes from
+    # ends[i] to ends[i ^ 1], and arcs are sorted by the vertex they
+    # leave, like targets in the adjacency arrays of Graph
+    ends = np.frombuffer(endpoints, dtype=np.intc).reshape(-1, 2)[
+        np.frombuffer(forest, dtype=np.intc)].ravel()
+    arcs = len(ends)
+    by_source = np.argsort(ends, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.intp)
+    np.cumsum(np.bincount(ends, minlength=n), out=offsets[1:])
+    place = np.empty(arcs, dtype=np.intp)
+    place[by_source] = np.arange(arcs)
+
+    # in the tour, arc (u, v) is followed by the arc after (v, u)
+    # among arcs leaving v, or by the first of them after the last one
+    back = np.arange(arcs) ^ 1
+    following = place[back] + 1
+    wrapped = following == offsets[ends[back] + 1]
+    following[wrapped] = offsets[ends[back][wrapped]]
+    successor = np.append(by_source[following], arcs).astype(np.intc)
+    # the tour of a tree starts with the first arc leaving the root,
+    # so it ends with the arc coming back to the root from the last one,
+    # which gets the extra arc as its successor
+    roots = roots[offsets[roots + 1] > offsets[roots]]
+    successor[by_source[offsets[roots + 1] - 1] ^ 1] = arcs
+
+    # number of arcs after every arc, by pointer jumping: every arc
+    # keeps the distance to its successor, and the successor of its
+    # successor becomes its own, until it is the extra arc
+    after = (successor != arcs).astype(np.intc)
+    while (successor[:arcs] != arcs).any():
+        after += after[successor]
+        successor = successor[successor]
+
+    # position in one tour of all trees, going down a tree an arc comes
+    # before the arc back, and the preorder number of a vertex is the
+    # number of arcs going down before the one to it, and of roots
+    trees_of_arcs = trees[ends]
+    position = (2 * (before - np.arange(len(before))) +
+                2 * (tree_sizes - 1) - 1)[trees_of_arcs] - after[:arcs]
+    down = position < position[back]
+    tour = np.empty(arcs, dtype=np.intp)
+    tour[position] = np.arange(arcs)
+    counted = np.empty(arcs, dtype=np.intp)
+    counted[tour] = np.cumsum(down[tour])
+    down = np.flatnonzero(down)
+    children = ends[down ^ 1]
+
+    pre = before[trees].astype(np.intc)
+    pre[children] = trees[children] + counted[down]
+    parent = np.full(n, -1, dtype=np.intc)
+    parent[children] = ends[down]
+    sizes = tree_sizes[trees]
+    # arcs going down between the arcs to a vertex and back
+    sizes[children] = counted[down ^ 1] - counted[down] + 1
+    return pre, parent, sizes
+
+
+def _subtree_extremes(low, high, sizes):
+    """
+    Returns the lowest of low and the highest of high in the range
+    [i, i + sizes[i]) for every i. A range of length at least 2^k is
+    covered by two ranges of length 2^k, one from each end, whose
+    extremes are found from those of ranges of length 2^(k - 1), so
+    only one level of this sparse table is kept at once.
+    O(V log V) time, in O(log V) NumPy operations.
+    """
+    lowest = low.copy()
+    highest = high.copy()
+    levels = np.log2(sizes).astype(np.intp)
+    for level in range(1, int(levels.max()) + 1):
+        half = 1 << (level - 1)
+        low = np.minimum(low[:-half], low[half:])
+        high = np.maximum(high[:-half], high[half:])
+        starts = np.flatnonzero(levels == level)
+        last = starts + sizes[starts] - (1 << level)
+        lowest[starts] = np.minimum(low[starts], low[last])
+        highest[starts] = np.maximum(high[starts], high[last])
+    return lowest, highest
+
+
+def find_bridges_parallel(n, edges, workers=None):
+    """
+    Finds bridges of a graph with n vertices and edges, a list of
+    [u, v] lists or an EdgeArray, with workers processes, one for every
+    CPU by default, or in this process if workers is 1.
+    Every connected component is searched and parallel edges are never
+    bridges. Bridges are the same as found by tarjans_iterative,
+    as (parent, child) pairs of the spanning forest, in preorder.
+    """
+    if isinstance(edges, EdgeArray):
+        endpoints = edges.endpoints
+        if not isinstance(endpoints, array):
+            endpoints = array('i', np.ascontiguousarray(
+                endpoints, dtype=np.intc).tobytes())
+    else:
+        endpoints = array('i', chain.from_iterable(edges))
+    count = len(endpoints) // 2
+    if n == 0 or count == 0:
+        return []
+    workers = workers or os.cpu_count() or 1
+    chunk = -(-count // workers)  # round up
+    ranges = [(start, min(start + chunk, count))
+              for start in range(0, count, chunk)]
+
+    if workers == 1:
+        # 1. spanning forest, 2. preorder numbers, 3. vertices reached
+        # by edges outside the forest, all in this process
+        _set_arrays(n, endpoints, None, None)
+        forest, components = _spanning_forest(range(count))
+        pre, parent, sizes = preorder_forest(n, endpoints, forest,
+                                             components)
+        in_forest = np.zeros(count, dtype=bool)
+        in_forest[np.frombuffer(forest, dtype=np.intc)] = True
+        _set_arrays(n, endpoints, pre, in_forest)
+        low, high = _reach((0, count))
+    else:
+        # Workers attach to one block of shared memory and use one pool
+        # for both of their steps. Creating the block starts the resource
+        # tracker of this process before the workers, which share it.
+        block = shared_memory.SharedMemory(
+            create=True, size=8 * count + 4 * n + count)
+        try:
+            block.buf[:8 * count] = memoryview(endpoints).cast("B")
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_worker,
+                                     initargs=(n, count, block.name)) \
+                    as executor:
+                # 1. spanning forest of every chunk, joined in pairs
+                forests = list(executor.map(
+                    _spanning_forest, [range(*edge_range)
+                                       for edge_range in ranges]))
+                while len(forests) > 1:
+                    pairs = [forests[i:i + 2]
+                             for i in range(0, len(forests), 2)]
+                    forests = list(executor.map(_join_forests, pairs))
+                forest, components = forests[0]
+
+                # 2. preorder numbers of the forest, written for workers
+                pre, parent, sizes = preorder_forest(n, endpoints, forest,
+                                                     components)
+                in_forest = np.zeros(count, dtype=bool)
+                in_forest[np.frombuffer(forest, dtype=np.intc)] = True
+                start = 8 * count
+                block.buf[start:start + 4 * n] = pre.tobytes()
+                block.buf[start + 4 * n:start + 4 * n + count] = \
+                    in_forest.tobytes()
+
+                # 3. vertices reached by edges outside the forest
+                low = high = None
+                for part_low, part_high in executor.map(_reach, ranges):
+                    if low is None:
+                        low, high = part_low, part_high
+                    else:
+                        np.minimum(low, part_low, out=low)
+                        np.maximum(high, part_high, out=high)
+        finally:
+            release(block)
+
+    # 4. lowest and highest number reached from every subtree, vertices
+    # are indexed by preorder number, so a subtree is a range of them
+    order = np.empty(n, dtype=np.intp)
+    order[pre] = np.arange(n)
+    sizes = sizes[order]
+    low, high = _subtree_extremes(np.minimum(low, pre)[order],
+                                  np.maximum(high, pre)[order], sizes)
+    numbers = np.arange(n)
+    parents = parent[order]
+    is_bridge = (parents >= 0) & (low >= numbers) & (high < numbers + sizes)
+    return list(zip(parents[is_bridge].tolist(), order[is_bridge].tolist()))
@@ -1,26 +1,29 @@
-import matplotlib.pyplot as plt
 import timeit
 from functools import partial
 import random
-from collections import defaultdict
-# from memory_profiler import profile
 import sys
-
-sys.setrecursionlimit(11000)  # Python default recursion limit is 1000.
+from graph import Graph
+from delta_trace import run_steps
+# from memory_profiler import profile
 
 """
 This python script is used to measure time and memory usage by algorithms
 implemented in the project.
-Most of the functions (make_dicionary_graph(), sort_edges() and all algorithms)
-are reimplemented in this file due to the fact that they were also 
-responsible for adding data to visualization_data, which would
-significantly alter time and memory usage.
+Algorithms are run through step generators of the Graph class with
+tracing turned off, because adding data to visualization_data would
+significantly alter time and memory usage. Adjacency arrays are built
+by the Graph class, the same as when algorithms are traced.
 Time results for different input are shown as a matplotlib graph for
 every algorithm
 Memory usage is measured using python module, called memory_profiler.
 https://pypi.org/project/memory-profiler/
 Decorator @profile is commented out because it affects drawing graphs.
 It can be easily reverted, but only time or memory can be measured at once.
+benchmark.py measures both time and memory in one run, with tracemalloc,
+for traced and untraced versions of the algorithms.
+Given a path to an edge list, or a .npy or int32 file, the script
+measures time of algorithms on that graph instead:
+python performance.py graph.txt.gz
 """
 
 
@@ -35,83 +38,22 @@ def generate_edges(n):
     return edges
 
 
-def make_dictionary_graph(edges):
-    dictionary_graph = defaultdict(list)
-    for edge in edges:
-        dictionary_graph[edge[0]].append(edge[1])
-        dictionary_graph[edge[1]].append(edge[0])
-    return dictionary_graph
-
-
-def sort_edges(edges):
-    sorted_edges = set()
-    for edge in edges:
-        edge.sort()
-        sorted_edges.add((edge[0], edge[1]))
-    return sorted_edges
-
-
 # @profile
 def dfs_brute_force(n):
-    edges = generate_edges(n)
-
-    def dfs(visited, graph, vertex):
-        if vertex not in visited:
-            visited.add(vertex)
-            for neighbor in graph[vertex]:
-                dfs(visited, graph, neighbor)
-    bridges = []
-    for i in range(len(edges)):
-        removed_edge = edges[i]
-        combination = (edges[:i] + edges[i+1:])
-        graph = make_dictionary_graph(combination)
-        visited = set()
-        dfs(visited, graph, list(graph.keys())[0])
-        if len(visited) != n:
-            bridges.append(tuple(removed_edge))
+    graph = Graph(n, generate_edges(n))
+    run_steps(graph.dfs_brute_force_steps(trace=False))
 
 
 # @profile
 def tarjans_algorithm(n):
-    edges = generate_edges(n)
-    graph = make_dictionary_graph(edges)
-    disc, low, time, bridges = [0] * n, [0] * n, [1], []
-
-    def dfs(curr, prev):
-        disc[curr] = low[curr] = time[0]
-        time[0] += 1
-        for next in graph[curr]:
-            if not disc[next]:
-                dfs(next, curr)
-                low[curr] = min(low[curr], low[next])
-            elif next != prev:
-                low[curr] = min(low[curr], disc[next])
-            if low[next] > disc[curr]:
-                bridges.append((curr, next))
-    dfs(0, -1)
+    graph = Graph(n, generate_edges(n))
+    run_steps(graph.tarjans_algorithm_steps(trace=False))
 
 
 # @profile
 def kaiwensun_bridges(n):
-    edges = generate_edges(n)
-    edges = sort_edges(edges)
-    rank = [-2] * n
-    graph = make_dictionary_graph(edges)
-
-    def dfs(vertex, depth):
-        if rank[vertex] >= 0:
-            return rank[vertex]
-        rank[vertex] = depth
-        min_back_depth = n
-        for neighbor in graph[vertex]:
-            if rank[neighbor] == depth - 1:
-                continue
-            back_depth = dfs(neighbor, depth + 1)
-            if back_depth <= depth:
-                edges.discard(tuple(sorted((vertex, neighbor))))
-            min_back_depth = min(min_back_depth, back_depth)
-        return min_back_depth
-    dfs(0, 0)
+    graph = Graph(n, generate_edges(n))
+    run_steps(graph.kaiwensun_bridges_steps(trace=False))
 
 
 def plot_function(function, n_min, n_max, interval, tests, color):
@@ -126,6 +68,7 @@ def plot_function(function, n_min, n_max, interval, tests, color):
     tests - number of test for every function
     color - specifies color for each algorithm
     """
+    import matplotlib.pyplot as plt  # not needed to measure a file
     x = []  # x-axis data, input size
     y = []  # y-axis data, time (s) taken to complete algorithm
     for i in range(n_min, n_max, interval):
@@ -140,11 +83,37 @@ def plot_function(function, n_min, n_max, interval, tests, color):
     plt.ylabel("time (s)")
 
 
+def measure_file(path, tests=1):
+    """
+    Reads a graph from path with Graph.from_file and prints time taken
+    by every linear algorithm on it, the fastest of tests runs.
+    Time of reading the file and building adjacency arrays is printed
+    separately.
+    """
+    start = timeit.default_timer()
+    graph = Graph.from_file(path)
+    print("load: %.3f s, %d vertices, %d edges" % (
+        timeit.default_timer() - start, graph.n, len(graph.edges)))
+    start = timeit.default_timer()
+    graph.get_adjacency()
+    print("adjacency: %.3f s" % (timeit.default_timer() - start))
+    for steps in (graph.tarjans_algorithm_steps,
+                  graph.kaiwensun_bridges_steps,
+                  graph.chain_decomposition_steps):
+        timer_test = timeit.Timer(lambda: run_steps(steps(trace=False)))
+        t = min(timer_test.repeat(repeat=tests, number=1))
+        print("%s: %.3f s" % (steps.__name__[:-len("_steps")], t))
+
+
 # call main
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        measure_file(sys.argv[1])
+        sys.exit()
     plot_function(dfs_brute_force, 1, 1000, 10, 10, "og")
     plot_function(tarjans_algorithm, 1, 1000, 10, 10, "or")
     plot_function(kaiwensun_bridges, 1, 1000, 10, 10, "ob")
+    import matplotlib.pyplot as plt
     plt.show()  # Show final plot
     # used for memory profilling functions
     # dfs_brute_force(500)
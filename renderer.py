@@ -0,0 +1,107 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+
+"""
+Drawing of graphs with bridges on a matplotlib figure.
+networkx draws every edge, vertex and label as a separate artist,
+which is very slow for large graphs. GraphRenderer draws all edges
+as a single LineCollection and all vertices as a single scatter,
+and leaves out details that can not be seen anyway when a graph
+is large.
+"""
+
+BRIDGE_COLOR = "red"
+EDGE_COLOR = "blue"
+NODE_COLOR = "#1f78b4"  # default color of vertices in networkx
+
+
+def normalize_bridges(bridges):
+    # Set of bridges as (smaller vertex, larger vertex) pairs.
+    return {(min(u, v), max(u, v)) for u, v in bridges}
+
+
+class GraphRenderer:
+    """
+    GraphRenderer draws a graph on matplotlib axes, with bridges in red.
+    Bridges are looked up in a set, so every edge is checked in O(1)
+    time, whichever way round its vertices are given.
+    Level of detail depends on the size of a graph:
+    labels of vertices are drawn only up to label_limit vertices,
+    with more than thin_limit edges only every few non-bridge edges
+    are drawn, so that about thin_limit of them are left, and with
+    more than bridges_limit edges only bridges are drawn.
+    Bridges are always drawn, on top of other edges.
+    Artists of the last drawing are kept in edge_collection,
+    node_collection and labels, drawn_edges holds the index in edges
+    of every line in edge_collection, segments holds their endpoints
+    and nodes holds the vertex of every point in node_collection and
+    every label.
+    """
+
+    def __init__(self, label_limit=100, thin_limit=10000,
+                 bridges_limit=1000000):
+        self.label_limit = label_limit
+        self.thin_limit = thin_limit
+        self.bridges_limit = bridges_limit
+        self.edge_collection = None
+        self.node_collection = None
+        self.labels = []
+        self.nodes = []
+        self.drawn_edges = None
+        self.segments = None
+
+    def draw(self, axes, edges, bridges, positions):
+        """
+        Draws edges, vertices and, for small graphs, labels on axes.
+        positions maps every vertex in edges to its (x, y) position.
+        """
+        bridge_set = normalize_bridges(bridges)
+        is_bridge = np.fromiter(
+            ((min(u, v), max(u, v)) in bridge_set for u, v in edges),
+            dtype=bool, count=len(edges))
+
+        nodes = list(positions)
+        self.nodes = nodes
+        coordinates = np.zeros((max(nodes, default=-1) + 1, 2))
+        if nodes:
+            coordinates[nodes] = [positions[node] for node in nodes]
+
+        # indices of drawn edges, bridges last so they are on top
+        others = np.flatnonzero(~is_bridge)
+        if len(edges) > self.bridges_limit:
+            others = others[:0]
+        elif len(edges) > self.thin_limit:
+            others = others[::-(-len(others) // self.thin_limit)]
+        self.drawn_edges = np.concatenate([others, np.flatnonzero(is_bridge)])
+
+        large = len(edges) > self.thin_limit
+        endpoints = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+        segments = coordinates[endpoints[self.drawn_edges]]
+        self.segments = segments
+        colors = np.empty((len(self.drawn_edges), 4))
+        colors[:len(others)] = to_rgba(EDGE_COLOR)
+        colors[len(others):] = to_rgba(BRIDGE_COLOR)
+        widths = np.full(len(self.drawn_edges), 1.0)
+        if large:
+            widths[:len(others)] = 0.3
+            widths[len(others):] = 2.0
+        self.edge_collection = LineCollection(segments, colors=colors,
+                                              linewidths=widths)
+        axes.add_collection(self.edge_collection)
+
+        node_size = 300 if len(nodes) <= self.label_limit else \
+            max(1, 30000 / len(nodes))
+        self.node_collection = axes.scatter(
+            coordinates[nodes, 0], coordinates[nodes, 1], s=node_size,
+            c=NODE_COLOR, zorder=2)
+
+        self.labels = []
+        if len(nodes) <= self.label_limit:
+            for node in nodes:
+                self.labels.append(axes.text(
+                    coordinates[node, 0], coordinates[node, 1], str(node),
+                    ha="center", va="center", fontsize=12, zorder=3))
+
+        axes.autoscale_view()
+        axes.set_axis_off()
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+import sys
+import time
+
+"""
+Optional instrumentation of algorithms of the Graph class.
+It is turned on by Graph.instrument(), and then every run of an
+algorithm fills an AlgorithmStats object with time spent in every
+phase, building adjacency arrays, searching, recording the trace and
+assembling the result, and with counters of the work done.
+When it is turned off, algorithms only check once if graph.stats is
+None, and step generators check a local variable when they push
+a vertex on the stack, so the overhead is negligible.
+"""
+
+# Phases of an algorithm, in the order they are shown.
+PHASES = ["adjacency", "search", "trace", "result"]
+
+
+class AlgorithmStats:
+    """
+    AlgorithmStats holds statistics of one run of an algorithm:
+    - phases: seconds spent in every phase of PHASES,
+    - vertices_visited: vertices entered by depth-first search,
+      summed over all searches of the brute-force algorithm,
+    - edge_relaxations: entries of adjacency arrays checked, summed
+      over all searches of the brute-force algorithm,
+    - max_stack_depth: length of the longest DFS path, 0 if the
+      algorithm keeps no path,
+    - trace_steps and trace_bytes: number of steps of visualization
+      data and approximate number of bytes they take,
+    - profile: pstats.Stats of the run, if it was profiled.
+    """
+
+    def __init__(self, algorithm=None):
+        self.algorithm = algorithm  # None until an algorithm is run
+        self.phases = OrderedDict((phase, 0.0) for phase in PHASES)
+        self.vertices_visited = 0
+        self.edge_relaxations = 0
+        self.max_stack_depth = 0
+        self.trace_steps = 0
+        self.trace_bytes = 0
+        self.profile = None
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase):
+        # Adds time spent in a with block to phase.
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def count(self, vertices=0, relaxations=0, depth=0):
+        # Adds work done by one search.
+        self.vertices_visited += vertices
+        self.edge_relaxations += relaxations
+        self.max_stack_depth = max(self.max_stack_depth, depth)
+
+    def as_dict(self):
+        """
+        Returns counters and times of phases, as "<phase>_seconds",
+        in one flat dictionary, eg. for a row of benchmark results.
+        """
+        result = {
+            "vertices_visited": self.vertices_visited,
+            "edge_relaxations": self.edge_relaxations,
+            "max_stack_depth": self.max_stack_depth,
+            "trace_steps": self.trace_steps,
+            "trace_bytes": self.trace_bytes,
+        }
+        for phase, seconds in self.phases.items():
+            result[phase + "_seconds"] = seconds
+        return result
+
+    def __str__(self):
+        # Text shown in "Algorithm output" of the GUI.
+        lines = ["%s: %.3f ms" % (phase, seconds * 1000)
+                 for phase, seconds in self.phases.items()]
+        lines.append("vertices visited: %d" % self.vertices_visited)
+        lines.append("edge relaxations: %d" % self.edge_relaxations)
+        lines.append("max stack depth: %d" % self.max_stack_depth)
+        lines.append("trace: %d steps, %d bytes" % (self.trace_steps,
+                                                    self.trace_bytes))
+        return "\n".join(lines) + "\n"
+
+
+def trace_bytes(visualization_data):
+    """
+    Approximate number of bytes taken by visualization data, a DeltaTrace,
+    a StoredTrace or a list of rows. Objects shared by rows are counted
+    every time.
+    """
+    if hasattr(visualization_data, "nbytes"):
+        return visualization_data.nbytes()
+    if not visualization_data:
+        return 0  # no trace was saved
+    return sys.getsizeof(visualization_data) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(field) for field in row)
+        for row in visualization_data)
+
+
+def timed(stats, phase, function):
+    """
+    Returns function, which adds time spent in it to phase of stats,
+    or function itself if stats is None, so it costs nothing.
+    """
+    if stats is None:
+        return function
+
+    @wraps(function)
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            stats.add_time(phase, time.perf_counter() - start)
+    return wrapper
+
+
+def measured(adjacency=True):
+    """
+    Decorator of algorithm methods of Graph. If the graph is
+    instrumented, a new AlgorithmStats is made for every run, adjacency
+    arrays are built first if adjacency is True, the method is run,
+    with cProfile if graph.profile is True, and the hook of the graph
+    is called with the statistics. Time of the run not spent in other
+    phases is counted as search.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(graph, *args, **kwargs):
+            if graph.stats is None:
+                return method(graph, *args, **kwargs)
+            stats = graph.stats = AlgorithmStats(method.__name__)
+            if adjacency:
+                with stats.phase("adjacency"):
+                    graph.get_adjacency()
+            start = time.perf_counter()
+            if graph.profile:
+                import cProfile  # only needed when profiling
+                import pstats
+                profiler = cProfile.Profile()
+                result = profiler.runcall(method, graph, *args, **kwargs)
+                stats.profile = pstats.Stats(profiler)
+            else:
+                result = method(graph, *args, **kwargs)
+            stats.add_time("search", time.perf_counter() - start -
+                           stats.phases["trace"] - stats.phases["result"])
+            stats.trace_steps = len(graph.visualization_data)
+            stats.trace_bytes = trace_bytes(graph.visualization_data)
+            if graph.stats_hook is not None:
+                graph.stats_hook(stats)
+            return result
+        return wrapper
+    return decorator
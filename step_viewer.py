@@ -0,0 +1,150 @@
+from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QLabel, QLineEdit, \
+    QListView, QPushButton, QSpinBox, QWidget
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from worker import format_step
+
+"""
+Browser of steps of an algorithm, shown in "Algorithm output".
+Text of every step can be very long, eg. for Tarjan's algorithm it
+contains whole disc and low arrays, so formatting all steps at once
+takes O(V^2) time and memory. StepModel formats a step only when
+the list view asks for it, which happens when the step is visible.
+"""
+
+# Lists in a step are cut to this many items when shown,
+# search uses full text.
+MAX_ITEMS = 100
+
+
+class StepModel(QAbstractListModel):
+    """
+    StepModel is a list model with one row for every step in
+    visualization data of an algorithm, given by the name of its
+    method in the Graph class. Visualization data can be a list or
+    a DeltaTrace, which both allow getting a single step by index.
+    """
+
+    def __init__(self, parent=None):
+        super(StepModel, self).__init__(parent)
+        self.algorithm = None
+        self.visualization_data = []
+        self.count = 0  # Qt asks for it for every row, so it is kept
+
+    def set_steps(self, algorithm, visualization_data):
+        self.beginResetModel()
+        self.algorithm = algorithm
+        self.visualization_data = visualization_data
+        self.count = len(visualization_data)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.count
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.step_text(index.row(), MAX_ITEMS)
+
+    def step_text(self, row, limit=None):
+        # Text of a single step, formatted every time it is needed.
+        return "step " + str(row) + "\n" + format_step(
+            self.algorithm, self.visualization_data[row], limit).rstrip()
+
+    def find(self, text, start=0):
+        """
+        Returns the first step after start, going back to the first
+        step after the last one, whose text contains text, or -1.
+        Steps are formatted one by one, so it takes time proportional
+        to the number of steps searched.
+        """
+        for offset in range(1, self.count + 1):
+            row = (start + offset) % self.count
+            if text in self.step_text(row):
+                return row
+        return -1
+
+
+class StepViewer(QWidget):
+    """
+    StepViewer shows steps of an algorithm in a QListView, together
+    with a box to jump to a step by its number and a search box which
+    selects the next step containing the given text.
+    Summary of an algorithm, or an error message, is shown below.
+    """
+
+    def __init__(self, parent=None):
+        super(StepViewer, self).__init__(parent)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.model = StepModel(self)
+        self.list_view = QListView(self)
+        # every step of an algorithm has the same number of lines
+        self.list_view.setUniformItemSizes(True)
+        # long lists of steps are laid out in parts, between other events
+        self.list_view.setLayoutMode(QListView.Batched)
+        self.list_view.setBatchSize(1000)
+        self.list_view.setModel(self.model)
+        layout.addWidget(self.list_view)
+
+        controls = QHBoxLayout()
+        self.step_box = QSpinBox(self)
+        self.step_box.setPrefix("step ")
+        self.step_box.setMaximum(0)
+        controls.addWidget(self.step_box)
+        jump_button = QPushButton("Go", self)
+        jump_button.clicked.connect(self.jump_to_step)
+        controls.addWidget(jump_button)
+        self.search_text = QLineEdit(self)
+        self.search_text.setPlaceholderText("Search steps")
+        self.search_text.returnPressed.connect(self.find_next)
+        controls.addWidget(self.search_text)
+        find_button = QPushButton("Find", self)
+        find_button.clicked.connect(self.find_next)
+        controls.addWidget(find_button)
+        self.search_status = QLabel(self)
+        controls.addWidget(self.search_status)
+        layout.addLayout(controls)
+
+        self.summary_label = QLabel(self)
+        self.summary_label.setWordWrap(True)
+        self.summary_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.summary_label)
+        self.setLayout(layout)
+
+    def set_steps(self, algorithm, visualization_data, summary=""):
+        # Shows new steps, nothing is formatted until it is visible.
+        self.model.set_steps(algorithm, visualization_data)
+        self.step_box.setMaximum(max(len(visualization_data) - 1, 0))
+        self.summary_label.setText(summary.rstrip())
+
+    def show_message(self, message):
+        # Removes all steps and shows message instead.
+        self.set_steps(None, [], message)
+
+    def current_step(self):
+        index = self.list_view.currentIndex()
+        return index.row() if index.isValid() else -1
+
+    def select_step(self, row):
+        index = self.model.index(row, 0)
+        self.list_view.setCurrentIndex(index)
+        self.list_view.scrollTo(index, QListView.PositionAtTop)
+
+    def jump_to_step(self):
+        if self.model.rowCount():
+            self.select_step(self.step_box.value())
+
+    def find_next(self):
+        text = self.search_text.text()
+        if not text or not self.model.rowCount():
+            return
+        row = self.model.find(text, self.current_step())
+        if row == -1:
+            self.search_status.setText("not found")
+            return
+        self.search_status.setText("")
+        self.step_box.setValue(row)
+        self.select_step(row)
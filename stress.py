@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import networkx as nx
+from graph import Graph
+from incremental import IncrementalBridges
+from generators import (cactus_graph, dense_graph, disconnected_graph,
+                        multigraph, tree_graph)
+
+"""
+Randomized differential stress testing of every bridge-finding engine
+of the project against networkx.bridges, used as an oracle.
+Seeded random graphs of several families are made in growing sizes,
+and the bridges found by every engine are compared with the oracle.
+Brute-force engines are run only on small graphs. Cases are split
+between processes, and new cases are started until the time budget
+runs out. A graph on which an engine fails is shrunk, by removing
+edges while it still fails, to a minimal graph which is printed as
+JSON, so it can be pasted into a unit test.
+
+python stress.py --budget 60 --max-edges 100000
+"""
+
+# Families of graphs, every one takes a number of edges and a Random.
+FAMILIES = {
+    "tree": tree_graph,
+    "cactus": cactus_graph,
+    "multigraph": multigraph,
+    "disconnected": disconnected_graph,
+    "dense": dense_graph,
+}
+
+# Engines take n and edges and return bridges in any orientation.
+# Engines with 1 worker run in the calling process, those ending with
+# "_pool" check the same code run by a process pool.
+ENGINES = {
+    "dfs_brute_force": lambda n, edges: Graph(n, edges).dfs_brute_force(),
+    "dfs_brute_force_parallel": lambda n, edges: Graph(
+        n, edges).dfs_brute_force_parallel(workers=1),
+    "dfs_brute_force_pool": lambda n, edges: Graph(
+        n, edges).dfs_brute_force_parallel(workers=2),
+    "tarjans_algorithm": lambda n, edges: Graph(n, edges).tarjans_algorithm(),
+    "tarjans_iterative": lambda n, edges: Graph(n, edges).tarjans_iterative(),
+    "kaiwensun_bridges": lambda n, edges: Graph(n, edges).kaiwensun_bridges(),
+    "chain_decomposition": lambda n, edges: Graph(
+        n, edges).chain_decomposition(),
+    "parallel_bridges": lambda n, edges: Graph(n, edges).parallel_bridges(
+        workers=1),
+    # three workers, so one forest is left without a pair when joining
+    "parallel_bridges_pool": lambda n, edges: Graph(
+        n, edges).parallel_bridges(workers=3),
+    "incremental_bridges": lambda n, edges: IncrementalBridges(
+        n, edges).bridges(),
+    "bridge_index": lambda n, edges: Graph(n, edges).bridge_index().bridges,
+}
+
+# Engines that take quadratic time are run only on small graphs.
+QUADRATIC = {"dfs_brute_force", "dfs_brute_force_parallel",
+             "dfs_brute_force_pool"}
+
+
+def normalized(bridges):
+    # Sorted list of bridges with the smaller vertex first.
+    return sorted((u, v) if u < v else (v, u) for u, v in bridges)
+
+
+def oracle(n, edges):
+    # Bridges found by networkx, parallel edges are kept by a MultiGraph.
+    graph = nx.MultiGraph()
+    graph.add_nodes_from(range(n))
+    graph.add_edges_from(edges)
+    return normalized(nx.bridges(graph))
+
+
+def engine_error(engine, n, edges, expected=None):
+    """
+    Runs engine on a copy of the graph and returns None if it finds
+    the same bridges as the oracle, or a description of the error.
+    """
+    if expected is None:
+        expected = oracle(n, edges)
+    try:
+        found = normalized(ENGINES[engine](n, [list(edge) for edge in edges]))
+    except Exception:
+        return traceback.format_exc(limit=-1).strip()
+    if found != expected:
+        return "found %s, expected %s" % (found, expected)
+    return None
+
+
+def shrink(n, edges, fails):
+    """
+    Returns the smallest graph, as (n, edges), for which fails(n, edges)
+    is still True. Chunks of edges are removed, starting with halves,
+    while it still fails, and then vertices are renumbered in the order
+    they appear, dropping vertices which are not in any edge.
+    At the end removing any single edge makes the graph pass.
+    """
+    edges = [list(edge) for edge in edges]
+    chunk = max(1, len(edges) // 2)
+    while edges:
+        removed = False
+        start = 0
+        while start < len(edges):
+            smaller = edges[:start] + edges[start + chunk:]
+            if fails(n, smaller):
+                edges = smaller
+                removed = True
+            else:
+                start += chunk
+        if chunk == 1 and not removed:
+            break
+        if not removed:
+            chunk //= 2
+        chunk = min(chunk, max(1, len(edges) // 2))
+    labels = {}
+    for edge in edges:
+        for vertex in edge:
+            labels.setdefault(vertex, len(labels))
+    compact = [[labels[u], labels[v]] for u, v in edges]
+    if fails(len(labels), compact):
+        return len(labels), compact
+    return n, edges
+
+
+def make_case(family, size, seed):
+    # Graph of a case, the same for the same family, size and seed.
+    return FAMILIES[family](size, random.Random(seed))
+
+
+def run_case(case):
+    """
+    Task of a worker: checks every engine on the graph of a case, a
+    (family, size, seed, engines) tuple. Returns the number of edges
+    and a list of failures, each with the engine, the error and
+    the shrunk graph.
+    """
+    family, size, seed, engines = case
+    n, edges = make_case(family, size, seed)
+    expected = oracle(n, edges)
+    failures = []
+    for engine in engines:
+        error = engine_error(engine, n, edges, expected)
+        if error is None:
+            continue
+        small_n, small_edges = shrink(
+            n, edges, lambda n, edges: engine_error(engine, n, edges)
+            is not None)
+        failures.append({
+            "engine": engine, "family": family, "size": size, "seed": seed,
+            "error": error, "n": small_n, "edges": small_edges,
+            "small_error": engine_error(engine, small_n, small_edges),
+        })
+    return len(edges), failures
+
+
+def cases(engines, max_edges, brute_force_edges, seed=0):
+    """
+    Yields cases forever: every family in sizes growing by a factor of
+    3 from 10 edges up to max_edges, and then again with new seeds.
+    Quadratic engines are only in cases with at most brute_force_edges.
+    """
+    sizes = []
+    size = 10
+    while size < max_edges:
+        sizes.append(size)
+        size *= 3
+    sizes.append(max_edges)
+    while True:
+        for size in sizes:
+            for family in FAMILIES:
+                checked = [engine for engine in engines
+                           if engine not in QUADRATIC or
+                           size <= brute_force_edges]
+                yield family, size, seed, checked
+                seed += 1
+
+
+def run_stress(budget=60.0, workers=None, engines=None, max_edges=100000,
+               brute_force_edges=300, seed=0, max_cases=None, log=None):
+    """
+    Runs cases in workers processes, one for every CPU by default,
+    or in this process if workers is 1, until budget seconds pass or
+    max_cases cases are done. Cases already running when the budget
+    runs out are finished. log, if given, is called with a line about
+    every case. Returns number of cases, number of edges checked and
+    the list of failures.
+    """
+    engines = list(ENGINES) if engines is None else engines
+    deadline = time.monotonic() + budget
+    source = cases(engines, max_edges, brute_force_edges, seed)
+    done = 0
+    edges_checked = 0
+    failures = []
+
+    def finish(case, result):
+        nonlocal done, edges_checked
+        done += 1
+        edges_checked += result[0]
+        failures.extend(result[1])
+        if log is not None:
+            log("%-12s %8d edges seed %-6d %s" % (
+                case[0], result[0], case[2],
+                "FAILED " + ", ".join(failure["engine"] for failure in
+                                      result[1]) if result[1] else "ok"))
+
+    def more():
+        return time.monotonic() < deadline and \
+            (max_cases is None or submitted < max_cases)
+
+    submitted = 0
+    if workers == 1:
+        while more():
+            case = next(source)
+            submitted += 1
+            finish(case, run_case(case))
+        return done, edges_checked, failures
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = {}  # future -> case
+        while running or more():
+            while more() and len(running) < 2 * workers:
+                case = next(source)
+                submitted += 1
+                running[executor.submit(run_case, case)] = case
+            finished, _ = wait(list(running), timeout=max(
+                0.0, deadline - time.monotonic()) if more() else None,
+                return_when=FIRST_COMPLETED)
+            for future in finished:
+                finish(running.pop(future), future.result())
+    return done, edges_checked, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare bridges found by every engine with networkx "
+        "on random graphs.")
+    parser.add_argument("--budget", type=float, default=60.0,
+                        help="seconds after which no new cases are started")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes, one per core by default")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES),
+                        choices=list(ENGINES))
+    parser.add_argument("--max-edges", type=int, default=100000,
+                        help="largest graphs checked by fast engines")
+    parser.add_argument("--brute-force-edges", type=int, default=300,
+                        help="largest graphs checked by brute force")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-cases", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true",
+                        help="print only failures and the summary")
+    args = parser.parse_args(argv)
+
+    done, edges_checked, failures = run_stress(
+        args.budget, args.workers, args.engines, args.max_edges,
+        args.brute_force_edges, args.seed, args.max_cases,
+        log=None if args.quiet else print)
+    for failure in failures:
+        print(json.dumps(failure), file=sys.stderr)
+    print("%d cases, %d edges, %d failures" % (done, edges_checked,
+                                               len(failures)))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,32 @@
 from graph import Graph
+from incremental import IncrementalBridges
+from generators import FAMILIES, generate
+import benchmark
+from delta_trace import DeltaTrace, apply_change, run_steps
+from loader import EdgeArray, load_edges, parse_edge_text, read_edge_list
+import csv
+import gzip
+import io
+import os
+import tempfile
+from cli import find_files, run_batch, save_results
+from validation import UnionFind, validate_graph
+from cache import ResultCache, graph_hash
+from bridge_index import BridgeIndex
+from stats import AlgorithmStats
+from trace_store import StoredTrace
+from array import array
+import json
 import unittest
+import random
 import time
-import sys
 
-sys.setrecursionlimit(6000)  # Python's default recursion limit is 1000.
+"""
+Tests of algorithms and modules which use only the standard library.
+Tests which need NumPy for a file format import it themselves.
+Tests of layout, drawing and the GUI are in testing_gui.py, and
+tests of the stress harness, which uses networkx, in testing_stress.py.
+"""
 
 
 class Testing(unittest.TestCase):
@@ -19,9 +42,12 @@ class Testing(unittest.TestCase):
         brute_force_bridges = graph.dfs_brute_force()
         tarjans_bridges = graph.tarjans_algorithm()
         kaiwensun_bridges = graph.kaiwensun_bridges()
+        tarjans_iterative_bridges = graph.tarjans_iterative()
         self.assertEqual(brute_force_bridges, [])
         self.assertEqual(tarjans_bridges, [])
         self.assertEqual(kaiwensun_bridges, [])
+        self.assertEqual(tarjans_iterative_bridges, [])
+        self.assertEqual(graph.chain_decomposition(), [])
 
     # Test custom graph with 4 vertices
     def test_custom_four_vertex_graph(self):
@@ -29,9 +55,13 @@ class Testing(unittest.TestCase):
         brute_force_bridges = graph.dfs_brute_force()
         tarjans_bridges = graph.tarjans_algorithm()
         kaiwensun_bridges = graph.kaiwensun_bridges()
+        tarjans_iterative_bridges = graph.tarjans_iterative()
         self.assertEqual(brute_force_bridges, [(2, 3)])
         self.assertEqual(tarjans_bridges, [(2, 3)])
         self.assertEqual(kaiwensun_bridges, [(2, 3)])
+        self.assertEqual(tarjans_iterative_bridges, [(2, 3)])
+        self.assertEqual(graph.dfs_brute_force_parallel(workers=2), [(2, 3)])
+        self.assertEqual(graph.chain_decomposition(), [(2, 3)])
 
     # Graph is build of edges where every edge is a bridge.
     def test_all_bridges_graph(self):
@@ -45,10 +75,13 @@ class Testing(unittest.TestCase):
         brute_force_bridges = graph.dfs_brute_force()
         tarjans_bridges = graph.tarjans_algorithm()
         kaiwensun_bridges = graph.kaiwensun_bridges()
+        tarjans_iterative_bridges = graph.tarjans_iterative()
         # check if a and b have the same elements, regardless of their order
         self.assertCountEqual(brute_force_bridges, bridges)
         self.assertCountEqual(tarjans_bridges, bridges)
         self.assertCountEqual(kaiwensun_bridges, bridges)
+        self.assertCountEqual(tarjans_iterative_bridges, bridges)
+        self.assertCountEqual(graph.chain_decomposition(), bridges)
 
     # There are no bridges in a graph
     def test_no_bridge_graph(self):
@@ -62,9 +95,760 @@ class Testing(unittest.TestCase):
         brute_force_bridges = graph.dfs_brute_force()
         tarjans_bridges = graph.tarjans_algorithm()
         kaiwensun_bridges = graph.kaiwensun_bridges()
+        tarjans_iterative_bridges = graph.tarjans_iterative()
         self.assertEqual(brute_force_bridges, bridges)
         self.assertEqual(tarjans_bridges, bridges)
         self.assertEqual(kaiwensun_bridges, bridges)
+        self.assertEqual(tarjans_iterative_bridges, bridges)
+        self.assertEqual(graph.chain_decomposition(), bridges)
+
+    # Parallel brute force gives the same bridges and visualization data.
+    def test_brute_force_parallel(self):
+        edges = [[0, 1], [1, 2], [2, 0], [2, 3], [3, 4], [4, 5], [5, 3],
+                 [5, 6], [6, 7], [7, 6]]
+        graph = Graph(8, edges)
+        brute_force_bridges = graph.dfs_brute_force()
+        visualization_data = graph.get_visualization_data()
+        for workers in (1, 2):
+            bridges = graph.dfs_brute_force_parallel(workers)
+            self.assertEqual(bridges, brute_force_bridges)
+            self.assertEqual(graph.get_visualization_data(),
+                             visualization_data)
+        self.assertEqual(brute_force_bridges, [(2, 3), (5, 6)])
+
+    # Chain decomposition labels components and builds the bridge tree.
+    def test_chain_decomposition_components(self):
+        edges = [[0, 1], [1, 2], [2, 0], [2, 3], [3, 4], [4, 5], [5, 3],
+                 [5, 6], [7, 8], [8, 7]]
+        graph = Graph(9, edges)
+        self.assertEqual(graph.chain_decomposition(), [(2, 3), (5, 6)])
+        self.assertEqual(graph.get_two_edge_connected_components(),
+                         [0, 0, 0, 1, 1, 1, 2, 3, 3])
+        self.assertEqual(graph.get_bridge_tree(), [(0, 1), (1, 2)])
+        self.assertEqual(len(graph.get_visualization_data()), 3)
+
+    # Path graph far deeper than Python's recursion limit.
+    def test_tarjans_iterative_long_path(self):
+        vertices = 200000
+        edges = [[i, i + 1] for i in range(vertices - 1)]
+        graph = Graph(vertices, edges)
+        tarjans_iterative_bridges = graph.tarjans_iterative()
+        self.assertEqual(len(tarjans_iterative_bridges), vertices - 1)
+        self.assertEqual(tarjans_iterative_bridges[0], (vertices - 2,
+                                                        vertices - 1))
+
+    # Parallel edges are never bridges.
+    def test_tarjans_iterative_parallel_edges(self):
+        graph = Graph(3, [[0, 1], [1, 0], [1, 2]])
+        self.assertEqual(graph.tarjans_iterative(), [(1, 2)])
+
+    # Edges are told apart by id, so a doubled edge is not a bridge,
+    # and edges given to the graph are not changed.
+    def test_parallel_edges_by_edge_id(self):
+        edges = [[1, 0], [0, 1], [2, 1], [3, 2], [3, 3]]
+        graph = Graph(4, edges)
+        self.assertEqual(graph.kaiwensun_bridges(), [(1, 2), (2, 3)])
+        self.assertCountEqual(graph.tarjans_algorithm(), [(1, 2), (2, 3)])
+        self.assertEqual(graph.get_visualization_data()[-1][3],
+                         [(2, 3), (1, 2)])
+        self.assertEqual(graph.dfs_brute_force(), [(2, 1), (3, 2)])
+        self.assertEqual(edges, [[1, 0], [0, 1], [2, 1], [3, 2], [3, 3]])
+
+    # Bridges are found in every connected component, isolated
+    # vertices included, not only in the one with vertex 0.
+    def test_disconnected_graph(self):
+        edges = [[0, 1], [1, 2], [2, 0], [3, 4], [5, 6], [6, 7], [7, 5],
+                 [7, 8]]
+        bridges = [(3, 4), (7, 8)]
+        graph = Graph(10, edges)
+        self.assertCountEqual(graph.dfs_brute_force(), bridges)
+        self.assertCountEqual(graph.dfs_brute_force_parallel(workers=1),
+                              bridges)
+        self.assertCountEqual(graph.tarjans_algorithm(), bridges)
+        self.assertCountEqual(map(sorted, graph.kaiwensun_bridges()),
+                              map(list, bridges))
+        self.assertCountEqual(graph.tarjans_iterative(), bridges)
+        self.assertCountEqual(graph.chain_decomposition(), bridges)
+        for workers in (1, 2):
+            self.assertCountEqual(graph.parallel_bridges(workers), bridges)
+
+    # Bridges from a spanning forest are the same as from Tarjan's
+    # algorithm, with parallel edges, loops and many components.
+    def test_parallel_bridges(self):
+        random.seed(19)
+        for _ in range(50):
+            n = random.randint(1, 30)
+            edges = [[random.randrange(n), random.randrange(n)]
+                     for _ in range(random.randint(0, 40))]
+            bridges = Graph(n, edges).tarjans_iterative()
+            for workers in (1, 3):
+                self.assertCountEqual(Graph(n, edges).parallel_bridges(
+                    workers), bridges)
+        n, edges = generate("cactus", 2000, seed=1)
+        self.assertCountEqual(Graph(n, edges).parallel_bridges(2),
+                              Graph(n, edges).tarjans_iterative())
+
+
+class TestingValidation(unittest.TestCase):
+    """
+    Checks that validate_graph keeps or replaces labels of vertices,
+    counts connected components and rejects wrong graphs.
+    """
+
+    def test_labels_are_kept(self):
+        edges = [[0, 1], [1, 2], [3, 4]]
+        n, checked, labels, components = validate_graph(edges, 7)
+        self.assertEqual((n, labels, components), (7, None, 4))
+        self.assertIs(checked, edges)
+        self.assertEqual(validate_graph(EdgeArray(array('i', [0, 1, 3, 2])))
+                         [::3], (4, 2))
+
+    def test_relabel(self):
+        n, edges, labels, components = validate_graph(
+            [["a", "b"], ["b", 7], [7, "a"], ["x", 100]])
+        self.assertEqual(n, 5)
+        self.assertEqual(list(edges), [[0, 1], [1, 2], [2, 0], [3, 4]])
+        self.assertEqual(labels, ["a", "b", 7, "x", 100])
+        self.assertEqual(components, 2)
+        graph = Graph(n, edges)
+        self.assertEqual([(labels[u], labels[v])
+                          for u, v in graph.tarjans_iterative()],
+                         [("x", 100)])
+
+    def test_wrong_graphs(self):
+        for edges, number_of_vertices in (([[0, 1, 2]], None),
+                                          ([[0.5, 1]], None),
+                                          ([[0, 1], [2, 3]], 3),
+                                          ([[0, 1]], -1)):
+            with self.assertRaises(ValueError):
+                validate_graph(edges, number_of_vertices)
+        with self.assertRaisesRegex(ValueError, "between 0 and 2"):
+            validate_graph([[0, 5]], 3, relabel=False)
+        with self.assertRaises(ValueError):
+            validate_graph(EdgeArray(array('i', [0, 5])), 3)
+
+    def test_union_find(self):
+        forest = UnionFind(5)
+        self.assertTrue(forest.union(0, 1))
+        self.assertTrue(forest.union(3, 1))
+        self.assertFalse(forest.union(0, 3))
+        self.assertEqual(forest.find(3), forest.find(0))
+        self.assertEqual(forest.components, 3)
+        self.assertEqual(forest.add(), 5)
+        self.assertEqual(forest.components, 4)
+
+
+class TestingBridgeIndex(unittest.TestCase):
+    """
+    Testing questions answered by BridgeIndex.
+    """
+
+    def setUp(self):
+        # two cycles joined by a path of two bridges, a pendant vertex,
+        # parallel edges and a separate component
+        edges = [[0, 1], [1, 2], [2, 0], [2, 3], [3, 4], [4, 5], [5, 6],
+                 [6, 4], [6, 7], [8, 9], [9, 8], [9, 10]]
+        self.index = Graph(11, edges).bridge_index()
+
+    def test_queries(self):
+        for index in (self.index,
+                      BridgeIndex.from_bytes(self.index.to_bytes())):
+            self.assertEqual(index.bridges,
+                             {(2, 3), (3, 4), (6, 7), (9, 10)})
+            self.assertTrue(index.is_bridge(4, 3))
+            self.assertFalse(index.is_bridge(8, 9))
+            self.assertTrue(index.two_edge_connected(0, 2))
+            self.assertFalse(index.two_edge_connected(0, 4))
+            self.assertTrue(index.connected(0, 7))
+            self.assertFalse(index.connected(0, 8))
+            self.assertEqual(index.separating_bridges(1, 7),
+                             [(2, 3), (3, 4), (6, 7)])
+            self.assertEqual(index.separating_bridges(7, 3),
+                             [(7, 6), (4, 3)])
+            self.assertEqual(index.separating_bridges(1, 8), [])
+            self.assertEqual(index.separating_count(0, 7), 3)
+            self.assertEqual(index.separating_count(5, 6), 0)
+            self.assertEqual(index.separating_count(0, 10), -1)
+
+    def test_long_path(self):
+        vertices = 1000
+        index = Graph(vertices, [[i, i + 1] for i in range(vertices - 1)]) \
+            .bridge_index()
+        self.assertEqual(index.separating_count(10, 990), 980)
+        self.assertEqual(index.separating_bridges(500, 497),
+                         [(500, 499), (499, 498), (498, 497)])
+
+    # Building an index does not record steps or write a trace file.
+    def test_no_trace(self):
+        with tempfile.TemporaryDirectory() as directory:
+            graph = Graph(4, [[0, 1], [1, 2], [2, 0], [2, 3]])
+            graph.stream_trace(os.path.join(directory, "index.trace"))
+            self.assertEqual(graph.bridge_index().bridges, {(2, 3)})
+            self.assertEqual(len(graph.get_visualization_data()), 0)
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_wrong_data(self):
+        data = self.index.to_bytes()
+        self.assertRaises(ValueError, BridgeIndex.from_bytes, b"bridges")
+        self.assertRaises(ValueError, BridgeIndex.from_bytes, data[:-4])
+
+
+class TestingStats(unittest.TestCase):
+    """
+    Testing statistics of instrumented algorithms.
+    """
+
+    def setUp(self):
+        # path 0-1-2-3 with a cycle 1-2-4 and isolated vertex 5
+        self.edges = [[0, 1], [1, 2], [2, 3], [2, 4], [4, 1]]
+
+    def test_counters(self):
+        for algorithm, relaxations in (("tarjans_algorithm", 10),
+                                       ("tarjans_iterative", 10),
+                                       ("kaiwensun_bridges", 10),
+                                       ("chain_decomposition", 20)):
+            graph = Graph(6, self.edges)
+            runs = []
+            graph.instrument(hook=runs.append)
+            getattr(graph, algorithm)()
+            stats = graph.stats
+            self.assertEqual(runs, [stats])
+            self.assertEqual(stats.algorithm, algorithm)
+            self.assertEqual(stats.vertices_visited, 6)
+            self.assertEqual(stats.edge_relaxations, relaxations)
+            self.assertEqual(stats.max_stack_depth, 4)
+            self.assertEqual(stats.trace_steps,
+                             len(graph.get_visualization_data()))
+            self.assertEqual(list(stats.as_dict())[-4:],
+                             ["adjacency_seconds", "search_seconds",
+                              "trace_seconds", "result_seconds"])
+
+    # Brute force counts only vertices and entries its searches reach.
+    def test_brute_force_counters(self):
+        for edges, vertices, relaxations in (([[0, 1], [1, 2]], 3, 4),
+                                             ([[0, 1], [1, 2], [2, 0]], 6, 10)):
+            graph = Graph(3, edges)
+            graph.instrument()
+            graph.dfs_brute_force()
+            self.assertEqual(graph.stats.vertices_visited, vertices)
+            self.assertEqual(graph.stats.edge_relaxations, relaxations)
+
+    def test_disabled_and_profile(self):
+        graph = Graph(6, self.edges)
+        graph.tarjans_iterative()
+        self.assertIsNone(graph.stats)
+        graph.instrument(profile=True)
+        graph.dfs_brute_force()
+        self.assertEqual(graph.stats.trace_steps, 5)
+        self.assertGreater(graph.stats.trace_bytes, 0)
+        self.assertIsNotNone(graph.stats.profile)
+        graph.instrument(False)
+        graph.chain_decomposition()
+        self.assertIsNone(graph.stats)
+
+    def test_benchmark_and_worker_output(self):
+        self.assertEqual(
+            benchmark.count_operations("tarjans_iterative", 6, self.edges)
+            ["max_stack_depth"], 4)
+        self.assertEqual(benchmark.count_operations("adjacency", 6,
+                                                    self.edges), {})
+        text = str(AlgorithmStats("tarjans_iterative"))
+        self.assertIn("edge relaxations: 0", text)
+
+
+class TestingSteps(unittest.TestCase):
+    """
+    Checks step generators of all algorithms against
+    visualization data saved by the Graph methods.
+    """
+
+    # Applying yielded changes gives the same rows as the trace.
+    def test_steps_match_visualization_data(self):
+        edges = [[0, 1], [1, 2], [2, 0], [2, 3], [3, 4], [4, 5], [5, 3]]
+        for algorithm in ("tarjans_algorithm", "kaiwensun_bridges"):
+            graph = Graph(6, [edge.copy() for edge in edges])
+            bridges = getattr(graph, algorithm)()
+            rows = list(graph.get_visualization_data())
+            state = graph.initial_state(algorithm)
+            steps = getattr(graph, algorithm + "_steps")()
+            for row in rows:
+                for change in next(steps):
+                    apply_change(state, *change)
+                self.assertEqual(state, row)
+            self.assertEqual(run_steps(steps), bridges)
+
+    # Consumer can stop after the first step.
+    def test_steps_stop_early(self):
+        edges = [[i, i + 1] for i in range(99)]
+        graph = Graph(100, edges)
+        steps = graph.tarjans_algorithm_steps()
+        self.assertEqual(len(next(steps)), 3)
+        steps.close()
+        brute_force_steps = graph.dfs_brute_force_steps()
+        self.assertEqual(next(brute_force_steps), [(1, 0, 0, 0), (1, 1, 1, 0)])
+
+    # Without tracing, generators only return bridges.
+    def test_steps_without_trace(self):
+        graph = Graph(4, [[0, 1], [1, 2], [2, 0], [2, 3]])
+        for algorithm in ("dfs_brute_force", "tarjans_algorithm",
+                          "kaiwensun_bridges"):
+            steps = getattr(graph, algorithm + "_steps")(trace=False)
+            self.assertEqual(list(steps), [])
+            steps = getattr(graph, algorithm + "_steps")(trace=False)
+            self.assertEqual(run_steps(steps), [(2, 3)])
+
+
+class TestingIncremental(unittest.TestCase):
+    """
+    Checks that bridges kept by IncrementalBridges are the same
+    as bridges found from scratch after every new edge.
+    """
+
+    # Compare with chain decomposition after each added edge.
+    def test_matches_recomputation(self):
+        random.seed(7)
+        for _ in range(50):
+            n = random.randint(1, 20)
+            incremental = IncrementalBridges(n)
+            edges = []
+            for _ in range(30):
+                edge = [random.randrange(n), random.randrange(n)]
+                edges.append(edge)
+                incremental.add_edge(edge[0], edge[1])
+                graph = Graph(n, [edge.copy() for edge in edges])
+                self.assertCountEqual(
+                    [tuple(sorted(bridge)) for bridge in incremental.bridges()],
+                    [tuple(sorted(bridge))
+                     for bridge in graph.chain_decomposition()])
+
+    # Closing a cycle removes every bridge on it.
+    def test_cycle_closes_bridges(self):
+        graph = Graph(4, [[0, 1], [1, 2], [2, 3]])
+        incremental = graph.incremental_bridges()
+        self.assertEqual(incremental.bridges(), [(0, 1), (1, 2), (2, 3)])
+        incremental.add_edge(3, 1)
+        self.assertEqual(incremental.bridges(), [(0, 1)])
+        self.assertTrue(incremental.is_bridge(1, 0))
+        self.assertFalse(incremental.is_bridge(2, 3))
+        incremental.add_edge(0, 1)
+        self.assertEqual(incremental.bridges(), [])
+        incremental.add_edge(4, 5)
+        self.assertEqual(incremental.bridges(), [(4, 5)])
+
+
+class TestingBenchmark(unittest.TestCase):
+    """
+    Checks graph families used in benchmarks and comparing
+    of benchmark results.
+    """
+
+    # Every family gives the same graph for the same seed.
+    def test_families_are_seeded(self):
+        for family in FAMILIES:
+            n, edges = generate(family, 300, seed=3)
+            self.assertEqual((n, edges), generate(family, 300, seed=3))
+            self.assertTrue(all(0 <= u < n and 0 <= v < n
+                                for u, v in edges))
+            self.assertGreater(len(edges), 100)
+
+    # Cactus graph is connected and has both bridges and cycles.
+    def test_cactus_bridges(self):
+        n, edges = generate("cactus", 300, seed=1)
+        graph = Graph(n, edges)
+        bridges = graph.chain_decomposition()
+        self.assertEqual(max(graph.get_two_edge_connected_components()),
+                         len(bridges))
+        self.assertCountEqual(
+            [tuple(sorted(bridge)) for bridge in bridges],
+            [tuple(sorted(bridge))
+             for bridge in graph.dfs_brute_force_parallel(workers=1)])
+        self.assertTrue(0 < len(bridges) < len(edges))
+        self.assertEqual(Graph(*generate("cycle", 50)).tarjans_iterative(),
+                         [])
+
+    # Slower results are reported as regressions.
+    def test_compare_results(self):
+        results = benchmark.run_benchmarks(["tree"], [50], ["tarjans_iterative"],
+                                           repeats=3, warmup=0)
+        self.assertEqual(set(results[0]), set(benchmark.FIELDS))
+        slower = [dict(results[0], median=results[0]["median"] * 2)]
+        comparison = benchmark.compare_results(results, slower)
+        self.assertEqual(comparison[0][0], ("tree", 50, "tarjans_iterative"))
+        self.assertEqual(comparison[0][4], "regression")
+        self.assertEqual(benchmark.compare_results(slower, results)[0][4],
+                         "improvement")
+
+    # Finding bridges does not import NumPy, matplotlib or networkx.
+    def test_startup_imports(self):
+        result = benchmark.measure_startup({"graph": []}, repeats=1)[0]
+        self.assertEqual(result["heavy_modules"], [])
+        self.assertGreater(result["import_seconds"], 0)
+
+    # Visualization data stays in memory after a traced algorithm.
+    def test_measure_memory(self):
+        n, edges = generate("cycle", 2000)
+        traced = benchmark.measure_memory("tarjans_algorithm_traced", n, edges)
+        untraced = benchmark.measure_memory("tarjans_iterative", n, edges)
+        self.assertGreater(traced["peak_bytes"], untraced["peak_bytes"])
+        self.assertGreater(traced["retained_bytes"], 0)
+        self.assertEqual(traced["bytes_per_edge"],
+                         traced["peak_bytes"] / len(edges))
+
+
+class TestingDeltaTrace(unittest.TestCase):
+    """
+    Checks that steps rebuilt from a DeltaTrace are the same
+    as full copies of the state taken at every step.
+    """
+
+    # Compare every step of a trace with copies made along the way.
+    def test_random_access_matches_snapshots(self):
+        state = [0, [0] * 50, []]
+        trace = DeltaTrace(state, checkpoint_interval=4)
+        snapshots = []
+        for i in range(300):
+            state[0] = i
+            trace.assign(0, i)
+            state[1][i % 50] = i
+            trace.set(1, i % 50, i)
+            if i % 7 == 0:
+                state[2].append((i, i + 1))
+                trace.add(2, i, i + 1)
+            trace.step()
+            snapshots.append([state[0], state[1].copy(), state[2].copy()])
+        self.assertGreater(len(trace.checkpoints), 1)
+        self.assertEqual(list(trace), snapshots)
+        for i in (0, 1, 49, 150, 299, -1):
+            self.assertEqual(trace[i], snapshots[i])
+
+    # Tarjan's trace grows with the number of steps, not with V squared.
+    def test_tarjans_trace_is_linear(self):
+        vertices = 2000
+        edges = [[i, i + 1] for i in range(vertices - 1)]
+        graph = Graph(vertices, edges)
+        graph.tarjans_algorithm()
+        trace = graph.get_visualization_data()
+        self.assertEqual(len(trace), vertices + 1)
+        self.assertLess(len(trace.kinds), 5 * vertices)
+        self.assertEqual(trace[-1][3], graph.tarjans_algorithm())
+        self.assertEqual(trace[10][1][:12], list(range(1, 12)) + [0])
+
+    # Changes of every step rebuild the following step.
+    def test_changes(self):
+        graph = Graph(6, [[0, 1], [1, 2], [2, 0], [2, 3], [3, 4], [4, 5]])
+        graph.kaiwensun_bridges()
+        trace = graph.get_visualization_data()
+        state = graph.initial_state("kaiwensun_bridges")
+        for step in range(len(trace)):
+            for change in trace.changes(step):
+                apply_change(state, *change)
+            self.assertEqual(state, trace[step])
+
+    # Iterating from a step gives the same states as random access.
+    def test_iter_from(self):
+        edges = [[i, (i + 1) % 300] for i in range(300)] + \
+            [[i, (i * 7 + 1) % 300] for i in range(0, 300, 5)]
+        graph = Graph(300, edges)
+        graph.tarjans_algorithm()
+        trace = graph.get_visualization_data()
+        for start in (0, 1, 150, len(trace) - 1):
+            self.assertEqual(list(trace.iter_from(start)), trace[start:])
+
+
+class TestingTraceStore(unittest.TestCase):
+    """
+    Checks that a trace written to a file gives the same steps, edges
+    and bridges as the trace kept in memory, and that a file which
+    was not finished is not read.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        n, edges = generate("cactus", 300, seed=3)
+        self.graph = Graph(n, edges)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Every algorithm gives the same steps from the file as from memory.
+    def test_matches_delta_trace(self):
+        for algorithm in ("tarjans_algorithm", "kaiwensun_bridges",
+                          "chain_decomposition"):
+            bridges = getattr(self.graph, algorithm)()
+            expected = self.graph.get_visualization_data()
+            path = os.path.join(self.directory.name, algorithm + ".trace")
+            self.graph.stream_trace(path)
+            self.assertEqual(getattr(self.graph, algorithm)(), bridges)
+            self.graph.stream_trace(None)
+            with StoredTrace(path) as trace:
+                self.assertEqual(trace.algorithm, algorithm)
+                self.assertEqual(list(trace), list(expected))
+                for i in (len(trace) - 1, 0, len(trace) // 2, -1):
+                    self.assertEqual(trace[i], expected[i])
+                self.assertEqual(list(trace.iter_from(5)), expected[5:])
+                self.assertEqual([list(edge) for edge in trace.edges()],
+                                 [list(edge) for edge in self.graph.edges])
+                self.assertEqual(sorted(trace.bridges()),
+                                 sorted(map(tuple, bridges)))
+
+    # A cancelled run leaves no file, and a cut file is not read.
+    def test_unfinished_trace(self):
+        path = os.path.join(self.directory.name, "cancelled.trace")
+        self.graph.stream_trace(path)
+
+        def cancel(steps):
+            if steps == 10:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.graph.tarjans_algorithm(progress=cancel)
+        self.assertEqual(os.listdir(self.directory.name), [])
+        self.graph.tarjans_algorithm()
+        self.graph.get_visualization_data().close()
+        with open(path, "r+b") as file:
+            file.truncate(os.path.getsize(path) - 1)
+        with self.assertRaises(ValueError):
+            StoredTrace(path)
+
+
+class TestingLoader(unittest.TestCase):
+    """
+    Checks that every supported file format gives the same edges,
+    and that wrong lines are reported with their numbers.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.n, self.edges = generate("cactus", 500)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_formats(self):
+        import numpy as np
+        text = "# cactus\n" + "".join(
+            "%d%s%d\n" % (u, [", ", " ", "\t", ","][i % 4], v)
+            for i, (u, v) in enumerate(self.edges))
+        with open(self.path("edges.txt"), "w") as file:
+            file.write(text)
+        with gzip.open(self.path("edges.txt.gz"), "wt") as file:
+            file.write(text)
+        pairs = np.array(self.edges)
+        np.save(self.path("edges.npy"), pairs)  # int64, copied to int32
+        pairs.astype("<i4").tofile(self.path("edges.bin"))
+        for name in ("edges.txt", "edges.txt.gz", "edges.npy", "edges.bin"):
+            n, edges = load_edges(self.path(name))
+            self.assertEqual(n, self.n)
+            self.assertEqual(list(edges), self.edges)
+            graph = Graph.from_file(self.path(name))
+            self.assertEqual(sorted(graph.tarjans_algorithm()),
+                             sorted(Graph(self.n, self.edges)
+                                    .tarjans_algorithm()))
+
+    # Lines split between chunks are joined, line numbers are kept.
+    def test_small_chunks(self):
+        text = "".join("%d %d\n" % (u, v) for u, v in self.edges)
+        edges = read_edge_list(io.BytesIO(text.encode()), chunk_size=7)
+        self.assertEqual(list(edges), self.edges)
+        wrong_line = len(self.edges) + 100
+        with self.assertRaisesRegex(ValueError, "line %d " % wrong_line):
+            read_edge_list(io.BytesIO((text[:-1] + "\n" * 100 + "1 2 3")
+                                      .encode()), chunk_size=64)
+
+    def test_wrong_input(self):
+        import numpy as np
+        self.assertEqual(list(parse_edge_text("0, 1\r\n\n1 ,2 % x")),
+                         [[0, 1], [1, 2]])
+        for text in ("0, 1\n1", "0 1 2", "0,,1", "-1 2", "a b",
+                     "3000000000 1"):
+            with self.assertRaises(ValueError):
+                parse_edge_text(text)
+        np.save(self.path("floats.npy"), np.zeros((3, 2)))
+        with self.assertRaises(ValueError):
+            load_edges(self.path("floats.npy"))
+        with open(self.path("odd.bin"), "wb") as file:
+            file.write(b"\0" * 12)
+        with self.assertRaises(ValueError):
+            load_edges(self.path("odd.bin"))
+
+    def test_edge_array(self):
+        import numpy as np
+        edges = EdgeArray(np.array([0, 1, 1, 2], dtype=np.intc))
+        self.assertEqual(edges[-1], [1, 2])
+        self.assertEqual(edges[:1], [[0, 1]])
+        self.assertEqual(np.asarray(edges).shape, (2, 2))
+        self.assertEqual(edges.number_of_vertices(), 3)
+        with self.assertRaises(IndexError):
+            edges[2]
+
+
+class TestingCli(unittest.TestCase):
+    """
+    Checks that the batch command line tool finds the same bridges as
+    Graph, whether a graph is read by a worker or sent through shared
+    memory, and that a wrong file is reported without stopping others.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.graphs = []
+        for i, family in enumerate(["cactus", "tree", "random"]):
+            n, edges = generate(family, 200, seed=i)
+            self.graphs.append((n, edges))
+            with open(self.path("g%d.txt" % i), "w") as file:
+                file.writelines("%d %d\n" % (u, v) for u, v in edges)
+        os.mkdir(self.path("sub"))
+        with open(self.path(os.path.join("sub", "wrong.txt")), "w") as file:
+            file.write("0 1 2\n")
+        with open(self.path("notes.md"), "w") as file:
+            file.write("not a graph\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_find_files(self):
+        files = find_files([self.directory.name])
+        self.assertEqual([os.path.relpath(path, self.directory.name)
+                          for path in files],
+                         ["g0.txt", "g1.txt", "g2.txt",
+                          os.path.join("sub", "wrong.txt")])
+
+    def test_batch_matches_graph(self):
+        files = find_files([self.directory.name])
+        for shared_memory_bytes in (0, 1 << 30):
+            results = run_batch(files, "tarjans_iterative", workers=1,
+                                shared_memory_bytes=shared_memory_bytes)
+            for (n, edges), result in zip(self.graphs, results):
+                expected = Graph(n, edges).tarjans_algorithm()
+                self.assertEqual(sorted(map(sorted, result["bridges"])),
+                                 sorted(map(sorted, expected)))
+            self.assertIn("line 1", results[-1]["error"])
+
+    def test_save_results(self):
+        files = [self.path("g0.txt"), self.path("g1.txt")]
+        results = run_batch(files, "chain_decomposition", trace=True,
+                            workers=1, shared_memory_bytes=0)
+        output = io.StringIO()
+        save_results(results, output, "json")
+        saved = json.loads(output.getvalue())["results"]
+        self.assertEqual([len(result["trace"]) for result in saved],
+                         [len(result["trace"]) for result in results])
+        output = io.StringIO()
+        save_results(results, output, "csv")
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(len(rows[1]["bridges"].split()),
+                         results[1]["bridge_count"])
+
+    # Files with the same name in different directories get own traces.
+    def test_trace_directory(self):
+        n, edges = self.graphs[1]
+        with open(self.path(os.path.join("sub", "g0.txt")), "w") as file:
+            file.writelines("%d %d\n" % (u, v) for u, v in edges)
+        files = [self.path("g0.txt"), self.path(os.path.join("sub", "g0.txt"))]
+        traces = self.path("traces")
+        os.mkdir(traces)
+        results = run_batch(files, "kaiwensun_bridges", workers=2,
+                            trace_directory=traces)
+        self.assertNotEqual(results[0]["trace_file"],
+                            results[1]["trace_file"])
+        self.assertEqual(len(os.listdir(traces)), 2)
+        for (n, edges), result in zip(self.graphs, results):
+            graph = Graph(n, edges)
+            graph.kaiwensun_bridges()
+            with StoredTrace(result["trace_file"]) as trace:
+                self.assertEqual(trace[-1],
+                                 graph.get_visualization_data()[-1])
+        self.assertRaises(ValueError, run_batch, files, "tarjans_iterative",
+                          workers=1, trace_directory=traces)
+
+
+class TestingCache(unittest.TestCase):
+    """
+    Checks that ResultCache finds results of the same graph, whatever
+    the order of its edges, and keeps its size limits.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.n, self.edges = generate("cactus", 300)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_graph_hash(self):
+        shuffled = [[v, u] for u, v in reversed(self.edges)]
+        self.assertEqual(graph_hash(self.n, self.edges),
+                         graph_hash(self.n, shuffled))
+        endpoints = array('i', [x for edge in self.edges for x in edge])
+        self.assertEqual(graph_hash(self.n, self.edges),
+                         graph_hash(self.n, EdgeArray(endpoints)))
+        # parallel edges and isolated vertices make a different graph
+        self.assertNotEqual(graph_hash(self.n, self.edges),
+                            graph_hash(self.n, self.edges + self.edges[:1]))
+        self.assertNotEqual(graph_hash(self.n, self.edges),
+                            graph_hash(self.n + 1, self.edges))
+
+    def test_run(self):
+        cache = ResultCache(directory=self.directory.name)
+        graph = Graph(self.n, self.edges)
+        bridges = cache.run(graph, "chain_decomposition")
+        steps = list(graph.get_visualization_data())
+        components = graph.get_two_edge_connected_components()
+        # results are read from memory, and then from disk
+        for cache, misses in ((cache, 1),
+                              (ResultCache(directory=self.directory.name), 0)):
+            graph = Graph(self.n, self.edges)
+            self.assertEqual(cache.run(graph, "chain_decomposition"), bridges)
+            self.assertEqual(list(graph.get_visualization_data()), steps)
+            self.assertEqual(graph.get_two_edge_connected_components(),
+                             components)
+            self.assertEqual((cache.hits, cache.misses), (1, misses))
+        # steps are used only for the same order of edges
+        graph = Graph(self.n, self.edges[::-1])
+        self.assertCountEqual(cache.run(graph, "chain_decomposition",
+                                        trace=False), bridges)
+        self.assertEqual(cache.hits, 2)
+        cache.run(graph, "chain_decomposition")
+        self.assertEqual(cache.misses, 1)
+
+    def test_limits(self):
+        cache = ResultCache(memory_entries=2)
+        for n in range(3):
+            cache.store(n + 2, [[0, 1]], "tarjans_iterative", [(0, 1)])
+        self.assertIsNone(cache.lookup(2, [[0, 1]], "tarjans_iterative"))
+        self.assertIsNotNone(cache.lookup(4, [[0, 1]], "tarjans_iterative"))
+
+        cache = ResultCache(memory_entries=0, directory=self.directory.name,
+                            max_bytes=150)
+        # every result takes about 80 bytes, only one of them fits
+        cache.store(2, [[0, 1]], "tarjans_iterative", [(0, 1)])
+        cache.store(self.n, self.edges, "tarjans_iterative", [])
+        self.assertIsNone(cache.lookup(2, [[0, 1]], "tarjans_iterative"))
+        self.assertIsNotNone(cache.lookup(self.n, self.edges,
+                                          "tarjans_iterative"))
+        cache.max_age = -1  # every result is too old
+        cache.store(3, [[0, 1]], "tarjans_iterative", [(0, 1)])
+        self.assertIsNone(cache.lookup(self.n, self.edges,
+                                       "tarjans_iterative"))
+
+    def test_batch(self):
+        path = os.path.join(self.directory.name, "graph.txt")
+        with open(path, "w") as file:
+            file.writelines("%d %d\n" % (u, v) for u, v in self.edges)
+        cache_directory = os.path.join(self.directory.name, "cache")
+        first, second = [run_batch([path], "tarjans_iterative", workers=1,
+                                   cache_directory=cache_directory)[0]
+                         for _ in range(2)]
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(first["bridges"], second["bridges"])
 
 
 if __name__ == '__main__':
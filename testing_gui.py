@@ -0,0 +1,207 @@
+from graph import Graph
+from generators import generate
+from layout import LayoutEngine, edges_hash, force_directed_layout
+from renderer import GraphRenderer
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from step_viewer import StepModel
+from animation import StepAnimator, BRIDGE, DISCARDED
+from worker import format_step
+import os
+import tempfile
+import unittest
+
+"""
+Tests of layout, drawing, animation and the GUI models, which need
+NumPy, matplotlib, networkx and PyQt5, so they are kept apart from
+tests in testing.py.
+"""
+
+
+class TestingLayout(unittest.TestCase):
+    """
+    Checks that layouts are cached by the edges of a graph and that
+    the NumPy layout gives a position to every vertex.
+    """
+
+    # Order of edges and of vertices in an edge does not change the hash.
+    def test_edges_hash(self):
+        edges = [[0, 1], [1, 2], [2, 0]]
+        self.assertEqual(edges_hash(edges), edges_hash([[0, 2], [2, 1], [1, 0]]))
+        self.assertEqual(edges_hash(edges), edges_hash(edges + [[1, 0]]))
+        self.assertNotEqual(edges_hash(edges), edges_hash([[0, 1], [1, 2]]))
+
+    # Drawing the same graph again uses the cached layout.
+    def test_cache(self):
+        engine = LayoutEngine(cache_size=2)
+        positions = engine.layout([[0, 1], [1, 2]])
+        self.assertIs(engine.layout([[2, 1], [1, 0]]), positions)
+        engine.layout([[0, 1]])
+        engine.layout([[0, 2]])
+        self.assertEqual(len(engine.cache), 2)
+        self.assertIsNot(engine.layout([[0, 1], [1, 2]]), positions)
+
+    # Large graphs get finite positions in [-1, 1] for every vertex.
+    def test_large_graph(self):
+        n, edges = generate("cactus", 3000)
+        engine = LayoutEngine(large_graph=500)
+        positions = engine.layout(edges)
+        self.assertEqual(len(positions), n)
+        for position in positions.values():
+            self.assertTrue(all(-1 <= x <= 1 for x in position))
+        # adding an edge reuses positions of the previous layout
+        grown = engine.layout(edges + [[0, n]])
+        self.assertEqual(len(grown), n + 1)
+        self.assertEqual(len(force_directed_layout([5], [])), 1)
+
+
+class TestingRenderer(unittest.TestCase):
+    """
+    Checks that GraphRenderer colors bridges given in any orientation
+    and leaves out details of large graphs.
+    """
+
+    def test_bridges_in_any_orientation(self):
+        edges = [[0, 1], [1, 2], [2, 0], [2, 3]]
+        renderer = GraphRenderer()
+        renderer.draw(Figure().add_subplot(111), edges, [(3, 2)],
+                      {vertex: (vertex, 0) for vertex in range(4)})
+        self.assertEqual(list(renderer.drawn_edges), [0, 1, 2, 3])
+        colors = renderer.edge_collection.get_colors()
+        self.assertEqual(tuple(colors[3]), (1.0, 0.0, 0.0, 1.0))
+        self.assertEqual(len(renderer.labels), 4)
+
+    def test_level_of_detail(self):
+        n, edges = generate("tree", 1000)
+        positions = {vertex: (vertex, vertex) for vertex in range(n)}
+        renderer = GraphRenderer(label_limit=10, thin_limit=100,
+                                 bridges_limit=500)
+        renderer.draw(Figure().add_subplot(111), edges, edges[:50],
+                      positions)
+        self.assertEqual(len(renderer.drawn_edges), 50)
+        self.assertEqual(renderer.labels, [])
+        renderer.bridges_limit = 2000
+        renderer.draw(Figure().add_subplot(111), edges, edges[:50],
+                      positions)
+        self.assertLessEqual(len(renderer.drawn_edges), 150)
+        self.assertEqual(list(renderer.drawn_edges[-50:]), list(range(50)))
+
+
+class TestingStepModel(unittest.TestCase):
+    """
+    Checks that steps are formatted one at a time and can be searched.
+    """
+
+    def test_rows_and_search(self):
+        graph = Graph(4, [[0, 1], [1, 2], [2, 0], [2, 3]])
+        graph.dfs_brute_force()
+        model = StepModel()
+        model.set_steps("dfs_brute_force", graph.get_visualization_data())
+        self.assertEqual(model.rowCount(), 4)
+        self.assertEqual(model.data(model.index(3, 0)),
+                         "step 3\nremoved edge: [2, 3]\nis a bridge? True")
+        self.assertEqual(model.find("True"), 3)
+        self.assertEqual(model.find("removed", 3), 0)
+        self.assertEqual(model.find("missing"), -1)
+
+    # Long lists are cut when shown, but not when searched.
+    def test_long_steps(self):
+        vertices = 500
+        graph = Graph(vertices, [[i, i + 1] for i in range(vertices - 1)])
+        graph.tarjans_algorithm()
+        model = StepModel()
+        model.set_steps("tarjans_algorithm", graph.get_visualization_data())
+        shown = model.data(model.index(vertices, 0))
+        self.assertIn("... (500 items)]", shown)
+        self.assertLess(len(shown), 4000)
+        row = model.find("499, 500]")
+        self.assertNotEqual(row, -1)
+        self.assertNotIn("499, 500]", model.data(model.index(row, 0)))
+        self.assertEqual(format_step("kaiwensun_bridges", [[1, 2, 3], []], 2),
+                         "rank: [1, 2, ... (3 items)]\nedges: []\n")
+
+
+class TestingAnimation(unittest.TestCase):
+    """
+    Checks that StepAnimator shows the state of every step, whether
+    steps are shown in order or after a jump.
+    """
+
+    def animate(self, algorithm, edges):
+        graph = Graph(max(max(edge) for edge in edges) + 1,
+                      [edge.copy() for edge in edges])
+        bridges = getattr(graph, algorithm)()
+        figure = Figure()
+        canvas = FigureCanvasAgg(figure)
+        axes = figure.add_subplot(111)
+        renderer = GraphRenderer()
+        positions = {vertex: (vertex % 10, vertex // 10)
+                     for edge in edges for vertex in edge}
+        renderer.draw(axes, edges, bridges, positions)
+        return StepAnimator(canvas, axes, renderer, algorithm, edges,
+                            graph.get_visualization_data()), bridges
+
+    def test_last_step_shows_bridges(self):
+        n, edges = generate("cactus", 60)
+        for algorithm in ("dfs_brute_force", "tarjans_algorithm",
+                          "kaiwensun_bridges", "chain_decomposition"):
+            animator, bridges = self.animate(algorithm, edges)
+            for step in range(len(animator)):
+                animator.show_step(step)
+            self.assertEqual(sum(animator.edge_states == BRIDGE),
+                             len(bridges))
+            animator.stop()
+
+    def test_jump_matches_playback(self):
+        n, edges = generate("cactus", 60)
+        for algorithm in ("dfs_brute_force", "tarjans_algorithm",
+                          "kaiwensun_bridges", "chain_decomposition"):
+            animator, bridges = self.animate(algorithm, edges)
+            states = []
+            for step in range(len(animator)):
+                animator.show_step(step)
+                states.append((animator.edge_states.copy(),
+                               animator.node_states.copy(),
+                               list(animator.label_texts)))
+            if algorithm == "kaiwensun_bridges":
+                self.assertTrue(any(states[-1][0] == DISCARDED))
+            for step in (len(animator) - 1, 0, len(animator) // 2, 3):
+                animator.show_step(step)
+                self.assertEqual(list(animator.edge_states),
+                                 list(states[step][0]))
+                self.assertEqual(list(animator.node_states),
+                                 list(states[step][1]))
+                self.assertEqual(animator.label_texts, states[step][2])
+            animator.stop()
+
+    # A step shown in order only looks at edges named in its changes.
+    def test_changes_of_one_step(self):
+        n, edges = generate("cactus", 60)
+        animator, bridges = self.animate("chain_decomposition", edges)
+        animator.show_step(0)
+        animator.show_step(1)
+        changes = animator.visualization_data.changes(1)
+        edge_ids = animator.changed_states(1, animator.row, changes)[0]
+        self.assertEqual(sorted(edge_ids),
+                         sorted(a for kind, field, a, b in changes
+                                if field == 1))
+        self.assertLess(len(edge_ids), len(edges))
+
+    # Steps read from a trace file are shown the same way.
+    def test_stored_trace(self):
+        n, edges = generate("cactus", 60)
+        animator, bridges = self.animate("tarjans_algorithm", edges)
+        with tempfile.TemporaryDirectory() as directory:
+            graph = Graph(n, edges)
+            graph.stream_trace(os.path.join(directory, "steps.trace"))
+            graph.tarjans_algorithm()
+            stored = graph.get_visualization_data()
+            animator.visualization_data = stored
+            for step in range(len(animator)):
+                animator.show_step(step)
+            self.assertEqual(sum(animator.edge_states == BRIDGE),
+                             len(bridges))
+            stored.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import stress
+
+"""
+Tests of the stress harness in stress.py, which uses networkx as
+an oracle, so they are kept apart from tests in testing.py.
+"""
+
+
+class TestingStress(unittest.TestCase):
+    """
+    Testing the stress harness, which compares engines with networkx.
+    """
+
+    def test_cases_are_seeded(self):
+        for family in stress.FAMILIES:
+            self.assertEqual(stress.make_case(family, 50, 3),
+                             stress.make_case(family, 50, 3))
+        case = next(stress.cases(["dfs_brute_force", "tarjans_iterative"],
+                                 1000, 5))
+        self.assertEqual(case[3], ["tarjans_iterative"])
+
+    def test_run_stress(self):
+        done, edges, failures = stress.run_stress(
+            budget=60, workers=1, max_edges=300, max_cases=15)
+        self.assertEqual(done, 15)
+        self.assertGreater(edges, 0)
+        self.assertEqual(failures, [])
+
+    def test_shrink(self):
+        # a self-loop hidden in a large graph is shrunk to a single edge
+        n, edges = stress.make_case("multigraph", 2000, 0)
+        edges.append([n - 1, n - 1])
+        self.assertEqual(stress.shrink(
+            n, edges, lambda n, edges: any(u == v for u, v in edges)),
+            (1, [[0, 0]]))
+        n, edges = stress.make_case("dense", 500, 1)
+        self.assertEqual(len(stress.shrink(
+            n, edges, lambda n, edges: len(edges) >= 3)[1]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
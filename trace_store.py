@@ -0,0 +1,345 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from itertools import chain
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from delta_trace import apply_change, copy_state
+from loader import EdgeArray
+
+"""
+Traces of algorithms stored in a file instead of memory.
+TraceWriter records changes made by the step generators of the Graph
+class straight into an append-only file, in fixed-width records, the
+same way DeltaTrace keeps them in arrays, so a trace of a graph with
+millions of edges does not have to fit in memory. Full copies of the
+state are written to a separate file while recording, and when the
+trace is closed they are appended after the changes, together with an
+index of steps, edges and bridges of the graph.
+StoredTrace opens such a file with mmap and can be used anywhere
+a DeltaTrace can, eg. in StepViewer and StepAnimator. Reading a step
+only reads the nearest copy of the state and the changes after it.
+
+File layout, all numbers little-endian:
+- MAGIC, version and size of a change record,
+- one RECORD for every change: kind, field, a, b,
+- number of changes after every step, int64,
+- number of changes before every copy of the state and the offset
+  of every copy after the first one, int64,
+- copies of the state, JSON compressed with zlib,
+- endpoints of edges and bridges of the graph, int32,
+- JSON with the algorithm, n, counts and offsets of these parts,
+- FOOTER: offset and length of that JSON and MAGIC.
+"""
+
+MAGIC = b"BRTRACE\0"
+VERSION = 1
+HEADER = struct.Struct("<8sii")
+RECORD = struct.Struct("<bb6xqq")  # 24 bytes, numbers stay aligned
+FOOTER = struct.Struct("<qq8s")
+INT64 = struct.Struct("<q")
+
+# Changes are written in blocks of this many bytes.
+BUFFER_BYTES = 1 << 20
+
+
+def encode_state(state):
+    """
+    Returns state as compressed JSON. Sets and lists of pairs are
+    saved as {"set": [...]} and {"pairs": [...]}, so decode_state
+    makes them sets and lists of tuples again.
+    """
+    fields = []
+    for field in state:
+        if isinstance(field, set):
+            fields.append({"set": sorted(field)})
+        elif not isinstance(field, int) and field and \
+                isinstance(field[0], tuple):
+            fields.append({"pairs": field})
+        else:
+            fields.append(field)
+    return zlib.compress(json.dumps(fields, separators=(",", ":")).encode(),
+                         1)
+
+
+def decode_state(data):
+    state = []
+    for field in json.loads(zlib.decompress(data)):
+        if isinstance(field, dict):
+            pairs = [tuple(pair) for pair in field.get("set", field.get(
+                "pairs", []))]
+            field = set(pairs) if "set" in field else pairs
+        state.append(field)
+    return state
+
+
+def int32_bytes(values):
+    # Little-endian int32 bytes of a flat array of integers.
+    values = array('i', values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def int_array(typecode, data):
+    # Array of little-endian numbers read from bytes.
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class TraceWriter:
+    """
+    TraceWriter records a trace of algorithm, starting from state,
+    into a file at path. It has the same record, record_step and step
+    methods as DeltaTrace, and copies of the state are made by the same
+    rule, once the number of changes since the previous copy reaches
+    checkpoint_interval and the size of the state.
+    Only the current state, which the algorithm holds anyway, and
+    the number of changes after every step are kept in memory.
+    close(bridges) finishes the file and returns a StoredTrace of it.
+    """
+
+    def __init__(self, path, state, algorithm, n, edges,
+                 checkpoint_interval=64):
+        self.path = path
+        self.algorithm = algorithm
+        self.n = n
+        self.edges = edges
+        self.checkpoint_interval = checkpoint_interval
+        self.state = copy_state(state)
+        self.changes = 0
+        self.step_ends = array('q')
+        self.checkpoint_positions = array('q', [0])
+        self.checkpoint_offsets = array('q', [0])  # offsets in states_file
+        self.buffer = bytearray()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.states_file = open(path + ".states", "w+b")
+        self.save_state()
+
+    def save_state(self):
+        self.states_file.write(encode_state(self.state))
+        self.checkpoint_offsets.append(self.states_file.tell())
+
+    def record(self, kind, field, a, b=0):
+        # Writes a single change and applies it to the current state.
+        self.buffer += RECORD.pack(kind, field, a, b)
+        if len(self.buffer) >= BUFFER_BYTES:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+        self.changes += 1
+        apply_change(self.state, kind, field, a, b)
+
+    def record_step(self, changes):
+        # Writes a list of (kind, field, a, b) changes as one step.
+        for change in changes:
+            self.record(*change)
+        self.step()
+
+    def step(self):
+        self.step_ends.append(self.changes)
+        state_size = sum(1 if isinstance(field, int) else len(field)
+                         for field in self.state)
+        since_checkpoint = self.changes - self.checkpoint_positions[-1]
+        if since_checkpoint >= max(self.checkpoint_interval, state_size):
+            self.checkpoint_positions.append(self.changes)
+            self.save_state()
+
+    def close(self, bridges=()):
+        """
+        Appends the index, copies of the state, edges and bridges
+        to the file and returns a StoredTrace reading it.
+        """
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.file.write(bytes(-self.file.tell() % 8))
+        parts = {}
+
+        def write(name, data):
+            parts[name] = self.file.tell()
+            self.file.write(data)
+
+        for name, values in (("step_ends", self.step_ends),
+                             ("checkpoint_positions",
+                              self.checkpoint_positions),
+                             ("checkpoint_offsets", self.checkpoint_offsets)):
+            values = array('q', values)
+            if sys.byteorder == "big":
+                values.byteswap()
+            write(name, values.tobytes())
+        parts["states"] = self.file.tell()
+        self.states_file.seek(0)
+        while True:
+            data = self.states_file.read(BUFFER_BYTES)
+            if not data:
+                break
+            self.file.write(data)
+        if isinstance(self.edges, EdgeArray):
+            endpoints = self.edges.endpoints
+        else:
+            endpoints = chain.from_iterable(self.edges)
+        write("endpoints", int32_bytes(endpoints))
+        bridges = list(bridges)
+        write("bridges", int32_bytes(chain.from_iterable(bridges)))
+        meta = dict(parts, algorithm=self.algorithm, n=self.n,
+                    changes=self.changes, steps=len(self.step_ends),
+                    checkpoints=len(self.checkpoint_positions),
+                    edges=len(self.edges), bridge_count=len(bridges))
+        data = json.dumps(meta).encode()
+        offset = self.file.tell()
+        self.file.write(data)
+        self.file.write(FOOTER.pack(offset, len(data), MAGIC))
+        self.remove_states()
+        self.file.close()
+        return StoredTrace(self.path)
+
+    def remove_states(self):
+        self.states_file.close()
+        os.remove(self.path + ".states")
+
+    def discard(self):
+        # Removes an unfinished trace, eg. after the algorithm was cancelled.
+        self.remove_states()
+        self.file.close()
+        os.remove(self.path)
+
+
+class StoredTrace(Sequence):
+    """
+    StoredTrace reads a trace file written by TraceWriter.
+    Indexing and iterating give the same rows as the DeltaTrace of
+    the same run. The file is memory mapped, so only pages with the
+    nearest copy of the state and the following changes are read,
+    and the last copy used is kept to make scrubbing faster.
+    algorithm, n, edges() and bridges() describe the recorded run.
+    Raises ValueError if the file is not a finished trace.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < HEADER.size + FOOTER.size:
+                raise ValueError("%s is not a trace file" % path)
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size = HEADER.unpack_from(self.data, 0)
+        offset, length, end_magic = FOOTER.unpack_from(self.data,
+                                                       size - FOOTER.size)
+        if magic != MAGIC or end_magic != MAGIC:
+            self.close()
+            raise ValueError("%s is not a finished trace file" % path)
+        if version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError("trace version %d is not supported" % version)
+        self.meta = json.loads(self.data[offset:offset + length].decode())
+        self.algorithm = self.meta["algorithm"]
+        self.n = self.meta["n"]
+        count = self.meta["checkpoints"]
+        start = self.meta["checkpoint_positions"]
+        self.checkpoint_positions = int_array(
+            'q', self.data[start:start + 8 * count])
+        start = self.meta["checkpoint_offsets"]
+        self.checkpoint_offsets = int_array(
+            'q', self.data[start:start + 8 * (count + 1)])
+        self.cached = (None, None)  # index and state of the last copy
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def edges(self):
+        # EdgeArray of edges of the graph the trace was recorded on.
+        start = self.meta["endpoints"]
+        return EdgeArray(int_array('i', self.data[
+            start:start + 8 * self.meta["edges"]]))
+
+    def bridges(self):
+        start = self.meta["bridges"]
+        values = iter(int_array('i', self.data[
+            start:start + 8 * self.meta["bridge_count"]]))
+        return list(zip(values, values))
+
+    def step_end(self, index):
+        # Number of changes after step index.
+        return INT64.unpack_from(self.data,
+                                 self.meta["step_ends"] + 8 * index)[0]
+
+    def checkpoint(self, index):
+        # Copy of the state number index.
+        if self.cached[0] != index:
+            start = self.meta["states"]
+            data = self.data[start + self.checkpoint_offsets[index]:
+                             start + self.checkpoint_offsets[index + 1]]
+            self.cached = (index, decode_state(data))
+        return copy_state(self.cached[1])
+
+    def replay(self, state, start, end):
+        # Applies changes with indexes from start to end to state.
+        data = self.data
+        for offset in range(HEADER.size + RECORD.size * start,
+                            HEADER.size + RECORD.size * end, RECORD.size):
+            apply_change(state, *RECORD.unpack_from(data, offset))
+
+    def changes(self, index):
+        # List of (kind, field, a, b) changes made by step index.
+        if index < 0:
+            index += len(self)
+        start = self.step_end(index - 1) if index > 0 else 0
+        return [RECORD.unpack_from(self.data, HEADER.size + RECORD.size * i)
+                for i in range(start, self.step_end(index))]
+
+    def __len__(self):
+        return self.meta["steps"]
+
+    def __getitem__(self, index):
+        """
+        Rebuilds the state after step index from the nearest copy.
+        Slices return a list of rows.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trace index out of range")
+        end = self.step_end(index)
+        nearest = bisect_right(self.checkpoint_positions, end) - 1
+        state = self.checkpoint(nearest)
+        self.replay(state, self.checkpoint_positions[nearest], end)
+        return state
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, index):
+        """
+        Yields states after step index and every step after it,
+        rebuilt one after another from a single state.
+        """
+        if index > 0:
+            state = self[index - 1]
+            start = self.step_end(index - 1)
+        else:
+            state = self.checkpoint(0)
+            start = 0
+        for step in range(index, len(self)):
+            end = self.step_end(step)
+            self.replay(state, start, end)
+            start = end
+            yield copy_state(state)
+
+    def nbytes(self):
+        # Number of bytes of recorded changes in the file.
+        return RECORD.size * self.meta["changes"]
@@ -0,0 +1,136 @@
+from array import array
+from loader import EdgeArray
+
+"""
+Checking graphs given by the user before any algorithm is run.
+Graphs do not have to be connected and vertices can have any integer
+or string labels. Every edge is read once: labels are given compact
+ids in the order they first appear, and endpoints are joined in a
+union-find structure, which counts connected components, so it takes
+O(E α(V)) time and no second graph object is built.
+"""
+
+
+class UnionFind:
+    """
+    UnionFind keeps disjoint sets of vertices 0 to n - 1 in flat
+    integer arrays. Smaller sets are joined to larger ones and paths
+    are halved on every find, so both operations take almost constant
+    amortized time. components is the current number of sets.
+    """
+
+    def __init__(self, n=0):
+        self.parent = array('i', range(n))
+        self.size = array('i', [1]) * n
+        self.components = n
+
+    def add(self):
+        # Adds a new vertex in its own set and returns it.
+        vertex = len(self.parent)
+        self.parent.append(vertex)
+        self.size.append(1)
+        self.components += 1
+        return vertex
+
+    def find(self, vertex):
+        parent = self.parent
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    def union(self, u, v):
+        # Joins sets of u and v, returns False if they were already one set.
+        u = self.find(u)
+        v = self.find(v)
+        if u == v:
+            return False
+        if self.size[u] < self.size[v]:
+            u, v = v, u
+        self.parent[v] = u
+        self.size[u] += self.size[v]
+        self.components -= 1
+        return True
+
+
+def count_components(n, endpoints):
+    # Number of connected components of n vertices and flat endpoints.
+    forest = UnionFind(n)
+    endpoints = iter(endpoints)
+    for u in endpoints:
+        forest.union(u, next(endpoints))
+    return forest.components
+
+
+def validate_graph(edges, number_of_vertices=None, relabel=True):
+    """
+    Checks that edges, a list of [u, v] pairs or an EdgeArray, form
+    a graph with number_of_vertices vertices, or with as many as
+    its labels need if it is None.
+    Vertices keep their labels if all of them are integers between
+    0 and n - 1, and vertices not in any edge are isolated.
+    Otherwise, if relabel is True, labels are replaced by ids from 0,
+    in the order they first appear, eg. [["a", "b"], ["b", 7]] becomes
+    [[0, 1], [1, 2]] with labels ["a", "b", 7].
+    Returns number of vertices, edges which can be given to Graph,
+    list with the label of every id, or None if labels were kept,
+    and the number of connected components.
+    Raises ValueError if the graph is not correct.
+    """
+    if number_of_vertices is not None and number_of_vertices < 0:
+        raise ValueError("number of vertices can not be negative")
+    if isinstance(edges, EdgeArray):
+        # labels from loader.py are already checked non-negative integers
+        n = edges.number_of_vertices()
+        if number_of_vertices is not None:
+            if n > number_of_vertices:
+                raise ValueError("vertex %d is not smaller than the number "
+                                 "of vertices, %d" % (n - 1,
+                                                      number_of_vertices))
+            n = number_of_vertices
+        return n, edges, None, count_components(n, edges.endpoints)
+
+    ids = {}  # label -> compact id
+    forest = UnionFind()
+    endpoints = array('i')
+    integers = True  # all labels are non-negative integers
+    largest = -1
+    for edge in edges:
+        if isinstance(edge, (str, bytes)) or len(edge) != 2:
+            raise ValueError("edge %r does not have two vertices" % (edge,))
+        for label in edge:
+            vertex = ids.get(label)
+            if vertex is None:
+                if not isinstance(label, (int, str)) or \
+                        isinstance(label, bool):
+                    raise ValueError("vertex %r is not an integer or a "
+                                     "string" % (label,))
+                if integers and isinstance(label, int) and label >= 0:
+                    largest = max(largest, label)
+                else:
+                    integers = False
+                vertex = ids[label] = forest.add()
+            endpoints.append(vertex)
+        forest.union(endpoints[-2], endpoints[-1])
+
+    if number_of_vertices is None:
+        # labels are kept only if they already are ids
+        keep = integers and largest < len(ids)
+        n = largest + 1 if keep else len(ids)
+    else:
+        keep = integers and largest < number_of_vertices
+        n = number_of_vertices
+    if not keep and not relabel:
+        raise ValueError("vertex labels must be integers between "
+                         "0 and %d" % (n - 1))
+    if n < len(ids):
+        raise ValueError("edges have %d vertices, more than the number "
+                         "of vertices, %d" % (len(ids), n))
+    # vertices which are not in any edge are separate components
+    components = forest.components + n - len(ids)
+    if keep:
+        return n, edges, None, components
+    labels = [None] * len(ids)
+    for label, vertex in ids.items():
+        labels[vertex] = label
+    return n, EdgeArray(endpoints), labels, components
@@ -0,0 +1,142 @@
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from graph import Graph
+
+"""
+Runs algorithms outside of the GUI thread.
+AlgorithmWorker is moved to a QThread by the main window. It runs
+an algorithm and computes positions of vertices for drawing, and sends
+results back with a signal, so that the window stays responsive even
+for large graphs.
+"""
+
+# Progress is reported after every this many steps.
+PROGRESS_INTERVAL = 200
+
+
+def format_value(value, limit=None):
+    # Text of a value, lists longer than limit show only limit items.
+    if limit is not None and isinstance(value, list) and len(value) > limit:
+        return str(value[:limit])[:-1] + ", ... (" + str(len(value)) + \
+            " items)]"
+    return str(value)
+
+
+def format_step(algorithm, row, limit=None):
+    """
+    Text shown in "Algorithm output" for a single step of algorithm.
+    If limit is given, only first limit items of every list are shown.
+    """
+    if algorithm == "dfs_brute_force":
+        return "removed edge: " + format_value(row[0], limit) + \
+            "\nis a bridge? " + format_value(row[1], limit) + "\n"
+    if algorithm == "tarjans_algorithm":
+        return "time: " + format_value(row[0], limit) + \
+            "\ndisc: " + format_value(row[1], limit) + \
+            "\nlow: " + format_value(row[2], limit) + \
+            "\nbridges: " + format_value(row[3], limit) + "\n"
+    if algorithm == "kaiwensun_bridges":
+        return "rank: " + format_value(row[0], limit) + \
+            "\nedges: " + format_value(row[1], limit) + "\n"
+    return "chain: " + format_value(row[0], limit) + \
+        "\nchains: " + format_value(row[1], limit) + "\n"
+
+
+def format_summary(algorithm, graph):
+    # Text shown after all steps, if algorithm finds more than bridges.
+    if algorithm != "chain_decomposition":
+        return ""
+    return "components: " + str(graph.get_two_edge_connected_components()) + \
+        "\nbridge tree: " + str(graph.get_bridge_tree()) + "\n"
+
+
+class Cancelled(Exception):
+    # Raised from inside an algorithm when the user cancels it.
+    pass
+
+
+class AlgorithmWorker(QObject):
+    """
+    AlgorithmWorker finds bridges with one of the algorithms of the
+    Graph class, given by the name of its method.
+    progress signal sends number of steps done so far, which for
+    the brute-force algorithm is the number of edges checked.
+    finished signal sends a dictionary with results, cancelled is sent
+    if cancel() was called before the worker finished and failed sends
+    a message if an algorithm raised an error.
+    Positions are computed by layout_engine, so a graph drawn before
+    is not laid out again, and bridges and steps are taken from
+    result_cache if the same algorithm was run on the same graph.
+    If statistics is True, the graph is instrumented and statistics
+    of the run are added to the summary.
+    """
+
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, algorithm, number_of_vertices, edges, layout_engine,
+                 result_cache, statistics=False):
+        super(AlgorithmWorker, self).__init__()
+        self.algorithm = algorithm
+        self.number_of_vertices = number_of_vertices
+        self.edges = edges
+        self.layout_engine = layout_engine  # shared with the main window
+        self.result_cache = result_cache  # shared with the main window
+        self.statistics = statistics
+        self.is_cancelled = False
+
+    def cancel(self):
+        # Can be called from any thread, the worker stops at the next step.
+        self.is_cancelled = True
+
+    def check_progress(self, steps):
+        if self.is_cancelled:
+            raise Cancelled()
+        if steps % PROGRESS_INTERVAL == 0:
+            self.progress.emit(steps)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self.finished.emit(self.find_bridges())
+        except Cancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(str(error))
+
+    def find_bridges(self):
+        """
+        Runs the algorithm and computes layout.
+        Returns dictionary with name of the algorithm, bridges,
+        visualization data, summary text with statistics of the run,
+        positions of vertices and whether the result was found
+        in the cache.
+        Steps are not formatted here, StepViewer formats them when
+        they are shown.
+        """
+        graph = Graph(self.number_of_vertices, self.edges)
+        if self.statistics:
+            graph.instrument()
+        hits = self.result_cache.hits
+        bridges = self.result_cache.run(graph, self.algorithm,
+                                        progress=self.check_progress)
+        visualization_data = graph.get_visualization_data()
+        self.progress.emit(len(visualization_data))
+        summary = format_summary(self.algorithm, graph)
+        if graph.stats is not None and graph.stats.algorithm is not None:
+            # statistics only exist if the algorithm was not cached
+            summary += "statistics:\n" + str(graph.stats)
+
+        positions = self.layout_engine.layout(self.edges)
+        if self.is_cancelled:
+            raise Cancelled()
+        return {
+            "algorithm": self.algorithm,
+            "edges": self.edges,
+            "bridges": bridges,
+            "visualization_data": visualization_data,
+            "summary": summary,
+            "positions": positions,
+            "cached": self.result_cache.hits > hits,
+        }